@@ -0,0 +1,3 @@
+"""Management commands package."""
+
+from __future__ import annotations
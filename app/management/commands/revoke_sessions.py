@@ -0,0 +1,34 @@
+"""End all sessions of one or more users across every node."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from lib.revocation import revoke_user
+from lib.tenants import configured_tenants, using
+
+
+class Command(BaseCommand):
+    help = (
+        "Revoke every session of the given users (by ZITADEL user ID) and their refresh tokens. "
+        "Requires a cache shared by all nodes (REDIS_URL)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("sub", nargs="+", help="ZITADEL user ID (the 'sub' claim)")
+        parser.add_argument(
+            "--tenant", default="", help="key of a tenant in ZITADEL_TENANTS_FILE (default: the ZITADEL_* settings)"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        tenant = None
+        if options["tenant"]:
+            tenant = configured_tenants().get(options["tenant"])
+            if tenant is None:
+                raise CommandError(f"Unknown tenant {options['tenant']!r}")
+        with using(tenant):
+            for sub in options["sub"]:
+                ended = revoke_user(sub)
+                self.stdout.write(self.style.SUCCESS(f"Revoked {sub}: {ended} indexed sessions ended"))
@@ -6,7 +6,8 @@ from typing import TYPE_CHECKING, Callable, cast
 
 from django.urls import path
 
-from lib import auth
+from lib import auth, backchannel
+from lib.config import config
 
 if TYPE_CHECKING:
     from django.http import HttpResponseBase
@@ -14,15 +15,21 @@ if TYPE_CHECKING:
 
     ViewFunc = Callable[[HttpRequest], HttpResponseBase]
 
+if config.ASYNC_VIEWS:
+    callback, logout, userinfo = auth.acallback, auth.alogout, auth.auserinfo
+else:
+    callback, logout, userinfo = auth.callback, auth.logout, auth.userinfo
+
 urlpatterns = [
     path("csrf", cast("ViewFunc", auth.csrf), name="csrf"),
     path("signin", cast("ViewFunc", auth.signin), name="signin"),
     path("signin/zitadel", cast("ViewFunc", auth.signin_zitadel), name="signin_zitadel"),
-    path("callback", cast("ViewFunc", auth.callback), name="callback"),
-    path("logout", cast("ViewFunc", auth.logout), name="logout"),
+    path("callback", cast("ViewFunc", callback), name="callback"),
+    path("logout", cast("ViewFunc", logout), name="logout"),
     path("logout/callback", cast("ViewFunc", auth.logout_callback), name="logout_callback"),
     path("logout/success", cast("ViewFunc", auth.logout_success), name="logout_success"),
     path("logout/error", cast("ViewFunc", auth.logout_error), name="logout_error"),
     path("error", cast("ViewFunc", auth.error_page), name="error"),
-    path("userinfo", cast("ViewFunc", auth.userinfo), name="userinfo"),
+    path("userinfo", cast("ViewFunc", userinfo), name="userinfo"),
+    path("backchannel-logout", cast("ViewFunc", backchannel.backchannel_logout), name="backchannel_logout"),
 ]
@@ -5,8 +5,13 @@ from __future__ import annotations
 from django.urls import path
 
 from app import views
+from lib import metrics
+from lib.config import config
 
 urlpatterns = [
     path("", views.home, name="home"),
     path("profile", views.profile, name="profile"),
 ]
+
+if config.METRICS_ENABLED:
+    urlpatterns.append(path("metrics", metrics.metrics_view, name="metrics"))
@@ -2,30 +2,29 @@
 
 from __future__ import annotations
 
-import json
-
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
+from lib.context import get_auth
 from lib.guard import require_auth
+from lib.metadata import profile_json
+from lib.pages import render_page
 
 
 def home(request: HttpRequest) -> HttpResponse:
     """Render the home page with authentication status."""
-    session_data = request.session.get("auth_session")
-    return render(
+    return render_page(
         request,
         "index.html",
         {
-            "isAuthenticated": bool(session_data),
+            "isAuthenticated": get_auth(request).is_authenticated,
             "loginUrl": "/auth/signin/zitadel",
         },
+        vary=("Cookie",),
     )
 
 
 @require_auth
 def profile(request: HttpRequest) -> HttpResponse:
     """Display authenticated user's profile information."""
-    auth_session = request.session.get("auth_session", {})
-    user_json = json.dumps(auth_session.get("user", {}), indent=2)
-    return render(request, "profile.html", {"userJson": user_json})
+    return render(request, "profile.html", {"userJson": profile_json(get_auth(request))})
@@ -0,0 +1,236 @@
+"""A local stand-in for ZITADEL's OIDC endpoints.
+
+Serves discovery, JWKS, authorize, token, revoke, userinfo and end_session over plain
+HTTP on localhost, issuing tokens signed with a throwaway key. Benchmarks run
+the application against it so results do not depend on network latency to a
+real instance, and so the number of IdP calls per scenario can be counted.
+
+Authorization codes are bound to the PKCE challenge sent to the authorize
+endpoint. For capacity planning the server can add latency to every response
+and fail a fraction of token, userinfo and revocation calls with a 503, the
+way an overloaded instance would.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from bench.tokens import signing_key, token_response, user_claims
+
+# Endpoints that fail when errors are injected. Discovery and JWKS are left
+# alone, as the application caches them and only fetches them at startup.
+FAULT_PATHS = frozenset({"/oauth/v2/token", "/oauth/v2/revoke", "/oidc/v1/userinfo"})
+
+
+class Grant(NamedTuple):
+    nonce: str | None
+    code_challenge: str | None
+
+
+class FakeIdp:
+    """A threaded fake ZITADEL server.
+
+    Attributes:
+        url: Base URL of the server, usable as ``ZITADEL_DOMAIN``
+        client_id: Client ID the issued tokens are addressed to
+        latency: Seconds added to every response
+        jitter: Upper bound of random seconds added on top of ``latency``
+        error_rate: Fraction of calls to :data:`FAULT_PATHS` answered with a 503
+        calls: Number of requests served per endpoint path
+        errors: Number of injected errors per endpoint path
+    """
+
+    def __init__(
+        self,
+        client_id: str = "bench-client",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+    ) -> None:
+        self.client_id = client_id
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.key = signing_key()
+        self.calls: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self._codes: dict[str, Grant] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.idp = self  # type: ignore[attr-defined]
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-idp", daemon=True)
+
+    def __enter__(self) -> FakeIdp:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "issuer": self.url,
+            "authorization_endpoint": f"{self.url}/oauth/v2/authorize",
+            "token_endpoint": f"{self.url}/oauth/v2/token",
+            "userinfo_endpoint": f"{self.url}/oidc/v1/userinfo",
+            "end_session_endpoint": f"{self.url}/oidc/v1/end_session",
+            "revocation_endpoint": f"{self.url}/oauth/v2/revoke",
+            "jwks_uri": f"{self.url}/oauth/v2/keys",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.calls[path] += 1
+
+    def delay(self) -> None:
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))  # noqa: S311
+
+    def should_fail(self, path: str) -> bool:
+        if path not in FAULT_PATHS or random.random() >= self.error_rate:  # noqa: S311
+            return False
+        with self._lock:
+            self.errors[path] += 1
+        return True
+
+    def issue_code(self, nonce: str | None, code_challenge: str | None = None) -> str:
+        code = secrets.token_urlsafe(24)
+        with self._lock:
+            self._codes[code] = Grant(nonce, code_challenge)
+        return code
+
+    def redeem_code(self, code: str, code_verifier: str | None = None) -> tuple[bool, str | None]:
+        """Redeem a code once, checking the PKCE verifier if a challenge was sent."""
+        with self._lock:
+            grant = self._codes.pop(code, None)
+        if grant is None:
+            return False, None
+        if grant.code_challenge is not None:
+            digest = hashlib.sha256((code_verifier or "").encode()).digest()
+            if base64.urlsafe_b64encode(digest).rstrip(b"=").decode() != grant.code_challenge:
+                return False, None
+        return True, grant.nonce
+
+    def tokens(self, nonce: str | None = None) -> dict[str, Any]:
+        response = token_response(self.key, issuer=self.url, client_id=self.client_id, nonce=nonce)
+        del response["expires_at"]  # computed by the client from expires_in
+        return response
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Routes requests to the fake endpoints of the server's :class:`FakeIdp`."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def idp(self) -> FakeIdp:
+        return self.server.idp  # type: ignore[attr-defined, no-any-return]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.idp.count(url.path)
+        if self.fault(url.path):
+            return
+        routes = {
+            "/.well-known/openid-configuration": self.discovery,
+            "/oauth/v2/keys": self.keys,
+            "/oauth/v2/authorize": self.authorize,
+            "/oidc/v1/userinfo": self.userinfo,
+            "/oidc/v1/end_session": self.end_session,
+        }
+        routes.get(url.path, self.not_found)(query)
+
+    def do_POST(self) -> None:  # noqa: N802
+        url = urlparse(self.path)
+        self.idp.count(url.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        if self.fault(url.path):
+            return
+        {"/oauth/v2/token": self.token, "/oauth/v2/revoke": self.revoke}.get(url.path, self.not_found)(form)
+
+    def fault(self, path: str) -> bool:
+        """Apply the configured latency, and answer with an injected error if one is due."""
+        self.idp.delay()
+        if not self.idp.should_fail(path):
+            return False
+        self.send_json({"error": "temporarily_unavailable"}, status=503)
+        return True
+
+    def discovery(self, query: dict[str, str]) -> None:
+        self.send_json(self.idp.metadata(), {"Cache-Control": "max-age=3600"})
+
+    def keys(self, query: dict[str, str]) -> None:
+        self.send_json({"keys": [self.idp.key.as_dict(private=False)]})
+
+    def authorize(self, query: dict[str, str]) -> None:
+        code = self.idp.issue_code(query.get("nonce"), query.get("code_challenge"))
+        self.redirect(query["redirect_uri"], {"code": code, "state": query.get("state", "")})
+
+    def userinfo(self, query: dict[str, str]) -> None:
+        self.send_json(user_claims(), {"ETag": '"userinfo-v1"'})
+
+    def end_session(self, query: dict[str, str]) -> None:
+        self.redirect(query["post_logout_redirect_uri"], {"state": query.get("state", "")})
+
+    def token(self, form: dict[str, str]) -> None:
+        grant_type = form.get("grant_type")
+        if grant_type == "authorization_code":
+            valid, nonce = self.idp.redeem_code(form.get("code", ""), form.get("code_verifier"))
+            if valid:
+                self.send_json(self.idp.tokens(nonce))
+            else:
+                self.send_json({"error": "invalid_grant"}, status=400)
+        elif grant_type == "refresh_token":
+            self.send_json(self.idp.tokens())
+        else:
+            self.send_json({"error": "unsupported_grant_type"}, status=400)
+
+    def revoke(self, form: dict[str, str]) -> None:
+        self.send_json({})
+
+    def not_found(self, params: dict[str, str]) -> None:
+        self.send_json({"error": "not_found"}, status=404)
+
+    def send_json(self, body: Any, headers: dict[str, str] | None = None, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, target: str, params: dict[str, str]) -> None:
+        separator = "&" if "?" in target else "?"
+        self.send_response(302)
+        self.send_header("Location", f"{target}{separator}{urlencode(params)}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
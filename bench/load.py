@@ -0,0 +1,246 @@
+"""Drive simulated users through the complete sign-in cycle against a local fake ZITADEL.
+
+Each of ``--users`` threads plays one browser and goes ``--cycles`` times
+through these steps, in order:
+
+- ``signin``: the sign-in page, a CSRF token and the POST that starts the login
+- ``authorize``: the fake IdP's authorize endpoint, which redirects back with a code
+- ``callback``: the code exchange and session set-up
+- ``profile``: the protected profile page
+- ``refresh``: the profile page after the access token expired, refreshed by
+  ``require_auth``
+- ``logout``: the logout POST that redirects to the IdP's end_session endpoint
+- ``end_session``: the fake IdP's end_session endpoint, which redirects back
+- ``logout_callback``: the logout state check
+
+Application requests go through Django's test client in this process, so
+the numbers are the cost of the views and their IdP calls without a web
+server in front. ``authorize`` and ``end_session`` only measure the fake IdP.
+A failed step ends the cycle, and the user starts the next one signed out.
+
+``--idp-latency``, ``--idp-jitter`` and ``--idp-error-rate`` make the fake IdP
+slow or unreliable (see :class:`bench.fake_idp.FakeIdp`), to size workers for
+a degraded instance. The JSON report lists cycles and application requests
+per second and the latency of each step.
+
+Usage::
+
+    python -m bench.load --users 20 --cycles 10 --idp-latency 0.03 --idp-error-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urlparse
+
+import requests
+
+from bench.fake_idp import FakeIdp
+from bench.run import configure, git_revision, latency_summary
+
+STEPS = ("signin", "authorize", "callback", "profile", "refresh", "logout", "end_session", "logout_callback")
+
+# Requests each step sends to the application; the others only call the fake IdP.
+APP_REQUESTS = {"signin": 3, "callback": 1, "profile": 1, "refresh": 1, "logout": 1, "logout_callback": 1}
+
+
+class StepError(Exception):
+    """A step of the cycle did not get the expected response."""
+
+    def __init__(self, step: str, reason: Exception) -> None:
+        super().__init__(f"{step}: {reason}")
+        self.step = step
+        self.reason = reason
+
+
+@contextmanager
+def step(timings: dict[str, float], name: str) -> Iterator[None]:
+    """Time a step into ``timings``, turning any error into :class:`StepError`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        raise StepError(name, e) from e
+    timings[name] = time.perf_counter() - start
+
+
+def expect(response: Any, status: int, location: str | None = None) -> Any:
+    if response.status_code != status:
+        raise AssertionError(f"expected {status}, got {response.status_code}")
+    if location is not None and not response.headers["Location"].startswith(location):
+        raise AssertionError(f"expected redirect to {location}, got {response.headers['Location']}")
+    return response
+
+
+def follow(client: Any, location: str) -> Any:
+    """Request an application URL the IdP redirected the browser to."""
+    target = urlparse(location)
+    return client.get(f"{target.path}?{target.query}")
+
+
+def expire_access_token(client: Any) -> None:
+    from django.conf import settings
+
+    session = client.session
+    auth_session = session["auth_session"]
+    auth_session["expires_at"] = int(time.time()) - 1
+    session["auth_session"] = auth_session
+    session.save()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+
+def run_cycle(client: Any, browser: requests.Session, timings: dict[str, float]) -> None:
+    """Sign in, view the profile, refresh the token and sign out once.
+
+    Raises:
+        StepError: If a step did not get the expected response
+    """
+    with step(timings, "signin"):
+        expect(client.get("/auth/signin"), 200)
+        csrf_token = expect(client.get("/auth/csrf"), 200).json()["csrfToken"]
+        authorize = expect(client.post("/auth/signin/zitadel", {"csrfToken": csrf_token, "callbackUrl": "/profile"}), 302)
+    with step(timings, "authorize"):
+        redirect = expect(browser.get(authorize.headers["Location"], allow_redirects=False, timeout=10), 302)
+    with step(timings, "callback"):
+        expect(follow(client, redirect.headers["Location"]), 302, "/profile")
+    with step(timings, "profile"):
+        expect(client.get("/profile"), 200)
+    expire_access_token(client)
+    with step(timings, "refresh"):
+        expect(client.get("/profile"), 200)
+    with step(timings, "logout"):
+        end_session = expect(client.post("/auth/logout"), 302)
+    with step(timings, "end_session"):
+        redirect = expect(browser.get(end_session.headers["Location"], allow_redirects=False, timeout=10), 302)
+    with step(timings, "logout_callback"):
+        expect(follow(client, redirect.headers["Location"]), 302, "/auth/logout/success")
+
+
+class Results:
+    """Step timings and failures collected from all users."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {name: [] for name in STEPS}
+        self.errors: dict[str, Counter[str]] = {name: Counter() for name in STEPS}
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, timings: dict[str, float], failure: StepError | None) -> None:
+        with self._lock:
+            for name, seconds in timings.items():
+                self.latencies[name].append(seconds)
+            if failure is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+                self.errors[failure.step][type(failure.reason).__name__] += 1
+
+    def report(self, wall: float) -> dict[str, Any]:
+        app_requests = sum(len(self.latencies[name]) * count for name, count in APP_REQUESTS.items())
+        steps = {}
+        for name in STEPS:
+            latencies = sorted(self.latencies[name])
+            steps[name] = {"count": len(latencies), "errors": dict(self.errors[name]), "latency_ms": latency_summary(latencies)}
+        return {
+            "cycles": {"completed": self.completed, "failed": self.failed},
+            "wall_seconds": round(wall, 4),
+            "cycles_per_second": round(self.completed / wall, 2) if wall else 0.0,
+            "requests_per_second": round(app_requests / wall, 2) if wall else 0.0,
+            "steps": steps,
+        }
+
+
+def warm_up(cycles: int) -> None:
+    """Run untimed cycles, so templates, caches and connection pools are ready."""
+    from django.test import Client
+
+    with requests.Session() as browser:
+        for _ in range(cycles):
+            run_cycle(Client(SERVER_NAME="localhost"), browser, {})
+
+
+def simulate(users: int, cycles: int) -> dict[str, Any]:
+    """Run ``cycles`` cycles for each of ``users`` concurrent users and report the results."""
+    from django.test import Client
+
+    results = Results()
+
+    def user() -> None:
+        client = Client(SERVER_NAME="localhost")
+        with requests.Session() as browser:
+            for _ in range(cycles):
+                timings: dict[str, float] = {}
+                try:
+                    run_cycle(client, browser, timings)
+                except StepError as e:
+                    client.cookies.clear()
+                    results.record(timings, e)
+                else:
+                    results.record(timings, None)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for future in [pool.submit(user) for _ in range(users)]:
+            future.result()
+    return results.report(time.perf_counter() - start)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users (default: 10)")
+    parser.add_argument("--cycles", type=int, default=5, help="sign-in to logout cycles per user (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed cycles before the run (default: 1)")
+    parser.add_argument("--idp-latency", type=float, default=0.0, help="seconds the fake IdP adds to each response")
+    parser.add_argument("--idp-jitter", type=float, default=0.0, help="random extra seconds, up to this value")
+    parser.add_argument("--idp-error-rate", type=float, default=0.0, help="fraction of token, userinfo and revoke calls failing")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with FakeIdp(latency=args.idp_latency, jitter=args.idp_jitter) as idp:
+        configure(idp)
+        warm_up(args.warmup)
+        idp.error_rate = args.idp_error_rate
+
+        import django
+
+        calls_before = Counter(idp.calls)
+        results = simulate(args.users, args.cycles)
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": int(time.time()),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "users": args.users,
+                "cycles": args.cycles,
+                "idp_latency": args.idp_latency,
+                "idp_jitter": args.idp_jitter,
+                "idp_error_rate": args.idp_error_rate,
+            },
+            **results,
+            "idp_calls": dict(Counter(idp.calls) - calls_before),
+            "idp_errors": dict(idp.errors),
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
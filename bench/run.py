@@ -0,0 +1,258 @@
+"""Benchmark the authentication hot paths against a local fake ZITADEL.
+
+Starts :class:`bench.fake_idp.FakeIdp`, points the application at it and drives
+each scenario through Django's test client from ``--concurrency`` threads.
+Only the request under test is timed; the steps that set it up (signing in,
+visiting the authorize endpoint) are not. Results are written as JSON with
+throughput, latency percentiles and the number of IdP calls per scenario, so
+runs on different commits can be diffed.
+
+Usage::
+
+    python -m bench.run --concurrency 8 --requests 500 --output bench_output.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess  # noqa: S404
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+import requests
+
+from bench.fake_idp import FakeIdp
+
+Scenario = Callable[[Any], float]
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str) -> Callable[[Scenario], Scenario]:
+    def register(func: Scenario) -> Scenario:
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+def timed(request: Callable[[], Any], expected_status: int, expected_location: str | None = None) -> float:
+    start = time.perf_counter()
+    response = request()
+    elapsed = time.perf_counter() - start
+    if response.status_code != expected_status:
+        raise AssertionError(f"expected {expected_status}, got {response.status_code}")
+    if expected_location is not None and response["Location"] != expected_location:
+        raise AssertionError(f"expected redirect to {expected_location}, got {response['Location']}")
+    return elapsed
+
+
+def sign_in(client: Any, **auth_session: Any) -> None:
+    """Store an auth session in the client's session cookie, as the callback would."""
+    from django.conf import settings
+
+    session = client.session
+    session["auth_session"] = {
+        "user": {"sub": "bench-user", "name": "Bench User"},
+        "access_token": "bench-access-token",
+        "refresh_token": "bench-refresh-token",
+        "expires_at": int(time.time()) + 3600,
+        **auth_session,
+    }
+    session.save()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+
+@scenario("home")
+def home(client: Any) -> float:
+    return timed(lambda: client.get("/"), 200)
+
+
+@scenario("signin")
+def signin(client: Any) -> float:
+    return timed(lambda: client.get("/auth/signin"), 200)
+
+
+@scenario("profile")
+def profile(client: Any) -> float:
+    if "auth_session" not in client.session:
+        sign_in(client)
+    return timed(lambda: client.get("/profile"), 200)
+
+
+@scenario("userinfo")
+def userinfo(client: Any) -> float:
+    if "auth_session" not in client.session:
+        sign_in(client)
+    return timed(lambda: client.get("/auth/userinfo"), 200)
+
+
+@scenario("callback")
+def callback(client: Any) -> float:
+    csrf_token = client.get("/auth/csrf").json()["csrfToken"]
+    authorize = client.post("/auth/signin/zitadel", {"csrfToken": csrf_token, "callbackUrl": "/profile"})
+    redirect = requests.get(authorize["Location"], allow_redirects=False, timeout=10)
+    target = urlparse(redirect.headers["Location"])
+    return timed(lambda: client.get(f"{target.path}?{target.query}"), 302, "/profile")
+
+
+@scenario("refresh")
+def refresh(client: Any) -> float:
+    """An expired access token, refreshed by require_auth before the view runs."""
+    sign_in(client, expires_at=int(time.time()) - 1, refresh_token=os.urandom(16).hex())
+    return timed(lambda: client.get("/profile"), 200)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """Mean, percentiles and maximum of sorted latencies, in milliseconds."""
+    return {
+        "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99": round(percentile(latencies, 0.99) * 1000, 3),
+        "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def run_scenario(name: str, requests_total: int, concurrency: int, warmup: int, idp: FakeIdp) -> dict[str, Any]:
+    from django.test import Client
+
+    func = SCENARIOS[name]
+    local = threading.local()
+    remaining = iter(range(requests_total))
+    remaining_lock = threading.Lock()
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+
+    def client() -> Client:
+        if not hasattr(local, "client"):
+            local.client = Client(SERVER_NAME="localhost")
+        return local.client
+
+    def worker() -> None:
+        while True:
+            with remaining_lock:
+                if next(remaining, None) is None:
+                    return
+            try:
+                latencies.append(func(client()))
+            except Exception as e:
+                errors[type(e).__name__] += 1
+
+    for _ in range(warmup):
+        func(Client(SERVER_NAME="localhost"))
+
+    calls_before = Counter(idp.calls)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "idp_calls": dict(Counter(idp.calls) - calls_before),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)  # noqa: S603, S607
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def configure(idp: FakeIdp) -> None:
+    """Point the application at the fake IdP and set up Django."""
+    os.environ.update(
+        {
+            "DJANGO_SETTINGS_MODULE": "project.settings",
+            "ZITADEL_DOMAIN": idp.url,
+            "ZITADEL_CLIENT_ID": idp.client_id,
+            "ZITADEL_CLIENT_SECRET": "bench-secret",
+            "ZITADEL_CALLBACK_URL": "http://localhost/auth/callback",
+            "ZITADEL_POST_LOGOUT_URL": "http://localhost/auth/logout/callback",
+            "SESSION_SECRET": "bench-session-secret",
+        }
+    )
+    os.environ.setdefault("PY_ENV", "production")
+
+    import django
+
+    django.setup()
+    logging.disable(logging.INFO)
+
+    from lib.staticfiles import manifest_missing
+
+    # Production templates link to fingerprinted assets, which need a manifest.
+    if manifest_missing():
+        from django.core.management import call_command
+
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    from lib.auth import warm_up
+
+    warm_up()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads per scenario (default: 4)")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario (default: 200)")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario (default: 5)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with FakeIdp() as idp:
+        configure(idp)
+
+        import django
+
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": int(time.time()),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+            },
+            "scenarios": {
+                name: run_scenario(name, args.requests, args.concurrency, args.warmup, idp) for name in args.scenario or SCENARIOS
+            },
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Measure the signed session cookie for typical ZITADEL tokens.
+
+Compares Django's JSON serializer with :class:`lib.session_codec.CompactSerializer`,
+with and without a claim allow-list, and reports the cookie size, the size of
+the ``Cookie`` request header and the time to verify and decode the cookie.
+
+Usage::
+
+    python -m bench.session_size
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import timeit
+from typing import Any
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.sessions.serializers import JSONSerializer  # noqa: E402
+from django.core import signing  # noqa: E402
+
+from bench.tokens import token_response, user_claims  # noqa: E402
+from lib.session_codec import CompactSerializer  # noqa: E402
+
+SALT = "django.contrib.sessions.backends.signed_cookies"
+ALLOWED_CLAIMS = {"sub", "name", "email", "preferred_username", "picture"}
+
+
+def session(token: dict[str, Any], claims: set[str] | None = None) -> dict[str, Any]:
+    user = user_claims()
+    if claims is not None:
+        user = {key: value for key, value in user.items() if key in claims}
+    return {
+        "auth_session": {
+            "user": user,
+            "access_token": token["access_token"],
+            "id_token": token["id_token"],
+            "refresh_token": token["refresh_token"],
+            "expires_at": token["expires_at"],
+        }
+    }
+
+
+def measure(data: dict[str, Any], serializer: type, number: int = 2000) -> dict[str, float]:
+    cookie = signing.dumps(data, compress=True, salt=SALT, serializer=serializer)
+    decode = timeit.timeit(lambda: signing.loads(cookie, salt=SALT, serializer=serializer), number=number)
+    return {
+        "cookie_bytes": len(cookie),
+        "header_bytes": len(f"Cookie: {settings.SESSION_COOKIE_NAME}={cookie}"),
+        "decode_us": decode / number * 1e6,
+    }
+
+
+def main() -> None:
+    token = token_response()
+    variants = {
+        "json, all claims": measure(session(token), JSONSerializer),
+        "json, allow-listed claims": measure(session(token, ALLOWED_CLAIMS), JSONSerializer),
+        "compact, all claims": measure(session(token), CompactSerializer),
+        "compact, allow-listed claims": measure(session(token, ALLOWED_CLAIMS), CompactSerializer),
+    }
+
+    baseline = variants["json, all claims"]["cookie_bytes"]
+    out = sys.stdout
+    out.write(f"{'variant':<30} {'cookie':>8} {'header':>8} {'saved':>7} {'decode':>10}\n")
+    for name, result in variants.items():
+        saved = 1 - result["cookie_bytes"] / baseline
+        out.write(
+            f"{name:<30} {result['cookie_bytes']:>7}B {result['header_bytes']:>7}B {saved:>7.0%} {result['decode_us']:>8.1f}us\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure how long process startup spends importing and initializing the app.
+
+Each step runs in a fresh interpreter ``--runs`` times and the median
+wall-clock time is reported, so results include everything a new worker,
+management command or test process pays before its first useful line:
+
+- ``import lib.config``: importing the configuration module
+- ``django.setup()``: loading settings (which reads the configuration) and apps
+- ``import lib.auth``: importing the auth views after setup
+- ``init_oauth()``: registering the OAuth client, which :func:`lib.auth.warm_up`
+  does before fetching discovery and JWKS (not measured: network-bound)
+
+Usage::
+
+    python -m bench.startup --runs 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess  # noqa: S404
+import sys
+from typing import Any
+
+ENV = {
+    "DJANGO_SETTINGS_MODULE": "project.settings",
+    "SESSION_SECRET": "bench-session-secret",
+    "ZITADEL_DOMAIN": "http://127.0.0.1:9",
+    "ZITADEL_CLIENT_ID": "bench-client",
+    "ZITADEL_CLIENT_SECRET": "bench-secret",
+    "ZITADEL_CALLBACK_URL": "http://localhost/auth/callback",
+    "ZITADEL_POST_LOGOUT_URL": "http://localhost/auth/logout/callback",
+}
+
+# Each step is timed after the ones before it have run.
+STEPS = {
+    "import lib.config": "import lib.config",
+    "django.setup()": "import django; django.setup()",
+    "import lib.auth": "import lib.auth",
+    "init_oauth()": "lib.auth.init_oauth()",
+}
+
+PROGRAM = """
+import json, time
+timings = {}
+for name, code in %r.items():
+    start = time.perf_counter()
+    exec(code)
+    timings[name] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def measure(runs: int) -> dict[str, Any]:
+    samples: dict[str, list[float]] = {name: [] for name in STEPS}
+    env = {**os.environ, **ENV}
+    for _ in range(runs):
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", PROGRAM % STEPS], capture_output=True, text=True, check=True, env=env
+        )
+        for name, seconds in json.loads(result.stdout.splitlines()[-1]).items():
+            samples[name].append(seconds)
+
+    return {
+        name: {"median_ms": round(statistics.median(values) * 1000, 2), "min_ms": round(min(values) * 1000, 2)}
+        for name, values in samples.items()
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per measurement (default: 10)")
+    args = parser.parse_args(argv)
+
+    sys.stdout.write(json.dumps({"runs": args.runs, "steps": measure(args.runs)}, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
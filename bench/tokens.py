@@ -0,0 +1,131 @@
+"""Realistic ZITADEL token responses for measurements.
+
+The tokens are signed with a throwaway RSA key and carry the claims ZITADEL
+adds for the ``urn:zitadel:iam:org:project:id:zitadel:aud``, role and
+``urn:zitadel:iam:user:metadata`` scopes, so their size matches what a real
+instance issues for a user with a few roles and metadata entries.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import secrets
+import time
+from typing import Any
+
+from joserfc import jwt
+from joserfc.jwk import RSAKey
+
+ISSUER = "https://example-a1b2c3.zitadel.cloud"
+CLIENT_ID = "281234567890123456@example"
+PROJECT_ID = "281234567890123455"
+ORG_ID = "281234567890123450"
+SUBJECT = "281234567890123499"
+
+
+def user_claims() -> dict[str, Any]:
+    """Profile, role and metadata claims for a typical user."""
+    roles = {role: {ORG_ID: "example.zitadel.cloud"} for role in ("admin", "editor", "viewer", "billing")}
+    metadata = {
+        key: base64.b64encode(value.encode()).decode()
+        for key, value in {"department": "engineering", "cost_center": "CC-4711", "locale_override": "de-CH"}.items()
+    }
+    return {
+        "sub": SUBJECT,
+        "name": "Jane Doe",
+        "given_name": "Jane",
+        "family_name": "Doe",
+        "nickname": "jane",
+        "preferred_username": "jane.doe@example.com",
+        "email": "jane.doe@example.com",
+        "email_verified": True,
+        "locale": "en",
+        "updated_at": 1730000000,
+        "urn:zitadel:iam:org:project:roles": roles,
+        f"urn:zitadel:iam:org:project:{PROJECT_ID}:roles": roles,
+        "urn:zitadel:iam:user:metadata": metadata,
+        "urn:zitadel:iam:user:resourceowner:id": ORG_ID,
+        "urn:zitadel:iam:user:resourceowner:name": "Example",
+        "urn:zitadel:iam:user:resourceowner:primary_domain": "example.zitadel.cloud",
+    }
+
+
+def signing_key() -> RSAKey:
+    return RSAKey.generate_key(2048, parameters={"kid": "281234567890123400", "use": "sig", "alg": "RS256"})
+
+
+def token_response(
+    key: RSAKey | None = None,
+    issuer: str = ISSUER,
+    client_id: str = CLIENT_ID,
+    nonce: str | None = None,
+    expires_in: int = 43199,
+) -> dict[str, Any]:
+    """A token endpoint response with JWT ID and access tokens."""
+    key = key or signing_key()
+    now = int(time.time())
+    header = {"alg": "RS256", "kid": key.kid}
+    protocol = {"iss": issuer, "iat": now, "exp": now + expires_in, "client_id": client_id}
+
+    access_token = jwt.encode(
+        header,
+        {
+            **protocol,
+            "sub": SUBJECT,
+            "aud": [client_id, PROJECT_ID, "281234567890123454"],
+            "jti": "V2_" + secrets.token_hex(9),
+            "nbf": now,
+            "urn:zitadel:iam:org:project:roles": user_claims()["urn:zitadel:iam:org:project:roles"],
+        },
+        key,
+    )
+    digest = hashlib.sha256(access_token.encode("ascii")).digest()
+    at_hash = base64.urlsafe_b64encode(digest[: len(digest) // 2]).rstrip(b"=").decode("ascii")
+    id_token = jwt.encode(
+        header,
+        {
+            **protocol,
+            **user_claims(),
+            "aud": [client_id, PROJECT_ID],
+            "azp": client_id,
+            "auth_time": now,
+            "amr": ["pwd", "mfa", "otp"],
+            "at_hash": at_hash,
+            "sid": "V1_" + secrets.token_hex(9),
+            "nonce": nonce or secrets.token_urlsafe(16),
+        },
+        key,
+    )
+    return {
+        "access_token": access_token,
+        "id_token": id_token,
+        "refresh_token": secrets.token_urlsafe(96),
+        "token_type": "Bearer",
+        "expires_in": expires_in,
+        "expires_at": now + expires_in,
+    }
+
+
+def logout_token(
+    key: RSAKey,
+    issuer: str = ISSUER,
+    client_id: str = CLIENT_ID,
+    sub: str | None = SUBJECT,
+    sid: str | None = None,
+) -> str:
+    """A back-channel logout token for a user and/or one of their sessions."""
+    now = int(time.time())
+    claims: dict[str, Any] = {
+        "iss": issuer,
+        "aud": client_id,
+        "iat": now,
+        "exp": now + 120,
+        "jti": secrets.token_hex(16),
+        "events": {"http://schemas.openid.net/event/backchannel-logout": {}},
+    }
+    if sub:
+        claims["sub"] = sub
+    if sid:
+        claims["sid"] = sid
+    return jwt.encode({"alg": "RS256", "kid": key.kid, "typ": "logout+jwt"}, claims, key)
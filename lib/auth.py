@@ -4,35 +4,208 @@ from __future__ import annotations
 
 import logging
 import secrets
+import threading
+import time
 from typing import Any, cast
 from urllib.parse import urlencode
 
-from authlib.integrations.django_client import OAuth
+from asgiref.sync import sync_to_async
+from authlib.integrations.base_client import OAuthError
+from authlib.integrations.django_client import DjangoIntegration, DjangoOAuth2App, OAuth
 from django.http import HttpRequest, HttpResponse, JsonResponse
-from django.shortcuts import redirect, render
+from django.shortcuts import redirect
 from django.views.decorators.http import require_GET, require_POST
 
 from lib.config import config
+from lib.context import aget_auth, get_auth
+from lib.csrf import forget as forget_csrf
+from lib.csrf import token_response as csrf_token_response
+from lib.csrf import verify as verify_csrf
+from lib.discovery import MetadataStore
 from lib.guard import require_auth
+from lib.http_client import HttpClient, get_http_client, new_http_client
+from lib.jwks import KeyStore
 from lib.message import get_message
+from lib.metadata import METADATA_CLAIM, decode_metadata
+from lib.metrics import CSRF_FAILURES, LOGOUT_STATE_FAILURES, phase
+from lib.pages import render_page
+from lib.revocation import new_session_fields, revoke_session, track_session
+from lib.roles import role_index
 from lib.scopes import ZITADEL_SCOPES
+from lib.tenants import ClientRegistry, Tenant, active_tenant, current_tenant
+from lib.userinfo import aget_userinfo, get_userinfo, userinfo_response
+from lib.userinfo import ainvalidate as ainvalidate_userinfo
+from lib.userinfo import invalidate as invalidate_userinfo
 
 logger = logging.getLogger(__name__)
 
-oauth = OAuth()
+_init_lock = threading.Lock()
+
+
+class LazyOAuth(OAuth):
+    """Authlib registry that registers the ZITADEL client on first use.
+
+    Importing this module then neither reads the configuration nor builds the
+    client; :func:`warm_up` does both explicitly when a worker starts. While a
+    tenant from ``ZITADEL_TENANTS_FILE`` is active, ``zitadel`` is that
+    tenant's client from :data:`tenant_clients` instead.
+    """
+
+    def __getattr__(self, key: str) -> Any:
+        if key == "zitadel":
+            tenant = active_tenant()
+            if tenant is not None:
+                return tenant_clients.get(tenant)
+            if key not in self._registry:
+                init_oauth()
+        return super().__getattr__(key)
+
+
+oauth = LazyOAuth()
+
+# Claims that describe the ID token itself rather than the user. They are
+# dropped when the session's user claims are built from a verified ID token.
+ID_TOKEN_CLAIMS = frozenset(
+    {"iss", "aud", "exp", "iat", "nbf", "jti", "nonce", "at_hash", "c_hash", "azp", "auth_time", "amr", "acr", "sid", "client_id"}
+)
 
 
 def get_well_known_url(domain: str) -> str:
     return f"{domain}/.well-known/openid-configuration"
 
 
+class ZitadelApp(DjangoOAuth2App):
+    """Authlib Django client that reads discovery metadata and keys from shared stores.
+
+    The ``server_metadata_url`` is handed to a :class:`MetadataStore` instead of
+    Authlib, so every metadata lookup (including the ones Authlib performs
+    internally during the code exchange) is served from the cache. Signing keys
+    are held in a :class:`KeyStore`, which Authlib also uses to validate the ID
+    token returned by the code exchange. All HTTP traffic, including the
+    sessions Authlib creates internally, goes through the shared pooled client.
+    """
+
+    def __init__(
+        self,
+        framework: Any,
+        name: str | None = None,
+        server_metadata_url: str | None = None,
+        http: HttpClient | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(framework, name, **kwargs)
+        self.http = http or get_http_client()
+        self.metadata_store = (
+            MetadataStore(server_metadata_url, default_ttl=config.ZITADEL_METADATA_TTL, session=self.http.session)
+            if server_metadata_url
+            else None
+        )
+        self.key_store = KeyStore(
+            lambda: self.load_server_metadata()["jwks_uri"],
+            min_refresh_interval=config.ZITADEL_JWKS_MIN_REFRESH,
+            session=self.http.session,
+        )
+
+    def _get_session(self) -> Any:
+        return self.http.mount(super()._get_session())
+
+    def _get_oauth_client(self, **metadata: Any) -> Any:
+        return self.http.mount(super()._get_oauth_client(**metadata))
+
+    def load_server_metadata(self) -> dict[str, Any]:
+        if self.metadata_store is None:
+            return cast(dict[str, Any], self.server_metadata)
+        metadata = dict(self.metadata_store.get())
+        metadata.update(self.server_metadata)
+        return metadata
+
+    async def aload_server_metadata(self) -> dict[str, Any]:
+        """Async variant of :meth:`load_server_metadata`.
+
+        Only a cold cache needs a blocking fetch, which then runs in a worker
+        thread; afterwards this returns without leaving the event loop.
+        """
+        if self.metadata_store is None or self.metadata_store.is_loaded:
+            return self.load_server_metadata()
+        return await sync_to_async(self.load_server_metadata, thread_sensitive=False)()
+
+    async def aauthorize_access_token(self, request: HttpRequest) -> dict[str, Any]:
+        """Async variant of ``authorize_access_token`` for the login callback.
+
+        The authorization code is exchanged through the async client. The ID
+        token is validated against the cached JWKS, exactly as Authlib does it.
+
+        Raises:
+            OAuthError: If ZITADEL returned an error or the state does not match
+            httpx.HTTPStatusError: If the token endpoint rejected the exchange
+        """
+        error = request.GET.get("error")
+        if error:
+            raise OAuthError(error=error, description=request.GET.get("error_description"))
+
+        state = request.GET.get("state")
+        state_data = await sync_to_async(self.framework.get_state_data)(request.session, state)
+        await sync_to_async(self.framework.clear_state_data)(request.session, state)
+        params = self._format_state_params(state_data, {"code": request.GET.get("code"), "state": state})
+
+        metadata = await self.aload_server_metadata()
+        response = await self.http.aio.request(
+            "POST",
+            metadata["token_endpoint"],
+            data={"grant_type": "authorization_code", **params},
+            auth=(self.client_id, self.client_secret),
+        )
+        response.raise_for_status()
+
+        token: dict[str, Any] = response.json()
+        if "expires_in" in token and "expires_at" not in token:
+            token["expires_at"] = int(time.time()) + int(token["expires_in"])
+        if "id_token" in token and "nonce" in state_data:
+            parse_id_token = sync_to_async(self.parse_id_token, thread_sensitive=False)
+            token["userinfo"] = await parse_id_token(token, nonce=state_data["nonce"])
+        return token
+
+    def fetch_jwk_set(self, force: bool = False) -> dict[str, Any]:
+        return self.key_store.get_key_set(force=force)
+
+    def verify_token(self, token: str, audience: str | None = None) -> dict[str, Any]:
+        """Verify a ZITADEL-issued JWT locally and return its claims."""
+        metadata = self.load_server_metadata()
+        return self.key_store.verify(
+            token,
+            issuer=metadata["issuer"],
+            audience=audience or self.client_id,
+            algorithms=metadata.get("id_token_signing_alg_values_supported"),
+        )
+
+
 def init_oauth() -> None:
     """Initialize OAuth client with Django configuration."""
-    oauth.register(
-        name="zitadel",
-        client_id=config.ZITADEL_CLIENT_ID,
-        client_secret=config.ZITADEL_CLIENT_SECRET,
-        server_metadata_url=get_well_known_url(config.ZITADEL_DOMAIN),
+    with _init_lock:
+        if "zitadel" in oauth._registry:
+            return
+        oauth.register(
+            name="zitadel",
+            client_cls=ZitadelApp,
+            client_id=config.ZITADEL_CLIENT_ID,
+            client_secret=config.ZITADEL_CLIENT_SECRET,
+            server_metadata_url=get_well_known_url(config.ZITADEL_DOMAIN),
+            client_kwargs={
+                "scope": ZITADEL_SCOPES,
+                "code_challenge_method": "S256",
+            },
+        )
+
+
+def _create_tenant_client(tenant: Tenant) -> ZitadelApp:
+    """Build a tenant's client with its own caches, connection pools and circuit breaker."""
+    return ZitadelApp(
+        DjangoIntegration("zitadel"),
+        "zitadel",
+        client_id=tenant.client_id,
+        client_secret=tenant.client_secret,
+        server_metadata_url=get_well_known_url(tenant.domain),
+        http=new_http_client(),
         client_kwargs={
             "scope": ZITADEL_SCOPES,
             "code_challenge_method": "S256",
@@ -40,15 +213,69 @@ def init_oauth() -> None:
     )
 
 
-init_oauth()
+tenant_clients = ClientRegistry(_create_tenant_client)
+
+
+def warm_up() -> None:
+    """Register the client and load remote OIDC state so the first request does not wait for it."""
+    init_oauth()
+    if oauth.zitadel.metadata_store is not None and oauth.zitadel.metadata_store.prime():
+        try:
+            oauth.zitadel.key_store.get_key_set()
+        except Exception as e:
+            logger.warning("Could not prime JWKS: %s", str(e))
+
+
+def get_user_claims(token: dict[str, Any]) -> dict[str, Any]:
+    """Build the user claims stored in the session from a token response.
+
+    Authlib has already verified the ID token against the cached JWKS during
+    the code exchange and placed its claims under ``userinfo``. Those claims are
+    used directly unless the userinfo endpoint is configured as the source, or
+    the ID token carries nothing but the subject (ZITADEL only includes profile
+    claims when "User Info inside ID Token" is enabled for the application).
+    """
+    user = _id_token_user(token)
+    if user is not None:
+        return user
+
+    return dict(oauth.zitadel.userinfo(token=token))
+
+
+async def aget_user_claims(token: dict[str, Any]) -> dict[str, Any]:
+    """Async variant of :func:`get_user_claims`."""
+    user = _id_token_user(token)
+    if user is not None:
+        return user
+
+    metadata = await oauth.zitadel.aload_server_metadata()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    response = await oauth.zitadel.http.aio.request("GET", metadata["userinfo_endpoint"], headers=headers)
+    response.raise_for_status()
+    return cast(dict[str, Any], response.json())
+
+
+def session_claims(userinfo: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the claims allowed by ``SESSION_USER_CLAIMS`` (plus ``sub``)."""
+    allowed = config.SESSION_USER_CLAIMS
+    if not allowed:
+        return userinfo
+    return {key: value for key, value in userinfo.items() if key in allowed or key == "sub"}
+
+
+def _id_token_user(token: dict[str, Any]) -> dict[str, Any] | None:
+    id_claims = token.get("userinfo") or {}
+    user = {key: value for key, value in id_claims.items() if key not in ID_TOKEN_CLAIMS}
+
+    if config.ZITADEL_USERINFO_SOURCE == "id_token" and set(user) - {"sub"}:
+        return user
+    return None
 
 
 @require_GET
 def csrf(request: HttpRequest) -> JsonResponse:
-    """Generate CSRF token for form submissions."""
-    if "csrf_token" not in request.session:
-        request.session["csrf_token"] = secrets.token_urlsafe(32)
-    return JsonResponse({"csrfToken": request.session["csrf_token"]})
+    """Generate a stateless CSRF token for the sign-in form, see :mod:`lib.csrf`."""
+    return csrf_token_response(request)
 
 
 @require_GET
@@ -62,59 +289,71 @@ def signin(request: HttpRequest) -> HttpResponse:
             "signinUrl": "/auth/signin/zitadel",
         }
     ]
-    return render(
+    callback_url = request.GET.get("callbackUrl")
+    return render_page(
         request,
         "auth/signin.html",
         {
             "providers": providers,
-            "callbackUrl": request.GET.get("callbackUrl") or config.ZITADEL_POST_LOGIN_URL,
+            "callbackUrl": callback_url or current_tenant().post_login_url,
             "message": get_message(error, "signin-error") if error else None,
         },
+        # Arbitrary callback URLs would crowd the shared pages out of the cache.
+        cache=not callback_url,
     )
 
 
 @require_POST
 def signin_zitadel(request: HttpRequest) -> HttpResponse:
     """Initiate OAuth 2.0 authorization flow with PKCE."""
-    csrf_token = request.POST.get("csrfToken")
-    stored_token = request.session.get("csrf_token")
-
-    if not csrf_token or not stored_token or not secrets.compare_digest(csrf_token, stored_token):
+    if not verify_csrf(request):
         logger.warning("CSRF token validation failed")
+        CSRF_FAILURES.inc()
         return redirect("/auth/signin?error=verification")
 
-    request.session.pop("csrf_token", None)
-    request.session["post_login_url"] = request.POST.get("callbackUrl", config.ZITADEL_POST_LOGIN_URL)
+    tenant = current_tenant()
+    request.session["post_login_url"] = request.POST.get("callbackUrl", tenant.post_login_url)
 
-    redirect_uri = config.ZITADEL_CALLBACK_URL
+    redirect_uri = tenant.callback_url
     logger.info("Initiating OAuth authorization flow")
-    return cast(HttpResponse, oauth.zitadel.authorize_redirect(request, redirect_uri))
+    response = cast(HttpResponse, oauth.zitadel.authorize_redirect(request, redirect_uri))
+    forget_csrf(request, response)
+    return response
 
 
 @require_GET
 def callback(request: HttpRequest) -> HttpResponse:
     """Handle OAuth 2.0 callback from ZITADEL."""
     try:
-        token = oauth.zitadel.authorize_access_token(request)
+        with phase("token_exchange"):
+            token = oauth.zitadel.authorize_access_token(request)
 
-        userinfo = oauth.zitadel.userinfo(token=token)  # Add token parameter
+        with phase("userinfo"):
+            userinfo = get_user_claims(token)
+
+        post_login_url = _start_session(request, token, userinfo)
+        track_session(request.session["auth_session"])
+        return redirect(post_login_url)
+
+    except Exception as e:
+        logger.exception("Token exchange failed: %s", str(e))
+        return redirect("/auth/error?error=callback")
 
-        old_session_data = dict(request.session)
-        request.session.clear()
-        for key, value in old_session_data.items():
-            if key in ("post_login_url",):
-                request.session[key] = value
-
-        request.session["auth_session"] = {
-            "user": userinfo,
-            "access_token": token.get("access_token"),
-            "id_token": token.get("id_token"),
-            "refresh_token": token.get("refresh_token"),
-            "expires_at": token.get("expires_at"),
-        }
 
-        post_login_url = request.session.pop("post_login_url", config.ZITADEL_POST_LOGIN_URL)
-        logger.info(f"Authentication successful for user: {userinfo.get('sub')}")
+@require_GET
+async def acallback(request: HttpRequest) -> HttpResponse:
+    """Handle OAuth 2.0 callback from ZITADEL without blocking the event loop."""
+    try:
+        with phase("token_exchange"):
+            token = await oauth.zitadel.aauthorize_access_token(request)
+
+        with phase("userinfo"):
+            userinfo = await aget_user_claims(token)
+
+        # The session was loaded while reading the state, so from here on it
+        # is only modified in memory.
+        post_login_url = _start_session(request, token, userinfo)
+        await sync_to_async(track_session)(request.session["auth_session"])
         return redirect(post_login_url)
 
     except Exception as e:
@@ -122,33 +361,95 @@ def callback(request: HttpRequest) -> HttpResponse:
         return redirect("/auth/error?error=callback")
 
 
+def _start_session(request: HttpRequest, token: dict[str, Any], userinfo: dict[str, Any]) -> str:
+    """Replace the session contents with the new login and return the post-login URL."""
+    old_session_data = dict(request.session)
+    request.session.clear()
+    for key, value in old_session_data.items():
+        if key in ("post_login_url",):
+            request.session[key] = value
+
+    request.session["auth_session"] = {
+        # Metadata is kept decoded under its own key rather than as base64 claims.
+        "user": {key: value for key, value in session_claims(userinfo).items() if key != METADATA_CLAIM},
+        "access_token": token.get("access_token"),
+        "id_token": token.get("id_token"),
+        "refresh_token": token.get("refresh_token"),
+        "expires_at": token.get("expires_at"),
+        "roles": role_index(userinfo),
+        "metadata": decode_metadata(userinfo),
+        **new_session_fields(token),
+    }
+    tenant = current_tenant()
+    if tenant.key:
+        request.session["auth_session"]["tenant"] = tenant.key
+
+    post_login_url: str = request.session.pop("post_login_url", tenant.post_login_url)
+    logger.info(f"Authentication successful for user: {userinfo.get('sub')}")
+    return post_login_url
+
+
 @require_POST
 def logout(request: HttpRequest) -> HttpResponse:
     """Initiate logout flow with ZITADEL."""
     try:
         logout_state = secrets.token_urlsafe(32)
+        auth_session = get_auth(request).as_dict()
+        invalidate_userinfo(auth_session)
+        end_session(auth_session)
         request.session["logout_state"] = logout_state
 
         metadata = oauth.zitadel.load_server_metadata()
-        end_session_endpoint = metadata.get("end_session_endpoint")
-
-        if end_session_endpoint:
-            params = {
-                "post_logout_redirect_uri": config.ZITADEL_POST_LOGOUT_URL,
-                "client_id": config.ZITADEL_CLIENT_ID,
-                "state": logout_state,
-            }
-            logout_url = f"{end_session_endpoint}?{urlencode(params)}"
-            logger.info("Initiating logout flow")
-            return redirect(logout_url)
+        return _end_session_redirect(request, metadata, logout_state)
 
+    except Exception as e:
+        logger.exception("Logout initiation failed: %s", str(e))
         request.session.clear()
-        return redirect(config.ZITADEL_POST_LOGOUT_URL)
+        return redirect(current_tenant().post_logout_url)
+
+
+@require_POST
+async def alogout(request: HttpRequest) -> HttpResponse:
+    """Initiate logout flow with ZITADEL without blocking the event loop."""
+    try:
+        logout_state = secrets.token_urlsafe(32)
+        auth_session = (await aget_auth(request)).as_dict()
+        await ainvalidate_userinfo(auth_session)
+        await sync_to_async(end_session)(auth_session)
+        await request.session.aset("logout_state", logout_state)
+
+        metadata = await oauth.zitadel.aload_server_metadata()
+        return _end_session_redirect(request, metadata, logout_state)
 
     except Exception as e:
         logger.exception("Logout initiation failed: %s", str(e))
         request.session.clear()
-        return redirect(config.ZITADEL_POST_LOGOUT_URL)
+        return redirect(current_tenant().post_logout_url)
+
+
+def end_session(auth_session: dict[str, Any]) -> None:
+    """Revoke a session that is logging out, on every node, along with its refresh token."""
+    sub = (auth_session.get("user") or {}).get("sub")
+    if sub and auth_session.get("sid"):
+        revoke_session(sub, auth_session["sid"], auth_session.get("refresh_token"))
+
+
+def _end_session_redirect(request: HttpRequest, metadata: dict[str, Any], logout_state: str) -> HttpResponse:
+    tenant = current_tenant()
+    end_session_endpoint = metadata.get("end_session_endpoint")
+
+    if end_session_endpoint:
+        params = {
+            "post_logout_redirect_uri": tenant.post_logout_url,
+            "client_id": tenant.client_id,
+            "state": logout_state,
+        }
+        logout_url = f"{end_session_endpoint}?{urlencode(params)}"
+        logger.info("Initiating logout flow")
+        return redirect(logout_url)
+
+    request.session.clear()
+    return redirect(tenant.post_logout_url)
 
 
 @require_GET
@@ -163,21 +464,21 @@ def logout_callback(request: HttpRequest) -> HttpResponse:
         return redirect("/auth/logout/success")
 
     logger.warning("Logout state validation failed")
-    reason = "Invalid or missing state parameter."
-    return redirect(f"/auth/logout/error?reason={reason}")
+    LOGOUT_STATE_FAILURES.inc()
+    return redirect("/auth/logout/error?reason=state")
 
 
 @require_GET
 def logout_success(request: HttpRequest) -> HttpResponse:
     """Display logout success page."""
-    return render(request, "auth/logout/success.html")
+    return render_page(request, "auth/logout/success.html")
 
 
 @require_GET
 def logout_error(request: HttpRequest) -> HttpResponse:
     """Display logout error page."""
-    reason = request.GET.get("reason", "An unknown error occurred.")
-    return render(request, "auth/logout/error.html", {"reason": reason})
+    msg = get_message(request.GET.get("reason"), "logout-error")
+    return render_page(request, "auth/logout/error.html", msg)
 
 
 @require_GET
@@ -185,31 +486,45 @@ def error_page(request: HttpRequest) -> HttpResponse:
     """Display authentication error page."""
     error_code = request.GET.get("error")
     msg = get_message(error_code, "auth-error")
-    return render(request, "auth/error.html", msg)
+    return render_page(request, "auth/error.html", msg)
 
 
 @require_GET
 @require_auth
-def userinfo(request: HttpRequest) -> JsonResponse:
-    """Fetch fresh user information from ZITADEL."""
-    auth_session = request.session.get("auth_session", {})
-    access_token = auth_session.get("access_token")
+def userinfo(request: HttpRequest) -> HttpResponse:
+    """Return the user's claims from ZITADEL, cached for ZITADEL_USERINFO_CACHE_TTL seconds."""
+    auth = get_auth(request)
+    access_token = auth.access_token
 
     if not access_token:
         logger.warning("Userinfo request without access token")
         return JsonResponse({"error": "No access token available"}, status=401)
 
     try:
-        metadata = oauth.zitadel.load_server_metadata()
-        userinfo_endpoint = metadata.get("userinfo_endpoint")
+        with phase("userinfo"):
+            claims = get_userinfo(auth.sub, access_token)
+        return userinfo_response(request, claims)
+
+    except Exception as e:
+        logger.exception("Userinfo fetch failed: %s", str(e))
+        return JsonResponse({"error": "Failed to fetch user info"}, status=500)
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-        response = oauth.zitadel._client.get(userinfo_endpoint, headers=headers)
-        response.raise_for_status()
 
-        logger.info("Userinfo fetched successfully")
-        result: dict[str, Any] = response.json()
-        return JsonResponse(result)
+@require_GET
+@require_auth
+async def auserinfo(request: HttpRequest) -> HttpResponse:
+    """Return the user's claims from ZITADEL without blocking the event loop."""
+    auth = await aget_auth(request)
+    access_token = auth.access_token
+
+    if not access_token:
+        logger.warning("Userinfo request without access token")
+        return JsonResponse({"error": "No access token available"}, status=401)
+
+    try:
+        with phase("userinfo"):
+            claims = await aget_userinfo(auth.sub, access_token)
+        return userinfo_response(request, claims)
 
     except Exception as e:
         logger.exception("Userinfo fetch failed: %s", str(e))
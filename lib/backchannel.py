@@ -0,0 +1,149 @@
+"""OpenID Connect Back-Channel Logout receiver.
+
+ZITADEL POSTs a signed logout token to ``/auth/backchannel-logout`` when a
+user's IdP session ends. The token is verified against the cached JWKS (no
+call to ZITADEL unless its key is new), checked against the Back-Channel
+Logout 1.0 rules and de-duplicated by ``jti``. The request is then answered
+immediately and the logout is handed to :data:`logout_queue`.
+
+A single background thread drains the queue and applies up to
+``BATCH_SIZE`` logouts at a time through :func:`lib.revocation.revoke_batch`:
+one cache write for all revocation markers and one bulk call to the token
+revocation endpoint per tenant. A burst of IdP-initiated logouts therefore costs request
+workers only the signature check. Queued logouts that have not been applied
+when the process exits are lost; ZITADEL has already ended the IdP session.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Any
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
+
+from lib.config import config
+from lib.revocation import revoke_batch
+from lib.tenants import Tenant, active_tenant, using
+
+logger = logging.getLogger(__name__)
+
+LOGOUT_EVENT = "http://schemas.openid.net/event/backchannel-logout"
+
+BATCH_SIZE = 100
+# How long the worker waits for more logouts before applying a partial batch.
+BATCH_WAIT = 0.05
+
+Target = tuple[str | None, str | None]
+Item = tuple[Tenant | None, Target]
+
+
+class LogoutTokenError(Exception):
+    """The logout token is invalid and no session was ended."""
+
+
+def validate_logout_token(logout_token: str) -> dict[str, Any]:
+    """Verify a logout token and return its claims.
+
+    Raises:
+        LogoutTokenError: If the signature, issuer, audience or expiry is
+            invalid, a required claim is missing, or the token was seen before
+    """
+    from lib.auth import oauth
+
+    try:
+        claims = oauth.zitadel.verify_token(logout_token)
+    except Exception as e:
+        raise LogoutTokenError(f"Token verification failed: {e}") from e
+
+    events = claims.get("events")
+    if not isinstance(events, dict) or LOGOUT_EVENT not in events:
+        raise LogoutTokenError("Missing back-channel logout event")
+    if not claims.get("sub") and not claims.get("sid"):
+        raise LogoutTokenError("Token names neither sub nor sid")
+    if "nonce" in claims:
+        raise LogoutTokenError("Logout tokens must not contain a nonce")
+    if not claims.get("jti") or "iat" not in claims:
+        raise LogoutTokenError("Missing jti or iat")
+    if not cache.add(f"zitadel:logout-jti:{claims['jti']}", 1, timeout=config.SESSION_DURATION):
+        raise LogoutTokenError("Logout token was already used")
+    return claims
+
+
+class LogoutQueue:
+    """Logouts waiting to be applied, drained in batches by a daemon thread."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT) -> None:
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue: queue.Queue[Item] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, sub: str | None, sid: str | None) -> None:
+        self._queue.put((active_tenant(), (sub, sid)))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="backchannel-logout", daemon=True)
+                    self._thread.start()
+
+    def join(self) -> None:
+        """Block until every submitted logout has been applied."""
+        self._queue.join()
+
+    def _next_batch(self) -> list[Item]:
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            by_tenant: dict[Tenant | None, list[Target]] = {}
+            for tenant, target in batch:
+                by_tenant.setdefault(tenant, []).append(target)
+            for tenant, targets in by_tenant.items():
+                try:
+                    with using(tenant):
+                        revoke_batch(targets)
+                except Exception as e:
+                    logger.exception("Applying %d back-channel logouts failed: %s", len(targets), str(e))
+            for _ in batch:
+                self._queue.task_done()
+
+
+logout_queue = LogoutQueue()
+
+
+@require_POST
+def backchannel_logout(request: HttpRequest) -> HttpResponse:
+    """Accept a logout token from ZITADEL and queue the logout it describes."""
+    logout_token = request.POST.get("logout_token")
+    if not logout_token:
+        return _error("Missing logout_token")
+
+    try:
+        claims = validate_logout_token(logout_token)
+    except LogoutTokenError as e:
+        logger.warning("Back-channel logout rejected: %s", str(e))
+        return _error(str(e))
+
+    logout_queue.submit(claims.get("sub"), claims.get("sid"))
+    logger.info("Back-channel logout queued")
+    response = HttpResponse()
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _error(description: str) -> JsonResponse:
+    response = JsonResponse({"error": "invalid_request", "error_description": description}, status=400)
+    response["Cache-Control"] = "no-store"
+    return response
@@ -3,6 +3,11 @@
 This module loads and validates all required environment variables for the
 application. It follows a fail-fast approach: if any required configuration
 is missing, the application will not start.
+
+Nothing is read at import time. ``.env`` is loaded and :class:`Config` is built
+on the first attribute access of :data:`config`, which Django's settings module
+does when the process starts, and :meth:`LazyConfig.reload` makes the next
+access read the environment again.
 """
 
 from __future__ import annotations
@@ -11,9 +16,7 @@ import os
 from typing import Optional
 from urllib.parse import urlparse
 
-from dotenv import load_dotenv
-
-load_dotenv()
+from django.utils.functional import LazyObject, empty
 
 
 def must(name: str) -> str:
@@ -55,8 +58,68 @@ class Config:
         ZITADEL_POST_LOGOUT_URL: URL to redirect after logout from ZITADEL
         SESSION_SECRET: Secret key for signing session cookies
         SESSION_DURATION: Session lifetime in seconds (default: 3600)
+        SESSION_STORE: Where session data lives, 'cookie' (signed cookie) or
+            'cache' (server-side, the cookie only holds an ID) (default: 'cookie')
+        SESSION_USER_CLAIMS: User claims kept in the session, as a set parsed from
+            a comma-separated list; empty keeps all claims (default: empty)
+        REDIS_URL: Redis server backing the Django cache; a per-process memory
+            cache is used when unset (optional)
         PORT: Network port for the Django server (optional)
         PY_ENV: Application environment ('development' or 'production')
+        ZITADEL_METADATA_TTL: Seconds to cache the OIDC discovery document when
+            ZITADEL does not send a Cache-Control max-age (default: 3600)
+        ZITADEL_JWKS_MIN_REFRESH: Minimum seconds between JWKS re-fetches caused
+            by tokens with an unknown key ID (default: 60)
+        ZITADEL_USERINFO_SOURCE: Where login builds the user claims from,
+            'id_token' (verified locally) or 'userinfo' (default: 'id_token')
+        ZITADEL_REFRESH_SHARED_LOCK: Coordinate token refreshes across processes
+            through the Django cache (default: False)
+        ZITADEL_REFRESH_LOCK_TIMEOUT: Seconds to wait for a concurrent refresh of
+            the same refresh token (default: 10)
+        ZITADEL_REFRESH_REUSE_WINDOW: Seconds a refresh result is reused for
+            requests still carrying the old refresh token (default: 30)
+        ZITADEL_REFRESH_SKEW: Seconds before expiry at which access tokens are
+            refreshed (default: 60)
+        ZITADEL_REFRESH_JITTER: Upper bound of the per-session number of seconds
+            added to the skew, to spread refreshes out (default: 30)
+        ZITADEL_REFRESH_IN_BACKGROUND: Refresh tokens that are about to expire in
+            a background thread instead of during the request (default: False)
+        ZITADEL_HTTP_POOL_SIZE: Keep-alive connections to ZITADEL per worker
+            (default: 10)
+        ZITADEL_HTTP_CONNECT_TIMEOUT: Connect timeout for IdP calls in seconds
+            (default: 3.05)
+        ZITADEL_HTTP_READ_TIMEOUT: Read timeout for IdP calls in seconds
+            (default: 10)
+        ZITADEL_HTTP_RETRIES: Retries for idempotent IdP calls (default: 2)
+        ZITADEL_HTTP_BREAKER_THRESHOLD: Consecutive IdP failures that open the
+            circuit breaker (default: 5)
+        ZITADEL_HTTP_BREAKER_RESET: Seconds before an open circuit breaker lets a
+            trial call through (default: 30)
+        ZITADEL_HTTP_ASYNC_POOL_SIZE: Connections to ZITADEL per event loop used
+            by async views (default: 100)
+        ZITADEL_USERINFO_CACHE_TTL: Seconds /auth/userinfo serves cached claims
+            before asking ZITADEL again; 0 disables the cache (default: 60)
+        ZITADEL_USERINFO_REVALIDATE: Revalidate expired claims with
+            If-None-Match when ZITADEL sent an ETag (default: True)
+        STATIC_ROOT: Directory `manage.py collectstatic` writes fingerprinted,
+            precompressed assets to and production serves them from
+            (default: build/static)
+        ZITADEL_REVOKE_TOKENS: Revoke refresh tokens at ZITADEL when a session
+            ends through logout or revocation (default: True)
+        JINJA_BYTECODE_DIR: Directory for compiled template bytecode, filled by
+            `manage.py compile_templates` and read in production (optional)
+        PAGE_CACHE_SIZE: Rendered public pages kept per process; 0 disables
+            the render cache (default: 256)
+        METRICS_ENABLED: Collect timings and counters for the auth flows and
+            serve them on /metrics (default: False)
+        ASYNC_VIEWS: Serve the auth callback, userinfo and logout endpoints with
+            async views (default: False; enabled by project.asgi)
+        ZITADEL_TENANTS_FILE: JSON file with the ZITADEL clients of additional
+            tenants, selected by request host or path prefix (optional)
+        ZITADEL_TENANT_CACHE_SIZE: Tenant clients, with their discovery, JWKS
+            and connection pool caches, kept per process (default: 64)
+        CSRF_TOKEN_MAX_AGE: Seconds a sign-in CSRF token from /auth/csrf stays
+            valid (default: 600)
     """
 
     def __init__(self) -> None:
@@ -70,8 +133,58 @@ class Config:
         self.ZITADEL_POST_LOGOUT_URL: str = os.getenv("ZITADEL_POST_LOGOUT_URL", "/")
         self.SESSION_SECRET: str = must("SESSION_SECRET")
         self.SESSION_DURATION: int = int(os.getenv("SESSION_DURATION", "3600"))
+        self.SESSION_STORE: str = os.getenv("SESSION_STORE", "cookie")
+        self.SESSION_USER_CLAIMS: frozenset[str] = frozenset(
+            claim.strip() for claim in os.getenv("SESSION_USER_CLAIMS", "").split(",") if claim.strip()
+        )
+        self.REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
         self.PORT: Optional[str] = os.getenv("PORT")
         self.PY_ENV: Optional[str] = os.getenv("PY_ENV")
-
-
-config = Config()
+        self.ZITADEL_METADATA_TTL: int = int(os.getenv("ZITADEL_METADATA_TTL", "3600"))
+        self.ZITADEL_JWKS_MIN_REFRESH: int = int(os.getenv("ZITADEL_JWKS_MIN_REFRESH", "60"))
+        self.ZITADEL_USERINFO_SOURCE: str = os.getenv("ZITADEL_USERINFO_SOURCE", "id_token")
+        self.ZITADEL_REFRESH_SHARED_LOCK: bool = os.getenv("ZITADEL_REFRESH_SHARED_LOCK", "false").lower() == "true"
+        self.ZITADEL_REFRESH_LOCK_TIMEOUT: int = int(os.getenv("ZITADEL_REFRESH_LOCK_TIMEOUT", "10"))
+        self.ZITADEL_REFRESH_REUSE_WINDOW: int = int(os.getenv("ZITADEL_REFRESH_REUSE_WINDOW", "30"))
+        self.ZITADEL_REFRESH_SKEW: int = int(os.getenv("ZITADEL_REFRESH_SKEW", "60"))
+        self.ZITADEL_REFRESH_JITTER: int = int(os.getenv("ZITADEL_REFRESH_JITTER", "30"))
+        self.ZITADEL_REFRESH_IN_BACKGROUND: bool = os.getenv("ZITADEL_REFRESH_IN_BACKGROUND", "false").lower() == "true"
+        self.ZITADEL_HTTP_POOL_SIZE: int = int(os.getenv("ZITADEL_HTTP_POOL_SIZE", "10"))
+        self.ZITADEL_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("ZITADEL_HTTP_CONNECT_TIMEOUT", "3.05"))
+        self.ZITADEL_HTTP_READ_TIMEOUT: float = float(os.getenv("ZITADEL_HTTP_READ_TIMEOUT", "10"))
+        self.ZITADEL_HTTP_RETRIES: int = int(os.getenv("ZITADEL_HTTP_RETRIES", "2"))
+        self.ZITADEL_HTTP_BREAKER_THRESHOLD: int = int(os.getenv("ZITADEL_HTTP_BREAKER_THRESHOLD", "5"))
+        self.ZITADEL_HTTP_BREAKER_RESET: float = float(os.getenv("ZITADEL_HTTP_BREAKER_RESET", "30"))
+        self.ZITADEL_HTTP_ASYNC_POOL_SIZE: int = int(os.getenv("ZITADEL_HTTP_ASYNC_POOL_SIZE", "100"))
+        self.ZITADEL_USERINFO_CACHE_TTL: int = int(os.getenv("ZITADEL_USERINFO_CACHE_TTL", "60"))
+        self.ZITADEL_USERINFO_REVALIDATE: bool = os.getenv("ZITADEL_USERINFO_REVALIDATE", "true").lower() == "true"
+        self.STATIC_ROOT: Optional[str] = os.getenv("STATIC_ROOT")
+        self.ZITADEL_REVOKE_TOKENS: bool = os.getenv("ZITADEL_REVOKE_TOKENS", "true").lower() == "true"
+        self.JINJA_BYTECODE_DIR: Optional[str] = os.getenv("JINJA_BYTECODE_DIR")
+        self.PAGE_CACHE_SIZE: int = int(os.getenv("PAGE_CACHE_SIZE", "256"))
+        self.METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+        self.ASYNC_VIEWS: bool = os.getenv("ASYNC_VIEWS", "false").lower() == "true"
+        self.ZITADEL_TENANTS_FILE: Optional[str] = os.getenv("ZITADEL_TENANTS_FILE")
+        self.ZITADEL_TENANT_CACHE_SIZE: int = int(os.getenv("ZITADEL_TENANT_CACHE_SIZE", "64"))
+        self.CSRF_TOKEN_MAX_AGE: int = int(os.getenv("CSRF_TOKEN_MAX_AGE", "600"))
+
+
+class LazyConfig(LazyObject):
+    """A :class:`Config` built on first use."""
+
+    def _setup(self) -> None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        self._wrapped = Config()
+
+    def reload(self) -> None:
+        """Discard the current values; the next access reads the environment again.
+
+        Objects already built from the configuration, such as the OAuth and HTTP
+        clients, keep the values they were created with.
+        """
+        self._wrapped = empty
+
+
+config: Config = LazyConfig()  # type: ignore[assignment]
@@ -0,0 +1,176 @@
+"""The request's authentication state, read from the session once.
+
+:class:`AuthContextMiddleware` reads ``auth_session`` from the session once
+per request and attaches it to ``request.auth`` as an immutable
+:class:`AuthContext`. Views, ``require_auth``, the role checks and the
+metadata accessors all read from it instead of looking the session up and
+re-checking it themselves. After a token refresh ``require_auth`` replaces
+``request.auth`` with a new context.
+
+Requests for static assets and other paths in :data:`SKIP_PATHS` never touch
+the session; they get :data:`ANONYMOUS`.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, NoReturn, cast
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest
+
+from lib.metadata import UserMetadata
+
+# Paths that never read the session; anything under STATIC_URL is skipped too.
+SKIP_PATHS = frozenset({"/robots.txt", "/favicon.ico", "/metrics", "/auth/backchannel-logout", "/auth/csrf"})
+
+
+class AuthContext:
+    """Read-only view of a request's ``auth_session``.
+
+    Attributes:
+        user: The user's claims
+        sub: The user's subject identifier, or None when signed out
+        access_token: The current access token
+        refresh_token: The current refresh token
+        expires_at: When the access token expires, in seconds since the epoch
+        roles: The role index built at login, see :mod:`lib.roles`
+        metadata: The user's decoded metadata, see :mod:`lib.metadata`
+        sid: The session ID used for revocation
+        tenant: Key of the tenant the session belongs to, "" for the default
+        error: Set when a token refresh failed
+    """
+
+    __slots__ = (
+        "user",
+        "sub",
+        "access_token",
+        "refresh_token",
+        "expires_at",
+        "roles",
+        "metadata",
+        "sid",
+        "tenant",
+        "error",
+        "_data",
+    )
+
+    user: Mapping[str, Any]
+    sub: str | None
+    access_token: str | None
+    refresh_token: str | None
+    expires_at: int | None
+    roles: frozenset[str]
+    metadata: UserMetadata
+    sid: str | None
+    tenant: str
+    error: str | None
+    _data: dict[str, Any]
+
+    def __init__(self, auth_session: dict[str, Any] | None) -> None:
+        data = auth_session or {}
+        user = data.get("user") or {}
+        values = {
+            "user": MappingProxyType(user),
+            "sub": user.get("sub"),
+            "access_token": data.get("access_token"),
+            "refresh_token": data.get("refresh_token"),
+            "expires_at": data.get("expires_at"),
+            "roles": frozenset(data.get("roles") or ()),
+            "metadata": UserMetadata(data.get("metadata") or {}),
+            "sid": data.get("sid"),
+            "tenant": data.get("tenant", ""),
+            "error": data.get("error"),
+            "_data": data,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> NoReturn:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> NoReturn:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __bool__(self) -> bool:
+        return self.is_authenticated
+
+    def __repr__(self) -> str:
+        return f"<AuthContext sub={self.sub!r}>"
+
+    @property
+    def is_authenticated(self) -> bool:
+        """Whether a user is signed in and their session has not failed."""
+        return bool(self.user) and not self.error
+
+    @property
+    def is_expired(self) -> bool:
+        return bool(self.expires_at) and time.time() >= cast(int, self.expires_at)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a copy of the underlying ``auth_session``, e.g. to refresh or revoke it."""
+        return dict(self._data)
+
+
+ANONYMOUS = AuthContext(None)
+
+
+def changed_fields(current: Mapping[str, Any], updated: Mapping[str, Any]) -> set[str]:
+    """Return the ``auth_session`` keys whose values differ, treating None like a missing key."""
+    return {key for key in current.keys() | updated.keys() if current.get(key) != updated.get(key)}
+
+
+def skips_session(path: str) -> bool:
+    return path in SKIP_PATHS or path.startswith(settings.STATIC_URL or "/static/")
+
+
+def get_auth(request: HttpRequest) -> AuthContext:
+    """Return ``request.auth``, building it from the session if the middleware did not run."""
+    auth = getattr(request, "auth", None)
+    if auth is None:
+        auth = AuthContext(request.session.get("auth_session"))
+        request.auth = auth  # type: ignore[attr-defined]
+    return cast(AuthContext, auth)
+
+
+async def aget_auth(request: HttpRequest) -> AuthContext:
+    """Async variant of :func:`get_auth` that loads the session without blocking."""
+    auth = getattr(request, "auth", None)
+    if auth is None:
+        auth = AuthContext(await request.session.aget("auth_session"))
+        request.auth = auth  # type: ignore[attr-defined]
+    return cast(AuthContext, auth)
+
+
+class AuthContextMiddleware:
+    """Attach ``request.auth``, reading the session once unless the path skips it.
+
+    Install it after ``SessionMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if skips_session(request.path_info):
+            request.auth = ANONYMOUS  # type: ignore[attr-defined]
+        else:
+            get_auth(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> Any:
+        if skips_session(request.path_info):
+            request.auth = ANONYMOUS  # type: ignore[attr-defined]
+        else:
+            await aget_auth(request)
+        return await self.get_response(request)
@@ -0,0 +1,91 @@
+"""Stateless CSRF tokens for the sign-in form.
+
+The sign-in page asks ``/auth/csrf`` for a token right before it posts to
+``/auth/signin/zitadel``. Storing that token in the session meant a session
+write for the token and another one for consuming it, on the page that takes
+the traffic spikes. Instead, the browser gets a random nonce in the
+:data:`COOKIE_NAME` cookie (a double-submit cookie), and the token is the
+nonce signed with ``SECRET_KEY`` and a timestamp. The sign-in POST is accepted
+when its token is correctly signed, no older than ``CSRF_TOKEN_MAX_AGE`` and
+made for the nonce in the request's cookie, so neither endpoint reads or
+writes the session for it.
+
+A cross-site form cannot read the cookie, so it cannot produce a token that
+matches it; a token fetched by another browser carries that browser's nonce.
+The nonce is dropped after a successful sign-in, so the next one starts over.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+
+from django.conf import settings
+from django.core.signing import BadSignature, TimestampSigner
+from django.http import HttpRequest, HttpResponse, JsonResponse
+
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+COOKIE_NAME = "signin_csrf"
+SALT = "lib.csrf.signin"
+
+# Longest nonce accepted from the cookie; :func:`new_nonce` makes 43 characters.
+MAX_NONCE_LENGTH = 64
+
+
+def new_nonce() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def make_token(nonce: str) -> str:
+    """Sign ``nonce`` into a token for the sign-in form."""
+    return TimestampSigner(salt=SALT).sign(nonce)
+
+
+def check_token(token: str | None, nonce: str | None) -> bool:
+    """Whether ``token`` is a current, untampered token made for ``nonce``."""
+    if not token or not nonce:
+        return False
+    try:
+        signed_nonce = TimestampSigner(salt=SALT).unsign(token, max_age=config.CSRF_TOKEN_MAX_AGE)
+    except BadSignature as e:
+        logger.debug("Rejected sign-in token: %s", str(e))
+        return False
+    return secrets.compare_digest(signed_nonce, nonce)
+
+
+def _cookie_path(request: HttpRequest) -> str:
+    return f"{request.META.get('SCRIPT_NAME', '').rstrip('/')}/auth"
+
+
+def token_response(request: HttpRequest) -> JsonResponse:
+    """Return a new token, setting the nonce cookie only if the browser has none."""
+    nonce = request.COOKIES.get(COOKIE_NAME)
+    fresh = not nonce or len(nonce) > MAX_NONCE_LENGTH
+    if fresh:
+        nonce = new_nonce()
+
+    response = JsonResponse({"csrfToken": make_token(nonce)})
+    response["Cache-Control"] = "no-store"
+    if fresh:
+        response.set_cookie(
+            COOKIE_NAME,
+            nonce,
+            path=_cookie_path(request),
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+def verify(request: HttpRequest) -> bool:
+    """Whether the sign-in POST carries a token matching the browser's nonce cookie."""
+    return check_token(request.POST.get("csrfToken"), request.COOKIES.get(COOKIE_NAME))
+
+
+def forget(request: HttpRequest, response: HttpResponse) -> None:
+    """Drop the nonce cookie once it was used to sign in."""
+    response.delete_cookie(COOKIE_NAME, path=_cookie_path(request), samesite="Lax")
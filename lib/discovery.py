@@ -0,0 +1,177 @@
+"""Process-wide cache for the ZITADEL OpenID Connect discovery document.
+
+Authlib only remembers the discovery document for the lifetime of the client
+object and fetches it lazily, so the first request served by every worker pays
+for a blocking round trip to ``/.well-known/openid-configuration``. The store in
+this module keeps the document for as long as the server allows (via the
+``Cache-Control`` header), refreshes it in a background thread before it goes
+stale, and keeps serving the last known copy if ZITADEL cannot be reached.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+import requests
+
+from lib.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Extract the freshness lifetime from a Cache-Control header.
+
+    Args:
+        cache_control: The raw header value, if any
+
+    Returns:
+        Optional[int]: The max-age in seconds, 0 for no-store/no-cache, or None
+        when the header does not specify a lifetime
+    """
+    if not cache_control:
+        return None
+
+    directives = [directive.strip().lower() for directive in cache_control.split(",")]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+
+    for directive in directives:
+        name, _, value = directive.partition("=")
+        if name == "max-age":
+            try:
+                return max(int(value.strip('"')), 0)
+            except ValueError:
+                return None
+    return None
+
+
+class MetadataStore:
+    """Cached, background-refreshed OIDC discovery document.
+
+    The first call to :meth:`get` blocks until the document has been fetched
+    (unless :meth:`prime` ran at startup). Afterwards, once ``refresh_ratio`` of
+    the document's lifetime has elapsed, the next caller schedules a refresh in
+    a background thread and immediately receives the cached copy. Failed
+    refreshes keep the stale copy and are retried after ``retry_interval``.
+
+    Attributes:
+        url: The discovery document URL
+        default_ttl: Lifetime used when the response carries no max-age
+        min_ttl: Lower bound for the lifetime, so no-cache responses do not
+            cause a refresh on every request
+        refresh_ratio: Fraction of the lifetime after which a refresh starts
+        retry_interval: Delay before retrying after a failed refresh
+        session: HTTP session to fetch with (default: the shared IdP client)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        default_ttl: int = 3600,
+        min_ttl: int = 60,
+        refresh_ratio: float = 0.75,
+        retry_interval: int = 30,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.url = url
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.refresh_ratio = refresh_ratio
+        self.retry_interval = retry_interval
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._metadata: Optional[dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether a document is cached, i.e. :meth:`get` will not block."""
+        return self._metadata is not None
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the cached document has outlived its advertised lifetime."""
+        return self._metadata is None or time.time() >= self._expires_at
+
+    def get(self) -> dict[str, Any]:
+        """Return the discovery document, fetching it only if nothing is cached."""
+        metadata = self._metadata
+        if metadata is None:
+            with self._lock:
+                if self._metadata is None:
+                    self._store(*self._fetch())
+                metadata = self._metadata
+            assert metadata is not None
+            return metadata
+
+        if time.time() >= self._refresh_at:
+            self._refresh_in_background()
+        return metadata
+
+    def prime(self) -> bool:
+        """Fetch the document eagerly, e.g. while a worker boots.
+
+        Returns:
+            bool: True if the document is now cached, False if the fetch failed
+        """
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("Could not prime OIDC discovery document from %s: %s", self.url, str(e))
+            return False
+        return True
+
+    def refresh(self) -> dict[str, Any]:
+        """Fetch the document synchronously and replace the cached copy."""
+        metadata, ttl = self._fetch()
+        with self._lock:
+            self._store(metadata, ttl)
+        return metadata
+
+    def _fetch(self) -> tuple[dict[str, Any], int]:
+        session = self.session or get_http_client().session
+        response = session.get(self.url)
+        response.raise_for_status()
+        metadata: dict[str, Any] = response.json()
+
+        max_age = parse_max_age(response.headers.get("Cache-Control"))
+        ttl = self.default_ttl if max_age is None else max(max_age, self.min_ttl)
+        return metadata, ttl
+
+    def _store(self, metadata: dict[str, Any], ttl: int) -> None:
+        now = time.time()
+        self._metadata = metadata
+        self._expires_at = now + ttl
+        self._refresh_at = now + ttl * self.refresh_ratio
+        logger.info("OIDC discovery document cached for %d seconds", ttl)
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            # Push the deadline out so callers arriving before the thread
+            # finishes do not queue up further refreshes.
+            self._refresh_at = time.time() + self.retry_interval
+            self._refresh_thread = threading.Thread(
+                target=self._background_refresh,
+                name="oidc-discovery-refresh",
+                daemon=True,
+            )
+            self._refresh_thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(
+                "OIDC discovery refresh failed, serving %s copy: %s",
+                "stale" if self.is_stale else "cached",
+                str(e),
+            )
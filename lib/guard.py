@@ -2,27 +2,65 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import hashlib
 import logging
+import threading
 import time
 from functools import wraps
 from typing import Any, Callable, TypeVar, cast
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 
+from lib.config import config
+from lib.context import AuthContext, aget_auth, changed_fields, get_auth
+from lib.metrics import TOKEN_REFRESHES, phase
+from lib.revocation import ais_revoked, is_revoked, track_session
+from lib.tenants import active_tenant
+
 logger = logging.getLogger(__name__)
 
 F = TypeVar("F", bound=Callable[..., Any])
 
 
-def refresh_access_token(auth_session: dict[str, Any]) -> dict[str, Any] | None:
-    """Automatically refresh an expired access token using the refresh token."""
-    refresh_token = auth_session.get("refresh_token")
-    if not refresh_token:
-        logger.error("No refresh token available for refresh")
-        auth_session["error"] = "RefreshAccessTokenError"
-        return None
+class _Flight:
+    """A token refresh that is in progress in this process."""
+
+    __slots__ = ("done", "result")
 
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: dict[str, Any] | None = None
+
+
+_flights_lock = threading.Lock()
+_flights: dict[str, _Flight] = {}
+_results: dict[str, tuple[float, dict[str, Any]]] = {}
+_background_tasks: set[asyncio.Task[Any]] = set()
+
+
+def _refresh_key(refresh_token: str) -> str:
+    return "zitadel:refresh:" + hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def _token_result(new_token: dict[str, Any], refresh_token: str) -> dict[str, Any]:
+    """Pick the session fields to update from a token endpoint response."""
+    result = {
+        "access_token": new_token.get("access_token"),
+        "expires_at": new_token.get("expires_at") or int(time.time()) + int(new_token.get("expires_in", 3600)),
+        "refresh_token": new_token.get("refresh_token", refresh_token),
+    }
+    if new_token.get("id_token"):
+        result["id_token"] = new_token["id_token"]
+    return result
+
+
+def _exchange_refresh_token(refresh_token: str) -> dict[str, Any] | None:
+    """POST the refresh token to ZITADEL's token endpoint."""
     try:
         from lib.auth import oauth
 
@@ -34,59 +72,436 @@ def refresh_access_token(auth_session: dict[str, Any]) -> dict[str, Any] | None:
             "refresh_token": refresh_token,
         }
 
-        response = oauth.zitadel._client.post(
+        response = oauth.zitadel.http.session.post(
             token_endpoint,
             data=token_data,
             auth=(oauth.zitadel.client_id, oauth.zitadel.client_secret),
         )
         response.raise_for_status()
-        new_token = response.json()
+        return _token_result(response.json(), refresh_token)
+
+    except Exception as e:
+        logger.exception("Token refresh failed: %s", str(e))
+        return None
 
-        auth_session["access_token"] = new_token.get("access_token")
-        auth_session["expires_at"] = new_token.get("expires_at", int(time.time()) + 3600)
-        auth_session["refresh_token"] = new_token.get("refresh_token", refresh_token)
-        auth_session["error"] = None
 
-        logger.info("Access token refreshed successfully")
-        return auth_session
+async def _aexchange_refresh_token(refresh_token: str) -> dict[str, Any] | None:
+    """Async variant of :func:`_exchange_refresh_token` using the async IdP client."""
+    try:
+        from lib.auth import oauth
+
+        metadata = await oauth.zitadel.aload_server_metadata()
+        token_endpoint = metadata.get("token_endpoint")
+
+        token_data = {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+        }
+
+        response = await oauth.zitadel.http.aio.request(
+            "POST",
+            token_endpoint,
+            data=token_data,
+            auth=(oauth.zitadel.client_id, oauth.zitadel.client_secret),
+        )
+        response.raise_for_status()
+        return _token_result(response.json(), refresh_token)
 
     except Exception as e:
         logger.exception("Token refresh failed: %s", str(e))
+        return None
+
+
+def _exchange_with_shared_lock(key: str, refresh_token: str, keep_for: int) -> dict[str, Any] | None:
+    """Refresh under a lock held in the Django cache so only one process refreshes.
+
+    Processes that lose the race poll the cache for the winner's result. If the
+    lock is released without a result (the winner failed), they try themselves.
+    """
+    timeout = config.ZITADEL_REFRESH_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        result = cache.get(f"{key}:result")
+        if result is not None:
+            return cast(dict[str, Any], result)
+
+        if cache.add(f"{key}:lock", 1, timeout=timeout):
+            try:
+                result = _exchange_refresh_token(refresh_token)
+                if result is not None:
+                    cache.set(f"{key}:result", result, timeout=keep_for)
+                return result
+            finally:
+                cache.delete(f"{key}:lock")
+
+        time.sleep(0.05)
+
+    logger.error("Timed out waiting for a concurrent token refresh")
+    return None
+
+
+async def _aexchange_with_shared_lock(key: str, refresh_token: str, keep_for: int) -> dict[str, Any] | None:
+    """Async variant of :func:`_exchange_with_shared_lock`."""
+    timeout = config.ZITADEL_REFRESH_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        result = await cache.aget(f"{key}:result")
+        if result is not None:
+            return cast(dict[str, Any], result)
+
+        if await cache.aadd(f"{key}:lock", 1, timeout=timeout):
+            try:
+                result = await _aexchange_refresh_token(refresh_token)
+                if result is not None:
+                    await cache.aset(f"{key}:result", result, timeout=keep_for)
+                return result
+            finally:
+                await cache.adelete(f"{key}:lock")
+
+        await asyncio.sleep(0.05)
+
+    logger.error("Timed out waiting for a concurrent token refresh")
+    return None
+
+
+def _join_flight(key: str) -> tuple[_Flight, bool]:
+    """Return the refresh flight for a key and whether the caller has to perform it.
+
+    A result that is still within its reuse window is handed out as an already
+    completed flight.
+    """
+    with _flights_lock:
+        now = time.monotonic()
+        for stale_key in [k for k, (expires, _) in _results.items() if expires <= now]:
+            del _results[stale_key]
+
+        if key in _results:
+            flight = _Flight()
+            flight.result = _results[key][1]
+            flight.done.set()
+            return flight, False
+
+        flight = _flights.get(key)
+        if flight is not None:
+            return flight, False
+
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _land_flight(key: str, flight: _Flight, keep_for: int) -> None:
+    """Publish a finished flight's result to waiting and later callers."""
+    with _flights_lock:
+        if flight.result is not None:
+            _results[key] = (time.monotonic() + keep_for, flight.result)
+        del _flights[key]
+    flight.done.set()
+
+
+def _refresh_once(refresh_token: str, keep_for: int | None = None) -> dict[str, Any] | None:
+    """Exchange a refresh token at most once, sharing the result with concurrent callers.
+
+    With refresh-token rotation, only the first exchange of a refresh token
+    succeeds. Requests racing on the same token therefore wait for the one
+    in-flight refresh, and requests arriving afterwards with the old token
+    reuse its result for ``keep_for`` seconds (by default
+    ``ZITADEL_REFRESH_REUSE_WINDOW``).
+    """
+    key = _refresh_key(refresh_token)
+    keep_for = keep_for or config.ZITADEL_REFRESH_REUSE_WINDOW
+
+    flight, leader = _join_flight(key)
+    if not leader:
+        flight.done.wait(timeout=config.ZITADEL_REFRESH_LOCK_TIMEOUT)
+        return flight.result
+
+    try:
+        if config.ZITADEL_REFRESH_SHARED_LOCK:
+            flight.result = _exchange_with_shared_lock(key, refresh_token, keep_for)
+        else:
+            flight.result = _exchange_refresh_token(refresh_token)
+    finally:
+        _land_flight(key, flight, keep_for)
+
+    return flight.result
+
+
+async def _arefresh_once(refresh_token: str, keep_for: int | None = None) -> dict[str, Any] | None:
+    """Async variant of :func:`_refresh_once`, sharing flights with sync callers."""
+    key = _refresh_key(refresh_token)
+    keep_for = keep_for or config.ZITADEL_REFRESH_REUSE_WINDOW
+
+    flight, leader = _join_flight(key)
+    if not leader:
+        deadline = time.monotonic() + config.ZITADEL_REFRESH_LOCK_TIMEOUT
+        while not flight.done.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return flight.result
+
+    try:
+        if config.ZITADEL_REFRESH_SHARED_LOCK:
+            flight.result = await _aexchange_with_shared_lock(key, refresh_token, keep_for)
+        else:
+            flight.result = await _aexchange_refresh_token(refresh_token)
+    finally:
+        _land_flight(key, flight, keep_for)
+
+    return flight.result
+
+
+def _completed_refresh(refresh_token: str) -> dict[str, Any] | None:
+    """Return the result of an earlier refresh of this token, if one finished."""
+    key = _refresh_key(refresh_token)
+    with _flights_lock:
+        entry = _results.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+    if config.ZITADEL_REFRESH_SHARED_LOCK:
+        return cast("dict[str, Any] | None", cache.get(f"{key}:result"))
+    return None
+
+
+def _background_keep_for(expires_at: int) -> int:
+    """Keep a background result until the current token has expired, plus the reuse window."""
+    return max(int(expires_at - time.time()), 0) + config.ZITADEL_REFRESH_REUSE_WINDOW
+
+
+def _refresh_in_background(refresh_token: str, expires_at: int) -> None:
+    """Start refreshing a token that is about to expire without blocking the request.
+
+    The result is kept until the current access token has expired (plus the
+    usual reuse window), so the user's next request can pick it up.
+    """
+    with _flights_lock:
+        if _refresh_key(refresh_token) in _flights:
+            return
+
+    # The copied context keeps the request's tenant, and so its OAuth client.
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(_refresh_once, refresh_token, _background_keep_for(expires_at)),
+        name="zitadel-token-refresh",
+        daemon=True,
+    ).start()
+    logger.info("Access token expires soon, refreshing in background")
+
+
+def _arefresh_in_background(refresh_token: str, expires_at: int) -> None:
+    """Async variant of :func:`_refresh_in_background` that runs on the event loop."""
+    with _flights_lock:
+        if _refresh_key(refresh_token) in _flights:
+            return
+
+    task = asyncio.get_running_loop().create_task(_arefresh_once(refresh_token, _background_keep_for(expires_at)))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    logger.info("Access token expires soon, refreshing in background")
+
+
+def _refresh_deadline(auth_session: dict[str, Any]) -> float:
+    """Return the moment from which the session's token counts as due for refresh.
+
+    Refreshing ``ZITADEL_REFRESH_SKEW`` seconds early hides the refresh latency
+    from the first request after expiry. The jitter keeps sessions that logged
+    in together from all refreshing at the same instant; it is derived from the
+    session ID (or the refresh token), so every request of a session sees the
+    same deadline and the sessions spread evenly over the jitter window.
+    """
+    seed = auth_session.get("sid") or auth_session.get("refresh_token") or ""
+    fraction = int.from_bytes(hashlib.sha256(seed.encode()).digest()[:8], "big") / 2**64
+    jitter = fraction * config.ZITADEL_REFRESH_JITTER
+    return cast(int, auth_session["expires_at"]) - config.ZITADEL_REFRESH_SKEW - jitter
+
+
+def _refresh_mode(auth_session: dict[str, Any]) -> str | None:
+    """Decide whether the session's access token needs refreshing, and how.
+
+    Returns:
+        Optional[str]: None if the token is not due yet, "background" if it is
+        due but still valid and background refresh is enabled, "now" otherwise
+    """
+    expires_at = auth_session.get("expires_at")
+    if not expires_at or time.time() < _refresh_deadline(auth_session):
+        return None
+    if config.ZITADEL_REFRESH_IN_BACKGROUND and time.time() < expires_at and auth_session.get("refresh_token"):
+        return "background"
+    return "now"
+
+
+def _apply_refresh(auth_session: dict[str, Any], result: dict[str, Any] | None) -> dict[str, Any] | None:
+    if result is None:
+        TOKEN_REFRESHES.inc(result="failure")
         auth_session["error"] = "RefreshAccessTokenError"
         return None
 
+    TOKEN_REFRESHES.inc(result="success")
+    auth_session.update(result)
+    auth_session["error"] = None
 
-def require_auth(view: F) -> F:
-    """Middleware that ensures the user is authenticated before accessing protected routes."""
+    logger.info("Access token refreshed successfully")
+    return auth_session
+
+
+def refresh_access_token(auth_session: dict[str, Any]) -> dict[str, Any] | None:
+    """Automatically refresh an expired access token using the refresh token."""
+    refresh_token = auth_session.get("refresh_token")
+    if not refresh_token:
+        logger.error("No refresh token available for refresh")
+        return _apply_refresh(auth_session, None)
+
+    return _apply_refresh(auth_session, _refresh_once(refresh_token))
+
+
+async def arefresh_access_token(auth_session: dict[str, Any]) -> dict[str, Any] | None:
+    """Async variant of :func:`refresh_access_token`."""
+    refresh_token = auth_session.get("refresh_token")
+    if not refresh_token:
+        logger.error("No refresh token available for refresh")
+        return _apply_refresh(auth_session, None)
 
+    return _apply_refresh(auth_session, await _arefresh_once(refresh_token))
+
+
+def _signin_redirect(request: HttpRequest) -> HttpResponse:
+    callback_url = request.get_full_path()
+    return cast(HttpResponse, redirect(f"/auth/signin?callbackUrl={callback_url}"))
+
+
+def _reject(request: HttpRequest, auth: AuthContext) -> HttpResponse | None:
+    """Return a redirect to the sign-in page if the session is not usable."""
+    if not auth.user:
+        logger.info("Unauthenticated access attempt, redirecting to signin")
+        return _signin_redirect(request)
+
+    if auth.error:
+        logger.warning("Session has error flag, redirecting to signin")
+        request.session.clear()
+        return _signin_redirect(request)
+
+    tenant = active_tenant()
+    if auth.tenant != (tenant.key if tenant else ""):
+        logger.warning("Session belongs to another tenant, redirecting to signin")
+        request.session.clear()
+        return _signin_redirect(request)
+
+    return None
+
+
+def _revoked(request: HttpRequest) -> HttpResponse:
+    logger.info("Session was revoked, redirecting to signin")
+    request.session.clear()
+    return _signin_redirect(request)
+
+
+def _changes(request: HttpRequest, auth_session: dict[str, Any]) -> set[str]:
+    """Return the fields a refresh changed, and point ``request.auth`` at the result if any did.
+
+    Writing the session makes the response carry a new cookie (or save the
+    server-side entry), so it only happens when a field really changed.
+    """
+    if auth_session.get("error") is None:
+        auth_session.pop("error", None)
+    changed = changed_fields(request.auth.as_dict(), auth_session)  # type: ignore[attr-defined]
+    if changed:
+        logger.debug("Refresh changed session fields: %s", ", ".join(sorted(changed)))
+        request.auth = AuthContext(auth_session)  # type: ignore[attr-defined]
+    return changed
+
+
+async def _astore(request: HttpRequest, auth_session: dict[str, Any]) -> None:
+    changed = _changes(request, auth_session)
+    if changed:
+        await request.session.aset("auth_session", auth_session)
+    if "refresh_token" in changed:
+        await sync_to_async(track_session)(auth_session)
+
+
+def _store(request: HttpRequest, auth_session: dict[str, Any]) -> None:
+    changed = _changes(request, auth_session)
+    if changed:
+        request.session["auth_session"] = auth_session
+    if "refresh_token" in changed:
+        track_session(auth_session)
+
+
+def _guard_async(view: F) -> F:
     @wraps(view)
-    def wrapped(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        auth_session = request.session.get("auth_session")
+    async def wrapped(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        auth = await aget_auth(request)
+        rejected = _reject(request, auth)
+        if rejected is not None:
+            return rejected
+        auth_session = auth.as_dict()
+        if await ais_revoked(auth_session):
+            return _revoked(request)
 
-        if not auth_session or not auth_session.get("user"):
-            callback_url = request.get_full_path()
-            logger.info("Unauthenticated access attempt, redirecting to signin")
-            return cast(HttpResponse, redirect(f"/auth/signin?callbackUrl={callback_url}"))
+        mode = _refresh_mode(auth_session)
+        if mode == "background":
+            completed = await sync_to_async(_completed_refresh)(auth_session["refresh_token"])
+            if completed is not None:
+                await _astore(request, {**auth_session, **completed, "error": None})
+            else:
+                _arefresh_in_background(auth_session["refresh_token"], auth_session["expires_at"])
+        elif mode == "now":
+            logger.info("Access token expired or about to expire, attempting refresh")
+            with phase("token_refresh"):
+                refreshed_session = await arefresh_access_token(auth_session)
 
-        if auth_session.get("error"):
-            logger.warning("Session has error flag, redirecting to signin")
-            request.session.clear()
-            callback_url = request.get_full_path()
-            return cast(HttpResponse, redirect(f"/auth/signin?callbackUrl={callback_url}"))
+            if refreshed_session:
+                await _astore(request, refreshed_session)
+            else:
+                logger.error("Token refresh failed, clearing session")
+                request.session.clear()
+                return _signin_redirect(request)
+
+        return cast(HttpResponse, await view(request, *args, **kwargs))
 
-        expires_at = auth_session.get("expires_at")
-        if expires_at and int(time.time()) >= expires_at:
-            logger.info("Access token expired, attempting refresh")
-            refreshed_session = refresh_access_token(auth_session)
+    return cast(F, markcoroutinefunction(wrapped))
+
+
+def _guard_sync(view: F) -> F:
+    @wraps(view)
+    def wrapped(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        auth = get_auth(request)
+        rejected = _reject(request, auth)
+        if rejected is not None:
+            return rejected
+        auth_session = auth.as_dict()
+        if is_revoked(auth_session):
+            return _revoked(request)
+
+        mode = _refresh_mode(auth_session)
+        if mode == "background":
+            completed = _completed_refresh(auth_session["refresh_token"])
+            if completed is not None:
+                _store(request, {**auth_session, **completed, "error": None})
+            else:
+                _refresh_in_background(auth_session["refresh_token"], auth_session["expires_at"])
+        elif mode == "now":
+            logger.info("Access token expired or about to expire, attempting refresh")
+            with phase("token_refresh"):
+                refreshed_session = refresh_access_token(auth_session)
 
             if refreshed_session:
-                request.session["auth_session"] = refreshed_session
+                _store(request, refreshed_session)
             else:
                 logger.error("Token refresh failed, clearing session")
                 request.session.clear()
-                callback_url = request.get_full_path()
-                return cast(HttpResponse, redirect(f"/auth/signin?callbackUrl={callback_url}"))
+                return _signin_redirect(request)
 
         return cast(HttpResponse, view(request, *args, **kwargs))
 
     return cast(F, wrapped)
+
+
+def require_auth(view: F) -> F:
+    """Middleware that ensures the user is authenticated before accessing protected routes.
+
+    Works for both sync and async views; async views refresh tokens with the
+    async IdP client instead of blocking the event loop.
+    """
+    if iscoroutinefunction(view):
+        return _guard_async(view)
+    return _guard_sync(view)
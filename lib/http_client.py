@@ -0,0 +1,305 @@
+"""Outbound HTTP client shared by every call to ZITADEL.
+
+Discovery, JWKS, token, userinfo and revocation requests all go through one
+``requests`` connection pool per worker, so TLS connections to ZITADEL are
+kept alive between requests. The transport adapter also enforces connect and
+read timeouts, retries idempotent requests with exponential backoff, and
+trips a circuit breaker when ZITADEL keeps failing, so a slow or unhealthy IdP
+fails fast instead of pinning every worker thread.
+
+Async views use the ``httpx`` based :class:`AsyncHttpClient` instead, which
+applies the same timeouts and retry policy and shares the circuit breaker of
+its synchronous sibling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from lib.config import config
+from lib.metrics import observe_idp_call
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling ZITADEL while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Counts consecutive IdP failures and short-circuits calls once too many occur.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and all
+    calls fail immediately. Once ``reset_timeout`` seconds have passed a single
+    trial call is let through; its outcome closes or re-opens the breaker.
+
+    Attributes:
+        failure_threshold: Consecutive failures that open the breaker
+        reset_timeout: Seconds to wait before letting a trial call through
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected."""
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        """Reject the call if the breaker is open and no trial call is due.
+
+        Raises:
+            CircuitOpenError: If ZITADEL is considered unhealthy
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._trial_in_flight and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError("ZITADEL circuit breaker is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("ZITADEL is reachable again, closing circuit breaker")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error("%d consecutive ZITADEL failures, opening circuit breaker", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class IdpAdapter(HTTPAdapter):
+    """Transport adapter adding default timeouts and the circuit breaker.
+
+    Authlib creates and closes a short-lived session for every call, and
+    closing a session closes its adapters. This adapter ignores ``close()`` so
+    that its connection pool survives and is reused by the next session it is
+    mounted on.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, timeout: tuple[float, float], **kwargs: Any) -> None:
+        self.breaker = breaker
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            observe_idp_call(request.url or "", request.method or "", "circuit_open", 0.0)
+            raise
+
+        start = time.perf_counter()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except Exception as e:
+            self.breaker.record_failure()
+            observe_idp_call(request.url or "", request.method or "", type(e).__name__, time.perf_counter() - start)
+            raise
+
+        observe_idp_call(request.url or "", request.method or "", response.status_code, time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncHttpClient:
+    """A pooled ``httpx`` client for calling ZITADEL from async views.
+
+    httpx connection pools are bound to the event loop they were created on,
+    so one client is kept per running loop. Idempotent requests are retried
+    with exponential backoff on transport errors and 502/503/504 responses.
+
+    Attributes:
+        breaker: The circuit breaker guarding this client's IdP
+        pool_size: Maximum number of connections per event loop
+        timeout: The (connect, read) timeout in seconds
+        retries: Retries for idempotent requests
+        backoff_factor: Base delay in seconds between retries
+    """
+
+    RETRY_METHODS = frozenset(Retry.DEFAULT_ALLOWED_METHODS)
+    RETRY_STATUSES = frozenset((502, 503, 504))
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        pool_size: int = 100,
+        timeout: tuple[float, float] = (3.05, 10.0),
+        retries: int = 2,
+        backoff_factor: float = 0.2,
+    ) -> None:
+        self.breaker = breaker
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The client for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect_timeout, read_timeout = self.timeout
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request through the pool, applying retries and the circuit breaker.
+
+        Raises:
+            CircuitOpenError: If ZITADEL is considered unhealthy
+            httpx.TransportError: If the last attempt failed to connect or timed out
+        """
+        attempts = 1 + (self.retries if method.upper() in self.RETRY_METHODS else 0)
+        for attempt in range(1, attempts + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                observe_idp_call(url, method, "circuit_open", 0.0)
+                raise
+
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except Exception as e:
+                self.breaker.record_failure()
+                observe_idp_call(url, method, type(e).__name__, time.perf_counter() - start)
+                if attempt == attempts:
+                    raise
+            else:
+                observe_idp_call(url, method, response.status_code, time.perf_counter() - start)
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if attempt == attempts or response.status_code not in self.RETRY_STATUSES:
+                    return response
+            await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+        raise AssertionError("unreachable")
+
+
+class HttpClient:
+    """A pooled ``requests`` session configured for talking to ZITADEL.
+
+    Attributes:
+        breaker: The circuit breaker guarding this client's IdP
+        adapter: The shared transport adapter holding the connection pool
+        session: A session with the adapter mounted, for direct use
+        aio: The async client for use from async views
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        async_pool_size: int = 100,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        retries: int = 2,
+        backoff_factor: float = 0.2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.adapter = IdpAdapter(
+            self.breaker,
+            (connect_timeout, read_timeout),
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False,
+            ),
+        )
+        self.session = self.mount(requests.Session())
+        self.aio = AsyncHttpClient(
+            self.breaker,
+            pool_size=async_pool_size,
+            timeout=(connect_timeout, read_timeout),
+            retries=retries,
+            backoff_factor=backoff_factor,
+        )
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Route a session's traffic through this client's pool and policies."""
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        return session
+
+    def close(self) -> None:
+        """Close the pooled connections of a client that is no longer used.
+
+        The async clients are dropped and close their connections when they
+        are garbage collected, as they belong to event loops that may not be
+        running here.
+        """
+        HTTPAdapter.close(self.adapter)
+        self.aio._clients.clear()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def new_http_client() -> HttpClient:
+    """Create a client with its own pool and circuit breaker from configuration."""
+    return HttpClient(
+        pool_size=config.ZITADEL_HTTP_POOL_SIZE,
+        async_pool_size=config.ZITADEL_HTTP_ASYNC_POOL_SIZE,
+        connect_timeout=config.ZITADEL_HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.ZITADEL_HTTP_READ_TIMEOUT,
+        retries=config.ZITADEL_HTTP_RETRIES,
+        failure_threshold=config.ZITADEL_HTTP_BREAKER_THRESHOLD,
+        reset_timeout=config.ZITADEL_HTTP_BREAKER_RESET,
+    )
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide client, creating it from configuration on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = new_http_client()
+    return _client
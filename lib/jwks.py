@@ -0,0 +1,149 @@
+"""Local verification of ZITADEL-issued JWTs against a cached key set.
+
+ID tokens, JWT access tokens and logout tokens are all signed with the keys
+ZITADEL publishes at the ``jwks_uri`` from the discovery document. Keeping
+those keys in memory lets the application verify tokens without a round trip
+to the IdP. The key set is only re-fetched when a token arrives with a key ID
+that has not been seen before, and never more often than once per
+``min_refresh_interval`` so forged ``kid`` headers cannot be used to hammer
+ZITADEL.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import requests
+from joserfc import jwt
+from joserfc.errors import InvalidKeyIdError
+from joserfc.jwk import GuestProtocol, Key, KeySet
+
+from lib.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALGORITHMS = ["RS256"]
+
+
+class KeyStore:
+    """JWKS cache keyed by ``kid``.
+
+    Attributes:
+        min_refresh_interval: Minimum number of seconds between two fetches
+            triggered by unknown key IDs
+        session: HTTP session to fetch with (default: the shared IdP client)
+    """
+
+    def __init__(
+        self,
+        jwks_uri: Callable[[], str],
+        min_refresh_interval: int = 60,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self._jwks_uri = jwks_uri
+        self.min_refresh_interval = min_refresh_interval
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._key_set: Optional[dict[str, Any]] = None
+        self._keys: dict[Optional[str], Key] = {}
+        self._fetched_at = 0.0
+
+    def get_key_set(self, force: bool = False) -> dict[str, Any]:
+        """Return the raw JWKS document, fetching it on first use.
+
+        Args:
+            force: Re-fetch the key set, subject to the refresh rate limit
+
+        Returns:
+            dict: The JWKS document as published by ZITADEL
+        """
+        with self._lock:
+            if self._key_set is None or (force and self._may_refresh()):
+                self._refresh()
+            assert self._key_set is not None
+            return self._key_set
+
+    def get_key(self, kid: Optional[str]) -> Key:
+        """Look up a verification key, re-fetching the key set for unknown IDs.
+
+        Raises:
+            InvalidKeyIdError: If no key matches, even after a permitted refresh
+        """
+        key = self._find(kid)
+        if key is not None:
+            return key
+
+        with self._lock:
+            key = self._find(kid)
+            if key is None and (self._key_set is None or self._may_refresh()):
+                logger.info("Unknown signing key %r, refreshing JWKS", kid)
+                self._refresh()
+                key = self._find(kid)
+
+        if key is None:
+            raise InvalidKeyIdError(f"No key for kid: '{kid}'")
+        return key
+
+    def verify(
+        self,
+        token: str,
+        issuer: str,
+        audience: str,
+        algorithms: Optional[list[str]] = None,
+        leeway: int = 60,
+    ) -> dict[str, Any]:
+        """Verify a JWT's signature and standard claims.
+
+        Args:
+            token: The compact-serialized JWT
+            issuer: Expected ``iss`` claim
+            audience: Value that must appear in the ``aud`` claim
+            algorithms: Accepted signing algorithms (default: RS256)
+            leeway: Allowed clock skew in seconds for time-based claims
+
+        Returns:
+            dict: The verified claims
+
+        Raises:
+            JoseError: If the signature or any required claim is invalid
+        """
+
+        def resolve_key(obj: GuestProtocol) -> Key:
+            return self.get_key(obj.headers().get("kid"))
+
+        decoded = jwt.decode(token, resolve_key, algorithms=algorithms or DEFAULT_ALGORITHMS)
+        registry = jwt.JWTClaimsRegistry(
+            leeway=leeway,
+            iss={"essential": True, "value": issuer},
+            aud={"essential": True, "value": audience},
+            exp={"essential": True},
+        )
+        registry.validate(decoded.claims)
+        return decoded.claims
+
+    def _find(self, kid: Optional[str]) -> Optional[Key]:
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        return keys.get(kid)
+
+    def _may_refresh(self) -> bool:
+        return time.monotonic() - self._fetched_at >= self.min_refresh_interval
+
+    def _refresh(self) -> None:
+        self._fetched_at = time.monotonic()
+        key_set = self._fetch()
+        self._keys = {key.kid: key for key in KeySet.import_key_set(key_set)}
+        self._key_set = key_set
+        logger.info("Loaded %d signing keys from JWKS", len(self._keys))
+
+    def _fetch(self) -> dict[str, Any]:
+        session = self.session or get_http_client().session
+        response = session.get(self._jwks_uri())
+        response.raise_for_status()
+        key_set: dict[str, Any] = response.json()
+        return key_set
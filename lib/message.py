@@ -78,6 +78,20 @@ def _auth_error_message(error_code: str) -> dict[str, str]:
     }
 
 
+def _logout_error_message(error_code: str) -> dict[str, str]:
+    """Get error message for logout flow errors."""
+    if error_code == "state":
+        return {
+            "heading": "Logout unsuccessful",
+            "message": "Invalid or missing state parameter.",
+        }
+
+    return {
+        "heading": "Logout unsuccessful",
+        "message": "An unknown error occurred.",
+    }
+
+
 def get_message(error_input: str | list[str] | None, category: str) -> dict[str, str]:
     """Retrieve a user-friendly error message based on error code and category."""
     raw: Optional[str]
@@ -94,4 +108,7 @@ def get_message(error_input: str | list[str] | None, category: str) -> dict[str,
     if category == "auth-error":
         return _auth_error_message(error_code)
 
+    if category == "logout-error":
+        return _logout_error_message(error_code)
+
     return {"heading": "Unknown Error", "message": "An unknown error occurred."}
@@ -0,0 +1,134 @@
+"""Decoded user metadata and the pre-rendered profile document.
+
+ZITADEL sends custom user metadata (``urn:zitadel:iam:user:metadata`` scope)
+as a claim mapping each key to a base64-encoded value. :func:`decode_metadata`
+decodes it once at login into ``auth_session["metadata"]``, in place of the
+base64 claim, and ``request.auth.metadata`` (see :func:`user_metadata`) is a
+read-only mapping with typed getters, so a request never decodes anything.
+
+The profile page's JSON is rendered once per access token and kept in a
+per-process LRU until the token expires, so it is rebuilt after a login or
+token refresh rather than on every page view. Rendering is cheaper than a
+round trip to a shared cache, so the document is not stored there.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from typing import TYPE_CHECKING, Any
+
+from django.http import HttpRequest
+
+if TYPE_CHECKING:
+    from lib.context import AuthContext
+
+logger = logging.getLogger(__name__)
+
+METADATA_CLAIM = "urn:zitadel:iam:user:metadata"
+
+_TRUE = frozenset({"true", "1", "yes", "on"})
+
+# Rendered profile documents kept per process, each until its token expires.
+PROFILE_CACHE_SIZE = 1024
+
+_profiles: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def decode_metadata(claims: dict[str, Any]) -> dict[str, str]:
+    """Decode the base64 metadata values in the user's claims.
+
+    Values that are not base64-encoded UTF-8 text are kept as sent.
+    """
+    raw = claims.get(METADATA_CLAIM)
+    if not isinstance(raw, dict):
+        return {}
+
+    decoded = {}
+    for key, value in raw.items():
+        try:
+            decoded[key] = base64.b64decode(value, validate=True).decode("utf-8")
+        except (binascii.Error, TypeError, UnicodeDecodeError, ValueError):
+            logger.debug("Metadata value for %s is not base64 text, keeping it as sent", key)
+            decoded[key] = str(value)
+    return decoded
+
+
+class UserMetadata(Mapping[str, str]):
+    """Read-only view of a user's decoded metadata with typed getters."""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: dict[str, str]) -> None:
+        self._values = values
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get_int(self, key: str, default: int | None = None) -> int | None:
+        try:
+            return int(self._values[key])
+        except (KeyError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self._values.get(key)
+        return default if value is None else value.strip().lower() in _TRUE
+
+    def get_json(self, key: str, default: Any = None) -> Any:
+        try:
+            return json.loads(self._values[key])
+        except (KeyError, ValueError):
+            return default
+
+
+def user_metadata(request: HttpRequest) -> UserMetadata:
+    """Return the signed-in user's decoded metadata."""
+    from lib.context import get_auth
+
+    return get_auth(request).metadata
+
+
+def profile_json(auth: AuthContext) -> str:
+    """Return the user's claims, with decoded metadata, as indented JSON.
+
+    The document is rendered once per access token and process.
+    """
+    user = dict(auth.user)
+    document = {**user, METADATA_CLAIM: dict(auth.metadata)} if auth.metadata else user
+    access_token = auth.access_token
+    if not access_token:
+        return json.dumps(document, indent=2)
+
+    fingerprint = hashlib.sha256(access_token.encode()).hexdigest()[:32]
+    key = f"{user.get('sub')}:{fingerprint}"
+    now = time.time()
+    with _profiles_lock:
+        entry = _profiles.get(key)
+        if entry is not None and entry[0] > now:
+            _profiles.move_to_end(key)
+            return entry[1]
+
+    rendered = json.dumps(document, indent=2)
+    expires_at = auth.expires_at or 0
+    if expires_at > now:
+        with _profiles_lock:
+            _profiles[key] = (expires_at, rendered)
+            _profiles.move_to_end(key)
+            while len(_profiles) > PROFILE_CACHE_SIZE:
+                _profiles.popitem(last=False)
+    return rendered
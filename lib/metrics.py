@@ -0,0 +1,282 @@
+"""Timing and counters for the authentication flows, exposed in Prometheus format.
+
+Three kinds of data are collected:
+
+- a histogram of every outbound call to ZITADEL by endpoint, method and status
+- counters for token refresh outcomes, CSRF failures and logout state failures
+- a per-request breakdown into phases (token exchange, userinfo, token refresh,
+  session save, ...) recorded by :func:`phase` and reported by
+  :class:`MetricsMiddleware`, next to the total request duration
+
+Everything is rendered on ``/metrics`` in the Prometheus text format. With
+``METRICS_ENABLED`` off (the default) the middleware and the route are not
+installed, and :func:`phase`, :meth:`Counter.inc` and
+:meth:`Histogram.observe` return after a single flag check.
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import contextvars
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import Http404, HttpRequest, HttpResponse
+
+from lib.config import config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    """Base class for labelled metrics held in a :class:`Registry`."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    @abc.abstractmethod
+    def _samples(self) -> list[str]: ...
+
+    @abc.abstractmethod
+    def clear(self) -> None: ...
+
+
+class Counter(Metric):
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not config.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}" for key, value in values]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets per label combination."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Per label combination: counts per bucket (plus +Inf), sum
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not config.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip([*self.buckets, float("inf")], counts, strict=True):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Registry:
+    """The set of metrics rendered on ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+IDP_REQUEST_DURATION: Histogram = registry.register(
+    Histogram(
+        "zitadel_idp_request_duration_seconds",
+        "Duration of calls to ZITADEL by endpoint, method and status.",
+        ("endpoint", "method", "status"),
+    )
+)
+TOKEN_REFRESHES: Counter = registry.register(
+    Counter("zitadel_token_refreshes_total", "Access token refreshes by result.", ("result",))
+)
+CSRF_FAILURES: Counter = registry.register(Counter("auth_csrf_failures_total", "Sign-in attempts rejected by the CSRF check."))
+LOGOUT_STATE_FAILURES: Counter = registry.register(
+    Counter("auth_logout_state_failures_total", "Logout callbacks rejected because the state did not match.")
+)
+REQUEST_DURATION: Histogram = registry.register(
+    Histogram("http_request_duration_seconds", "Duration of requests by view and status.", ("view", "status"))
+)
+REQUEST_PHASE_DURATION: Histogram = registry.register(
+    Histogram("http_request_phase_duration_seconds", "Time spent in each phase of a request, by view.", ("view", "phase"))
+)
+
+_phases: contextvars.ContextVar[dict[str, float] | None] = contextvars.ContextVar("request_phases", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the time spent in the block to a phase of the current request."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def observe_idp_call(url: str, method: str, status: int | str, seconds: float) -> None:
+    """Record an outbound call to ZITADEL, labelled by the URL path."""
+    if config.METRICS_ENABLED:
+        IDP_REQUEST_DURATION.observe(seconds, endpoint=urlsplit(url).path or "/", method=method.upper(), status=status)
+
+
+class MetricsMiddleware:
+    """Record the duration of every request and its phase breakdown.
+
+    Install it first in ``MIDDLEWARE`` so the total includes all other
+    middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _phases.set({})
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._record(request, response, time.perf_counter() - start)
+            _phases.reset(token)
+
+    async def __acall__(self, request: HttpRequest) -> Any:
+        token = _phases.set({})
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._record(request, response, time.perf_counter() - start)
+            _phases.reset(token)
+
+    @staticmethod
+    def _record(request: HttpRequest, response: HttpResponse | None, seconds: float) -> None:
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unmatched"
+        REQUEST_DURATION.observe(seconds, view=view, status=response.status_code if response is not None else "error")
+        for name, phase_seconds in (_phases.get() or {}).items():
+            REQUEST_PHASE_DURATION.observe(phase_seconds, view=view, phase=name)
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """Django's session middleware, with the session save recorded as a phase."""
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        with phase("session_save"):
+            return super().process_response(request, response)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Render all metrics in the Prometheus text exposition format."""
+    if not config.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
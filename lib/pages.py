@@ -0,0 +1,129 @@
+"""Render cache and conditional GET for the public pages.
+
+The home, sign-in, logout and error pages are a pure function of a handful of
+inputs (whether the visitor is signed in, an error code, the callback URL), so
+:func:`render_page` keeps the rendered bytes in a per-process LRU of
+``PAGE_CACHE_SIZE`` entries keyed by template name and context. Repeat hits
+skip Jinja entirely. Templates rendered this way must depend on nothing but
+their context: they are rendered without the request.
+
+Every response carries an ``ETag`` and ``Last-Modified`` and is answered with
+``304 Not Modified`` when the browser's copy is current. Pages whose context
+comes from the session (the home page) send ``Vary: Cookie``. The cache is
+bypassed while the template engine reloads changed templates (``DEBUG``), and
+for contexts built from free-form query values, so clients cannot fill it
+with pages nobody else will ask for.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from django.http import HttpRequest, HttpResponse
+from django.template import engines
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from lib.config import config
+from lib.metrics import phase
+
+
+class Page(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: int
+
+
+class PageCache:
+    """A thread-safe LRU of rendered pages."""
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        self._maxsize = maxsize
+        self._pages: OrderedDict[str, Page] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self) -> int:
+        """The size limit, ``PAGE_CACHE_SIZE`` unless given explicitly."""
+        return config.PAGE_CACHE_SIZE if self._maxsize is None else self._maxsize
+
+    def get(self, key: str) -> Page | None:
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def set(self, key: str, page: Page) -> None:
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            maxsize = self.maxsize
+            while len(self._pages) > maxsize:
+                self._pages.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+pages = PageCache()
+
+
+def _cacheable() -> bool:
+    return pages.maxsize > 0 and not engines["jinja2"].env.auto_reload  # type: ignore[attr-defined]
+
+
+def _render(template_name: str, context: dict[str, Any]) -> Page:
+    with phase("render"):
+        body = render_to_string(template_name, context).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return Page(body, etag, int(time.time()))
+
+
+def render_page(
+    request: HttpRequest,
+    template_name: str,
+    context: dict[str, Any] | None = None,
+    vary: tuple[str, ...] = (),
+    cache: bool = True,
+) -> HttpResponse:
+    """Render a public page through the cache and answer conditional GETs.
+
+    Args:
+        request: The current request, used only for its conditional headers
+        template_name: Template to render
+        context: Everything the page depends on; must be JSON-serializable
+        vary: Request headers the context was derived from, e.g. ``("Cookie",)``
+        cache: False if the context holds unvalidated request input; the page is
+            then rendered without touching the cache
+
+    Returns:
+        HttpResponse: The page, or ``304 Not Modified``
+    """
+    context = context or {}
+    if cache and _cacheable():
+        key = json.dumps([template_name, context], sort_keys=True, separators=(",", ":"))
+        page = pages.get(key)
+        if page is None:
+            page = _render(template_name, context)
+            pages.set(key, page)
+    else:
+        page = _render(template_name, context)
+
+    response = HttpResponse(page.body)
+    response["ETag"] = page.etag
+    response["Last-Modified"] = http_date(page.last_modified)
+    response["Cache-Control"] = "no-cache"
+    if vary:
+        patch_vary_headers(response, vary)
+    return get_conditional_response(request, etag=page.etag, last_modified=page.last_modified, response=response)
@@ -0,0 +1,256 @@
+"""Session index by user and server-side revocation of sessions and tokens.
+
+Every login is recorded in the Django cache under the user's ``sub``, together
+with the session's current refresh token. With a shared cache (``REDIS_URL``)
+that gives any node a view of all of a user's sessions, so one call can end
+them fleet-wide: :func:`revoke_user` marks the user's sessions as revoked and
+revokes their refresh tokens at ZITADEL's revocation endpoint (RFC 7009), and
+:func:`revoke_session` does the same for a single session.
+
+Revocation markers are plain cache keys, one per session ID and one per user
+holding the time of the last revocation, so :func:`is_revoked` costs a single
+``get_many`` whatever the number of revoked sessions. ``require_auth`` checks
+it on every request. Markers and index entries expire with the session
+(``SESSION_DURATION``).
+
+With ``ZITADEL_TENANTS_FILE``, every tenant has its own index and markers:
+keys of a tenant's sessions carry its key, so a back-channel logout or
+revocation in one tenant never collects refresh tokens issued to another
+tenant's client, and revoking a token always goes through the client that
+received it. Functions that take no session work on the active tenant.
+
+The index holds refresh tokens, so the cache must be as private as the
+session store.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.core.cache import cache
+
+from lib.config import config
+from lib.tenants import active_tenant
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent calls to the revocation endpoint per bulk revocation.
+REVOKE_CONCURRENCY = 8
+
+Index = dict[str, str | None]
+
+
+def _tenant_key(auth_session: dict[str, Any] | None = None) -> str:
+    """Return the key of the session's tenant, or of the active one without a session."""
+    if auth_session is not None:
+        return str(auth_session.get("tenant", ""))
+    tenant = active_tenant()
+    return tenant.key if tenant else ""
+
+
+def _prefix(tenant: str) -> str:
+    # The default tenant keeps the keys used before tenants existed.
+    return f"zitadel:{tenant}:" if tenant else "zitadel:"
+
+
+def _index_key(tenant: str, sub: str) -> str:
+    return f"{_prefix(tenant)}sessions:{sub}"
+
+
+def _sid_key(tenant: str, sid: str) -> str:
+    return f"{_prefix(tenant)}revoked:sid:{sid}"
+
+
+def _sub_key(tenant: str, sub: str) -> str:
+    return f"{_prefix(tenant)}revoked:sub:{sub}"
+
+
+def new_session_fields(token: dict[str, Any]) -> dict[str, Any]:
+    """Return the identifying fields for a new session's ``auth_session``.
+
+    The session ID is ZITADEL's ``sid`` claim when the ID token carries one, so
+    back-channel logout tokens can name the session directly.
+    """
+    sid = (token.get("userinfo") or {}).get("sid") or secrets.token_urlsafe(16)
+    return {"sid": sid, "created_at": int(time.time())}
+
+
+def _edit_index(tenant: str, sub: str, change: Callable[[Index], None]) -> Index:
+    """Apply ``change`` to a user's index in ``tenant`` under a short cache lock."""
+    key = _index_key(tenant, sub)
+    locked = False
+    for _ in range(20):
+        locked = cache.add(f"{key}:lock", 1, timeout=5)
+        if locked:
+            break
+        time.sleep(0.01)
+    try:
+        index: Index = cache.get(key) or {}
+        change(index)
+        if index:
+            cache.set(key, index, timeout=config.SESSION_DURATION)
+        else:
+            cache.delete(key)
+        return index
+    finally:
+        if locked:
+            cache.delete(f"{key}:lock")
+
+
+def track_session(auth_session: dict[str, Any]) -> None:
+    """Record a session, or its rotated refresh token, in the user's index."""
+    sub = (auth_session.get("user") or {}).get("sub")
+    sid = auth_session.get("sid")
+    if sub and sid:
+        _edit_index(_tenant_key(auth_session), sub, lambda index: index.__setitem__(sid, auth_session.get("refresh_token")))
+
+
+def sessions_for(sub: str) -> Index:
+    """Return the user's indexed sessions in the active tenant, by session ID with their refresh tokens."""
+    return dict(cache.get(_index_key(_tenant_key(), sub)) or {})
+
+
+def _revocation_keys(auth_session: dict[str, Any]) -> list[str]:
+    tenant = _tenant_key(auth_session)
+    keys = [_sub_key(tenant, auth_session["user"]["sub"])]
+    if auth_session.get("sid"):
+        keys.append(_sid_key(tenant, auth_session["sid"]))
+    return keys
+
+
+def _revoked(auth_session: dict[str, Any], markers: dict[str, Any]) -> bool:
+    tenant = _tenant_key(auth_session)
+    if auth_session.get("sid") and _sid_key(tenant, auth_session["sid"]) in markers:
+        return True
+    revoked_at = markers.get(_sub_key(tenant, auth_session["user"]["sub"]))
+    return revoked_at is not None and auth_session.get("created_at", 0) <= revoked_at
+
+
+def is_revoked(auth_session: dict[str, Any]) -> bool:
+    """Check whether a session was revoked, with one cache round trip."""
+    return _revoked(auth_session, cache.get_many(_revocation_keys(auth_session)))
+
+
+async def ais_revoked(auth_session: dict[str, Any]) -> bool:
+    """Async variant of :func:`is_revoked`."""
+    return _revoked(auth_session, await cache.aget_many(_revocation_keys(auth_session)))
+
+
+def revoke_tokens(tokens: list[str]) -> int:
+    """Revoke refresh tokens at ZITADEL's revocation endpoint, concurrently.
+
+    The tokens must have been issued to the active tenant's client, which
+    authenticates the calls.
+
+    Returns:
+        int: The number of tokens ZITADEL confirmed as revoked
+    """
+    if not tokens or not config.ZITADEL_REVOKE_TOKENS:
+        return 0
+
+    from lib.auth import oauth
+
+    # Resolved here, as the pool's threads do not see the current tenant.
+    client = oauth.zitadel
+    try:
+        endpoint = client.load_server_metadata().get("revocation_endpoint")
+    except Exception as e:
+        logger.warning("Could not load metadata, %d tokens left valid: %s", len(tokens), str(e))
+        return 0
+    if not endpoint:
+        logger.warning("ZITADEL advertises no revocation endpoint, %d tokens left valid", len(tokens))
+        return 0
+
+    def revoke(token: str) -> bool:
+        try:
+            response = client.http.session.post(
+                endpoint,
+                data={"token": token, "token_type_hint": "refresh_token"},
+                auth=(client.client_id, client.client_secret),
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning("Token revocation failed: %s", str(e))
+            return False
+
+    if len(tokens) == 1:
+        return int(revoke(tokens[0]))
+    with ThreadPoolExecutor(max_workers=min(len(tokens), REVOKE_CONCURRENCY)) as pool:
+        return sum(pool.map(revoke, tokens))
+
+
+def revoke_session(sub: str, sid: str, refresh_token: str | None = None) -> None:
+    """End one session of the active tenant everywhere and revoke its refresh token.
+
+    Args:
+        sub: The user the session belongs to
+        sid: The session ID
+        refresh_token: The session's refresh token, if known; otherwise the one
+            in the index is revoked
+    """
+    tenant = _tenant_key()
+    cache.set(_sid_key(tenant, sid), 1, timeout=config.SESSION_DURATION)
+    removed: list[str | None] = []
+    _edit_index(tenant, sub, lambda index: removed.append(index.pop(sid, None)))
+    token = refresh_token or removed[0]
+    if token:
+        revoke_tokens([token])
+
+
+def revoke_user(sub: str) -> int:
+    """End all of a user's sessions in the active tenant and revoke their refresh tokens.
+
+    Sessions created up to now are rejected even if they never made it into
+    the index, e.g. because the cache was flushed.
+
+    Returns:
+        int: The number of indexed sessions that were ended
+    """
+    return revoke_batch([(sub, None)])
+
+
+def revoke_batch(targets: list[tuple[str | None, str | None]]) -> int:
+    """Apply many revocations in the active tenant at once.
+
+    Each target is a ``(sub, sid)`` pair: a session ID ends that session, a
+    ``sub`` without one ends all of the user's sessions. All markers are written
+    with one ``set_many`` and all affected refresh tokens are revoked in one
+    bulk call.
+
+    Returns:
+        int: The number of indexed sessions that were ended
+    """
+    tenant = _tenant_key()
+    now = int(time.time())
+    markers: dict[str, int] = {}
+    all_sessions: set[str] = set()
+    sids_by_sub: dict[str, set[str]] = {}
+    for sub, sid in targets:
+        if sid:
+            markers[_sid_key(tenant, sid)] = 1
+            if sub:
+                sids_by_sub.setdefault(sub, set()).add(sid)
+        elif sub:
+            markers[_sub_key(tenant, sub)] = now
+            all_sessions.add(sub)
+    cache.set_many(markers, timeout=config.SESSION_DURATION)
+
+    ended: list[str | None] = []
+    for sub in all_sessions | sids_by_sub.keys():
+        sids = None if sub in all_sessions else sids_by_sub[sub]
+
+        def remove(index: Index, sids: set[str] | None = sids) -> None:
+            for sid in list(index) if sids is None else sids & index.keys():
+                ended.append(index.pop(sid))
+
+        _edit_index(tenant, sub, remove)
+
+    revoked = revoke_tokens([token for token in ended if token])
+    logger.info("Revoked %d sessions and %d refresh tokens", len(ended), revoked)
+    return len(ended)
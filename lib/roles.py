@@ -0,0 +1,114 @@
+"""Role and permission checks for views, from ZITADEL's project role claims.
+
+With the ``urn:zitadel:iam:org:projects:roles`` scope, ZITADEL sends the
+user's role assignments as nested claims::
+
+    "urn:zitadel:iam:org:project:roles": {"admin": {"<org id>": "<org domain>"}}
+
+:func:`role_index` flattens them once at login into a short list stored in
+``auth_session["roles"]``: every role name, plus ``role@<org id>`` for each
+organization it was granted in. On a request, ``request.auth.roles`` holds
+the list as a frozenset and each check is a membership test. Permissions are
+mapped from roles in :data:`ROLE_PERMISSIONS`, resolved once per distinct set
+of roles.
+
+Roles are taken from the login and kept for the session's lifetime. A user
+whose roles change sees the change after signing in again.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from collections.abc import Iterable
+from functools import wraps
+from typing import Any, Callable, TypeVar, cast
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+
+from lib.context import aget_auth, get_auth
+from lib.guard import require_auth
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+ROLES_CLAIM = re.compile(r"^urn:zitadel:iam:org:project:(?:[^:]+:)?roles$")
+
+# The permissions each role grants, e.g. {"admin": frozenset({"users.read", "users.write"})}.
+ROLE_PERMISSIONS: dict[str, frozenset[str]] = {}
+
+
+def role_index(claims: dict[str, Any]) -> list[str]:
+    """Flatten the project role claims into the sorted entries stored with the session."""
+    index = set()
+    for claim, roles in claims.items():
+        if not ROLES_CLAIM.match(claim) or not isinstance(roles, dict):
+            continue
+        for role, orgs in roles.items():
+            index.add(role)
+            index.update(f"{role}@{org_id}" for org_id in orgs or {})
+    return sorted(index)
+
+
+@functools.lru_cache(maxsize=256)
+def _permissions(roles: frozenset[str]) -> frozenset[str]:
+    return frozenset().union(*(ROLE_PERMISSIONS.get(role, frozenset()) for role in roles))
+
+
+def user_roles(request: HttpRequest) -> frozenset[str]:
+    """Return the signed-in user's role index."""
+    return get_auth(request).roles
+
+
+def user_permissions(request: HttpRequest) -> frozenset[str]:
+    """Return the permissions granted by the signed-in user's roles."""
+    return _permissions(user_roles(request))
+
+
+def _require(allowed: Callable[[HttpRequest], bool]) -> Callable[[F], F]:
+    """Build a decorator that applies ``require_auth`` and then ``allowed``."""
+
+    def decorator(view: F) -> F:
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def acheck(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+                await aget_auth(request)  # loads the session without blocking
+                if not allowed(request):
+                    return HttpResponseForbidden()
+                return cast(HttpResponse, await view(request, *args, **kwargs))
+
+            return require_auth(cast(F, markcoroutinefunction(acheck)))
+
+        @wraps(view)
+        def check(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+            if not allowed(request):
+                return HttpResponseForbidden()
+            return cast(HttpResponse, view(request, *args, **kwargs))
+
+        return require_auth(cast(F, check))
+
+    return decorator
+
+
+def require_role(*roles: str, org: str | None = None) -> Callable[[F], F]:
+    """Allow the view for signed-in users holding any of ``roles``, else answer 403.
+
+    Args:
+        roles: Role keys as defined in the ZITADEL project
+        org: Only count roles granted in this organization ID
+    """
+    wanted = frozenset(f"{role}@{org}" if org else role for role in roles)
+    return _require(lambda request: not wanted.isdisjoint(user_roles(request)))
+
+
+def require_permission(*permissions: str) -> Callable[[F], F]:
+    """Allow the view for signed-in users whose roles grant all of ``permissions``, else answer 403."""
+    wanted = frozenset(permissions)
+    return _require(lambda request: wanted <= user_permissions(request))
+
+
+def grant(role: str, permissions: Iterable[str]) -> None:
+    """Add to the permissions a role grants."""
+    ROLE_PERMISSIONS[role] = ROLE_PERMISSIONS.get(role, frozenset()) | frozenset(permissions)
+    _permissions.cache_clear()
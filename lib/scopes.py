@@ -84,7 +84,8 @@ from __future__ import annotations
 # you've added to user profiles such as employee IDs, department information,
 # custom preferences, or any other organization-specific user data.
 #
-# Claims provided: urn:zitadel:iam:user:metadata (base64 encoded values)
+# Claims provided: urn:zitadel:iam:user:metadata (base64 encoded values, decoded
+# once at login into auth_session["metadata"], see lib.metadata)
 # Use case: Employee directories, custom user properties, business logic
 # Security: May contain sensitive business or personal information
 
@@ -108,6 +109,7 @@ from __future__ import annotations
 #
 # Claims provided: urn:zitadel:iam:org:project:{projectid}:roles
 # Use case: RBAC, permission checks, feature flags, admin interfaces
+#           (see require_role / require_permission in lib/roles.py)
 # Security: Contains authorization and privilege information
 
 # urn:zitadel:iam:org:project:id:zitadel:aud - ZITADEL Management API (DISABLED)
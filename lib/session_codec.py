@@ -0,0 +1,119 @@
+"""Compact serializer for session data.
+
+Most of a signed-cookie session is JWTs: the ID token and, depending on the
+application settings, a JWT access token. They are base64url text, and the
+cookie encodes the serialized session with base64 again, so every token byte
+costs almost two bytes on the wire and the redundancy inside the tokens (the
+repeated JSON headers and claim names) is hidden from the compressor.
+
+:class:`CompactSerializer` splits every JWT into the raw bytes of its three
+segments and stores them after a compact JSON document that references them.
+Django's signer then compresses the whole payload with zlib before encoding
+it once, so the JSON parts of the tokens compress along with the rest of the
+session. Payloads written by Django's ``JSONSerializer`` are still read, so
+existing sessions stay valid when this serializer is enabled.
+
+The tokens themselves stay in the cookie: this only makes them cheaper to
+carry. Moving them out would need storage that every worker shares, and with
+that in place ``SESSION_STORE=cache`` (:mod:`lib.sessions`) already keeps the
+whole session, tokens included, on the server and sends only an ID.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import re
+import struct
+from typing import Any
+
+# Compact JWTs start with a base64url-encoded JSON header, i.e. '{"' -> 'eyJ'.
+JWT_PATTERN = re.compile(r"^eyJ[\w-]*\.[\w-]+\.[\w-]*$", re.ASCII)
+
+FORMAT_VERSION = 1
+
+_LENGTH = struct.Struct(">I")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def split_jwt(token: str) -> list[bytes] | None:
+    """Decode the segments of a compact JWT to raw bytes.
+
+    Returns:
+        Optional[list[bytes]]: The three segments, or None if the token would
+        not survive re-encoding byte for byte
+    """
+    if not JWT_PATTERN.match(token):
+        return None
+    segments = token.split(".")
+    try:
+        raw = [_b64decode(segment) for segment in segments]
+    except ValueError:
+        return None
+    if [_b64encode(data) for data in raw] != segments:
+        return None
+    return raw
+
+
+class CompactSerializer:
+    """Session serializer that stores JWTs as raw bytes next to a compact JSON document.
+
+    Layout: a version byte, the length-prefixed UTF-8 JSON document, then the
+    length-prefixed segments of each token. The document holds the session
+    with tokens replaced by null, plus the key path of every token, so loading
+    puts the tokens back without walking the whole session.
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        segments: list[bytes] = []
+        paths: list[list[Any]] = []
+
+        def pack(value: Any, path: list[Any]) -> Any:
+            if isinstance(value, dict):
+                return {key: pack(item, [*path, key]) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [pack(item, [*path, index]) for index, item in enumerate(value)]
+            if isinstance(value, str):
+                raw = split_jwt(value)
+                if raw is not None:
+                    segments.extend(raw)
+                    paths.append(path)
+                    return None
+            return value
+
+        document = json.dumps([pack(obj, []), paths], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        parts = [bytes([FORMAT_VERSION]), _LENGTH.pack(len(document)), document]
+        for segment in segments:
+            parts += [_LENGTH.pack(len(segment)), segment]
+        return b"".join(parts)
+
+    def loads(self, data: bytes) -> Any:
+        if data[:1] != bytes([FORMAT_VERSION]):
+            # Written by Django's JSONSerializer before this one was enabled.
+            return json.loads(data.decode("latin-1"))
+
+        (length,) = _LENGTH.unpack_from(data, 1)
+        offset = 1 + _LENGTH.size
+        obj, paths = json.loads(data[offset : offset + length].decode("utf-8"))
+        offset += length
+
+        for path in paths:
+            segments = []
+            for _ in range(3):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                segments.append(_b64encode(data[offset : offset + length]))
+                offset += length
+
+            parent = obj
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = ".".join(segments)
+        return obj
@@ -0,0 +1,64 @@
+"""Server-side session engine that adopts existing signed-cookie sessions.
+
+With the signed-cookie engine every request uploads the whole session,
+including the user's claims and all three tokens, and the server verifies and
+decodes it each time. This engine keeps the session in the Django cache
+instead, so the cookie only carries an opaque session ID and token material
+never leaves the server. Entries expire after ``SESSION_DURATION`` seconds.
+
+Switching engines would normally sign every user out. To avoid that, a cookie
+that is not a known session ID but a valid signed-cookie session is imported:
+its data is stored server-side under a new ID, and the response replaces the
+old cookie with that ID.
+
+Enable it with ``SESSION_STORE=cache`` (see ``project/settings.py``).
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from django.contrib.sessions.backends import signed_cookies
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+
+logger = logging.getLogger(__name__)
+
+
+def load_signed_cookie(value: str | None) -> dict[str, Any]:
+    """Decode a session cookie written by the signed-cookie engine.
+
+    Returns:
+        dict: The session data, or an empty dict if the value is not a valid,
+        unexpired signed-cookie session
+    """
+    # Session IDs are alphanumeric; signed cookies always contain separators.
+    if not value or ":" not in value:
+        return {}
+    return dict(signed_cookies.SessionStore(value).load())
+
+
+class SessionStore(CacheSessionStore):
+    """Cache-backed session store with transparent signed-cookie migration."""
+
+    def load(self) -> dict[str, Any]:
+        cookie = self.session_key
+        data: dict[str, Any] = super().load()
+        if self.session_key is None:
+            migrated = load_signed_cookie(cookie)
+            if migrated:
+                self._session_cache = data = migrated
+                self.create()
+                logger.info("Migrated signed-cookie session to the server-side store")
+        return data
+
+    async def aload(self) -> dict[str, Any]:
+        cookie = self.session_key
+        data: dict[str, Any] = await super().aload()
+        if self.session_key is None:
+            migrated = load_signed_cookie(cookie)
+            if migrated:
+                self._session_cache = data = migrated
+                await self.acreate()
+                logger.info("Migrated signed-cookie session to the server-side store")
+        return data
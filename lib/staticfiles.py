@@ -0,0 +1,229 @@
+"""Fingerprinted, precompressed static files served straight from WSGI.
+
+In production ``collectstatic`` runs through
+:class:`CompressedManifestStaticFilesStorage`, which copies every asset under a
+content-hashed name (``app-logo.3f2a9c1b.svg``), records the mapping in
+``staticfiles.json`` and writes ``.gz`` and, with the ``brotli`` package
+installed, ``.br`` variants next to each compressible file. Templates link to
+assets with ``static("app-logo.svg")``, which resolves the hashed name.
+
+:class:`StaticFileServer` wraps the WSGI application and answers requests under
+``STATIC_URL`` from ``STATIC_ROOT`` before they reach Django. The directory is
+indexed once at startup; each request picks the smallest variant the client
+accepts. Hashed names never change content, so they are sent with a one-year
+``immutable`` Cache-Control and browsers do not ask for them again.
+
+Without ``staticfiles.json`` every ``static()`` call fails, so the WSGI and
+ASGI entry points call :func:`check_manifest` at startup and refuse to serve
+rather than answer every page with a 500.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import mimetypes
+import os
+from collections.abc import Callable, Iterable, Iterator
+from email.utils import formatdate
+from typing import Any, NamedTuple
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = frozenset({".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".xml"})
+# Variants that do not save at least this fraction of the original are dropped.
+MIN_SAVING = 0.05
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=60"
+
+# Preferred first: the client's first acceptable match is served.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+StartResponse = Callable[..., Any]
+WSGIApp = Callable[[dict[str, Any], StartResponse], Iterable[bytes]]
+
+
+def _compress(path: str) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes precompressed variants of text assets."""
+
+    def post_process(self, paths: dict[str, Any], dry_run: bool = False, **options: Any) -> Iterator[Any]:
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                _compress(self.path(name))
+
+
+def manifest_missing() -> bool:
+    """Whether the static files storage needs a manifest that ``collectstatic`` has not written yet."""
+    return isinstance(staticfiles_storage, ManifestStaticFilesStorage) and not staticfiles_storage.exists(
+        staticfiles_storage.manifest_name
+    )
+
+
+def check_manifest() -> None:
+    """Fail at startup when templates could not resolve fingerprinted asset names.
+
+    Raises:
+        ImproperlyConfigured: If the manifest storage is in use and
+            ``STATIC_ROOT`` holds no ``staticfiles.json``
+    """
+    if manifest_missing():
+        raise ImproperlyConfigured(
+            f"{staticfiles_storage.path(staticfiles_storage.manifest_name)} is missing; "
+            "run `python manage.py collectstatic --noinput` before starting in production"
+        )
+
+
+class Variant(NamedTuple):
+    path: str
+    size: int
+    etag: str
+
+
+class StaticFile(NamedTuple):
+    content_type: str
+    last_modified: str
+    cache_control: str
+    variants: dict[str, Variant]  # by content coding, "identity" always present
+
+
+def _variant(path: str) -> Variant:
+    stat = os.stat(path)
+    return Variant(path, stat.st_size, f'"{stat.st_size:x}-{int(stat.st_mtime):x}"')
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Compare ``etag`` with an If-None-Match header, weakly as RFC 9110 asks for."""
+    if not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    return tags == ["*"] or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def _immutable_names(root: str) -> set[str]:
+    try:
+        with open(os.path.join(root, ManifestStaticFilesStorage.manifest_name)) as f:
+            return set(json.load(f).get("paths", {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def scan(root: str) -> dict[str, StaticFile]:
+    """Index the files under ``root`` by URL path relative to ``STATIC_URL``."""
+    immutable = _immutable_names(root)
+    files = {}
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            if filename.endswith((".gz", ".br")):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            variants = {"identity": _variant(path)}
+            for coding, suffix in ENCODINGS:
+                if os.path.exists(path + suffix):
+                    variants[coding] = _variant(path + suffix)
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            files[name] = StaticFile(
+                content_type=content_type,
+                last_modified=formatdate(os.stat(path).st_mtime, usegmt=True),
+                cache_control=IMMUTABLE if name in immutable else REVALIDATE,
+                variants=variants,
+            )
+    return files
+
+
+class StaticFileServer:
+    """WSGI middleware serving ``STATIC_ROOT`` under ``STATIC_URL`` without Django.
+
+    Requests for unknown files fall through to the wrapped application.
+    """
+
+    def __init__(self, application: WSGIApp, root: str, prefix: str) -> None:
+        self.application = application
+        self.prefix = "/" + prefix.strip("/") + "/"
+        self.files = scan(root)
+
+    def __call__(self, environ: dict[str, Any], start_response: StartResponse) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        file = self.files.get(path[len(self.prefix) :]) if path.startswith(self.prefix) else None
+        if file is None:
+            return self.application(environ, start_response)
+
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method not in ("GET", "HEAD"):
+            start_response("405 Method Not Allowed", [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+            return []
+
+        coding, variant = self._select(file, environ.get("HTTP_ACCEPT_ENCODING", ""))
+        headers = [
+            ("Cache-Control", file.cache_control),
+            ("ETag", variant.etag),
+            ("Last-Modified", file.last_modified),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if coding != "identity":
+            headers.append(("Content-Encoding", coding))
+
+        if _etag_matches(variant.etag, environ.get("HTTP_IF_NONE_MATCH", "")):
+            start_response("304 Not Modified", headers)
+            return []
+
+        headers += [("Content-Type", file.content_type), ("Content-Length", str(variant.size))]
+        start_response("200 OK", headers)
+        if method == "HEAD":
+            return []
+        f = open(variant.path, "rb")  # closed by the server through the returned iterable
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        return file_wrapper(f) if file_wrapper else _iter_file(f)
+
+    @staticmethod
+    def _select(file: StaticFile, accept_encoding: str) -> tuple[str, Variant]:
+        if len(file.variants) > 1:
+            accepted = _accepted_encodings(accept_encoding)
+            for coding, _ in ENCODINGS:
+                if coding in file.variants and coding in accepted:
+                    return coding, file.variants[coding]
+        return "identity", file.variants["identity"]
+
+
+def _iter_file(f: Any, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    with f:
+        while block := f.read(block_size):
+            yield block
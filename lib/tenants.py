@@ -0,0 +1,213 @@
+"""Serving several ZITADEL instances or organizations from one deployment.
+
+``ZITADEL_TENANTS_FILE`` names a JSON file that maps tenant keys to the
+settings of each tenant's ZITADEL application::
+
+    {
+        "acme.example.com": {
+            "domain": "https://acme.zitadel.cloud",
+            "client_id": "...",
+            "client_secret": "...",
+            "callback_url": "https://acme.example.com/auth/callback",
+            "post_login_url": "/profile",
+            "post_logout_url": "https://acme.example.com/"
+        }
+    }
+
+A key is a host (``acme.example.com``), a path prefix the application is
+mounted under (``/acme``, i.e. the request's ``SCRIPT_NAME`` as set by the
+reverse proxy) or both (``portal.example.com/acme``). :class:`TenantMiddleware`
+resolves the tenant of each request and makes it current for the request's
+context, so ``oauth.zitadel`` is that tenant's client. Requests that match no
+key are served with the ``ZITADEL_*`` settings.
+
+Each tenant's client is created on its first request, with its own discovery
+and JWKS caches, connection pools and circuit breaker. :class:`ClientRegistry`
+keeps the ``ZITADEL_TENANT_CACHE_SIZE`` most recently used ones; evicting an
+idle tenant closes its connections, and its next request starts with cold
+caches.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+from urllib.parse import urlparse
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpRequest
+
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_SETTINGS = ("domain", "client_id", "client_secret", "callback_url")
+
+
+class Tenant(NamedTuple):
+    key: str  # "" for the tenant configured through the ZITADEL_* settings
+    domain: str
+    client_id: str
+    client_secret: str
+    callback_url: str
+    post_login_url: str
+    post_logout_url: str
+
+
+_active: contextvars.ContextVar[Tenant | None] = contextvars.ContextVar("zitadel_tenant", default=None)
+
+
+def default_tenant() -> Tenant:
+    """Return the tenant described by the ``ZITADEL_*`` settings."""
+    return Tenant(
+        key="",
+        domain=config.ZITADEL_DOMAIN,
+        client_id=config.ZITADEL_CLIENT_ID,
+        client_secret=config.ZITADEL_CLIENT_SECRET,
+        callback_url=config.ZITADEL_CALLBACK_URL,
+        post_login_url=config.ZITADEL_POST_LOGIN_URL,
+        post_logout_url=config.ZITADEL_POST_LOGOUT_URL,
+    )
+
+
+def parse_tenants(document: dict[str, Any]) -> dict[str, Tenant]:
+    """Build tenants from a parsed tenants file.
+
+    Raises:
+        ImproperlyConfigured: If a tenant lacks a required setting
+    """
+    tenants = {}
+    for key, settings in document.items():
+        missing = [name for name in REQUIRED_SETTINGS if not settings.get(name)]
+        if missing:
+            raise ImproperlyConfigured(f"Tenant {key!r} is missing {', '.join(missing)}")
+        parsed = urlparse(settings["domain"])
+        tenants[key.rstrip("/")] = Tenant(
+            key=key.rstrip("/"),
+            domain=f"{parsed.scheme}://{parsed.netloc}",
+            client_id=settings["client_id"],
+            client_secret=settings["client_secret"],
+            callback_url=settings["callback_url"],
+            post_login_url=settings.get("post_login_url", "/profile"),
+            post_logout_url=settings.get("post_logout_url", "/"),
+        )
+    return tenants
+
+
+@functools.lru_cache(maxsize=1)
+def configured_tenants() -> dict[str, Tenant]:
+    """Return the tenants from ``ZITADEL_TENANTS_FILE``, read once."""
+    if not config.ZITADEL_TENANTS_FILE:
+        return {}
+    with open(config.ZITADEL_TENANTS_FILE) as f:
+        return parse_tenants(json.load(f))
+
+
+def resolve(host: str, script_name: str = "") -> Tenant | None:
+    """Find the tenant for a request's host and mount point, most specific key first."""
+    tenants = configured_tenants()
+    prefix = script_name.rstrip("/")
+    for key in (host + prefix, prefix, host) if prefix else (host,):
+        tenant = tenants.get(key)
+        if tenant is not None:
+            return tenant
+    return None
+
+
+def active_tenant() -> Tenant | None:
+    """Return the tenant of the current request, or None outside a tenant."""
+    return _active.get()
+
+
+def current_tenant() -> Tenant:
+    """Return the tenant of the current request, falling back to the ``ZITADEL_*`` settings."""
+    return _active.get() or default_tenant()
+
+
+@contextmanager
+def using(tenant: Tenant | None) -> Iterator[None]:
+    """Make ``tenant`` current for the duration of the block."""
+    token = _active.set(tenant)
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+class ClientRegistry:
+    """OAuth clients by tenant key, evicting the least recently used ones.
+
+    Attributes:
+        factory: Creates the client for a tenant
+    """
+
+    def __init__(self, factory: Callable[[Tenant], Any], maxsize: int | None = None) -> None:
+        self.factory = factory
+        self._maxsize = maxsize
+        self._clients: OrderedDict[Tenant, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self) -> int:
+        return config.ZITADEL_TENANT_CACHE_SIZE if self._maxsize is None else self._maxsize
+
+    def get(self, tenant: Tenant) -> Any:
+        """Return the tenant's client, creating it on first use."""
+        with self._lock:
+            client = self._clients.get(tenant)
+            if client is not None:
+                self._clients.move_to_end(tenant)
+                return client
+            client = self.factory(tenant)
+            self._clients[tenant] = client
+            while len(self._clients) > max(self.maxsize, 1):
+                evicted, idle = self._clients.popitem(last=False)
+                idle.http.close()
+                logger.info("Closed idle client of tenant %s", evicted.key)
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.http.close()
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+class TenantMiddleware:
+    """Make the tenant matching the request's host or mount point current.
+
+    Installed by the settings when ``ZITADEL_TENANTS_FILE`` is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with using(self._resolve(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> Any:
+        with using(self._resolve(request)):
+            return await self.get_response(request)
+
+    @staticmethod
+    def _resolve(request: HttpRequest) -> Tenant | None:
+        return resolve(request.get_host(), request.META.get("SCRIPT_NAME", ""))
@@ -0,0 +1,205 @@
+"""Cached access to ZITADEL's userinfo endpoint.
+
+Single-page apps poll ``/auth/userinfo``, and without a cache every poll is a
+round trip to ZITADEL that returns the same claims. Responses are kept in the
+Django cache for ``ZITADEL_USERINFO_CACHE_TTL`` seconds, keyed by the subject
+and a fingerprint of the access token, so a refreshed or different token never
+sees another token's claims. Concurrent misses for the same key share one
+upstream call per process, and with a shared cache a process that finds
+another one revalidating keeps serving the expired copy instead of piling on.
+
+Expired entries are kept a while longer so they can be revalidated with
+``If-None-Match`` when ZITADEL sent an ``ETag``. Towards the browser, the view
+answers with an ``ETag`` of its own and ``304 Not Modified`` for unchanged
+claims.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from typing import Any
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+# Entries outlive their TTL by this factor so they can still be revalidated.
+KEEP_FACTOR = 10
+
+_locks: weakref.WeakValueDictionary[str, threading.Lock] = weakref.WeakValueDictionary()
+_alocks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+_locks_guard = threading.Lock()
+
+
+def cache_key(sub: str, access_token: str) -> str:
+    fingerprint = hashlib.sha256(access_token.encode()).hexdigest()[:32]
+    return f"zitadel:userinfo:{sub}:{fingerprint}"
+
+
+def _is_fresh(entry: dict[str, Any] | None) -> bool:
+    return entry is not None and time.time() - entry["fetched_at"] < config.ZITADEL_USERINFO_CACHE_TTL
+
+
+def _request_headers(access_token: str, entry: dict[str, Any] | None) -> dict[str, str]:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    if config.ZITADEL_USERINFO_REVALIDATE and entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    return headers
+
+
+def _updated_entry(entry: dict[str, Any] | None, status: int, claims: Any, etag: str | None) -> dict[str, Any]:
+    """Build the cache entry from an upstream response (a 304 keeps the old claims)."""
+    if status == 304 and entry is not None:
+        logger.debug("Userinfo revalidated, claims unchanged")
+        return {**entry, "fetched_at": time.time()}
+    return {"claims": claims, "etag": etag, "fetched_at": time.time()}
+
+
+def _fetch(access_token: str, entry: dict[str, Any] | None) -> dict[str, Any]:
+    from lib.auth import oauth
+
+    metadata = oauth.zitadel.load_server_metadata()
+    response = oauth.zitadel.http.session.get(metadata["userinfo_endpoint"], headers=_request_headers(access_token, entry))
+    if response.status_code != 304:
+        response.raise_for_status()
+    claims = response.json() if response.status_code != 304 else None
+    return _updated_entry(entry, response.status_code, claims, response.headers.get("ETag"))
+
+
+async def _afetch(access_token: str, entry: dict[str, Any] | None) -> dict[str, Any]:
+    from lib.auth import oauth
+
+    metadata = await oauth.zitadel.aload_server_metadata()
+    response = await oauth.zitadel.http.aio.request(
+        "GET", metadata["userinfo_endpoint"], headers=_request_headers(access_token, entry)
+    )
+    if response.status_code != 304:
+        response.raise_for_status()
+    claims = response.json() if response.status_code != 304 else None
+    return _updated_entry(entry, response.status_code, claims, response.headers.get("ETag"))
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def _alock_for(key: str) -> asyncio.Lock:
+    with _locks_guard:
+        lock = _alocks.get(key)
+        if lock is None:
+            lock = _alocks[key] = asyncio.Lock()
+        return lock
+
+
+def get_userinfo(sub: str, access_token: str) -> dict[str, Any]:
+    """Return the userinfo claims for a token, calling ZITADEL at most once per TTL.
+
+    Raises:
+        Exception: If ZITADEL cannot be reached and no earlier copy is cached
+    """
+    if config.ZITADEL_USERINFO_CACHE_TTL <= 0:
+        return dict(_fetch(access_token, None)["claims"])
+
+    key = cache_key(sub, access_token)
+    entry = cache.get(key)
+    if _is_fresh(entry):
+        return dict(entry["claims"])
+
+    with _lock_for(key):
+        entry = cache.get(key)
+        if _is_fresh(entry):
+            return dict(entry["claims"])
+
+        locked = cache.add(f"{key}:lock", 1, timeout=config.ZITADEL_HTTP_READ_TIMEOUT)
+        if not locked and entry is not None:
+            return dict(entry["claims"])
+        try:
+            entry = _fetch(access_token, entry)
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning("Userinfo refresh failed, serving cached claims: %s", str(e))
+            return dict(entry["claims"])
+        finally:
+            if locked:
+                cache.delete(f"{key}:lock")
+
+        cache.set(key, entry, timeout=config.ZITADEL_USERINFO_CACHE_TTL * KEEP_FACTOR)
+        return dict(entry["claims"])
+
+
+async def aget_userinfo(sub: str, access_token: str) -> dict[str, Any]:
+    """Async variant of :func:`get_userinfo`."""
+    if config.ZITADEL_USERINFO_CACHE_TTL <= 0:
+        return dict((await _afetch(access_token, None))["claims"])
+
+    key = cache_key(sub, access_token)
+    entry = await cache.aget(key)
+    if _is_fresh(entry):
+        return dict(entry["claims"])
+
+    async with _alock_for(key):
+        entry = await cache.aget(key)
+        if _is_fresh(entry):
+            return dict(entry["claims"])
+
+        locked = await cache.aadd(f"{key}:lock", 1, timeout=config.ZITADEL_HTTP_READ_TIMEOUT)
+        if not locked and entry is not None:
+            return dict(entry["claims"])
+        try:
+            entry = await _afetch(access_token, entry)
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning("Userinfo refresh failed, serving cached claims: %s", str(e))
+            return dict(entry["claims"])
+        finally:
+            if locked:
+                await cache.adelete(f"{key}:lock")
+
+        await cache.aset(key, entry, timeout=config.ZITADEL_USERINFO_CACHE_TTL * KEEP_FACTOR)
+        return dict(entry["claims"])
+
+
+def invalidate(auth_session: dict[str, Any]) -> None:
+    """Drop the cached claims for a session's current access token."""
+    sub = (auth_session.get("user") or {}).get("sub")
+    access_token = auth_session.get("access_token")
+    if sub and access_token:
+        cache.delete(cache_key(sub, access_token))
+
+
+async def ainvalidate(auth_session: dict[str, Any]) -> None:
+    """Async variant of :func:`invalidate`."""
+    sub = (auth_session.get("user") or {}).get("sub")
+    access_token = auth_session.get("access_token")
+    if sub and access_token:
+        await cache.adelete(cache_key(sub, access_token))
+
+
+def userinfo_response(request: HttpRequest, claims: dict[str, Any]) -> HttpResponse:
+    """Answer with the claims, or with 304 if the browser already has them."""
+    body = json.dumps(claims, sort_keys=True, separators=(",", ":"))
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response: HttpResponse = HttpResponseNotModified()
+    else:
+        response = JsonResponse(claims)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
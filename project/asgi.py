@@ -0,0 +1,25 @@
+"""ASGI config for Django project.
+
+Serving through ASGI switches the auth endpoints that talk to ZITADEL to
+their async variants, so IdP round trips no longer hold a worker thread.
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+os.environ.setdefault("ASYNC_VIEWS", "true")
+
+application = get_asgi_application()
+
+from django.template import engines  # noqa: E402
+
+from lib.auth import warm_up  # noqa: E402
+from lib.staticfiles import check_manifest  # noqa: E402
+
+check_manifest()
+warm_up()
+engines.all()
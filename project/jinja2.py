@@ -1,16 +1,175 @@
+"""Jinja2 environment factory for the Django template backend.
+
+In production (``PY_ENV=production``) templates are never re-checked for
+changes, every template is compiled when the environment is created, and
+compiled templates are kept in a filesystem bytecode cache when
+``JINJA_BYTECODE_DIR`` is set. ``python manage.py compile_templates`` fills
+that directory at build time, so workers load bytecode instead of parsing and
+compiling templates on boot.
+
+``url_for`` is a :class:`UrlBuilder`: the URL of every route without
+parameters is computed once, and parameterized routes are reversed through a
+bounded LRU, so rendering a link does not walk the URL resolver each time.
+In production, a template that names an unknown route fails the worker at
+startup instead of on the first render.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+from collections.abc import Hashable
 from typing import Any
 
-from django.urls import reverse
-from jinja2 import Environment
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.templatetags.static import static
+from django.urls import NoReverseMatch, get_resolver, get_script_prefix, reverse
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+
+from lib.config import config
+
+logger = logging.getLogger(__name__)
+
+URL_CACHE_SIZE = 512
+
+
+class UrlBuilder:
+    """``url_for(route_name, **kwargs)`` with memoized reversal.
+
+    URLs of routes that take no arguments are computed together on first use
+    (per script prefix); other calls are cached in an LRU of ``maxsize``
+    entries keyed by route name and arguments.
+    """
+
+    def __init__(self, maxsize: int = URL_CACHE_SIZE) -> None:
+        self._static: dict[str, dict[str, str]] = {}
+        self._reverse = functools.lru_cache(maxsize=maxsize)(self._reverse_uncached)
+
+    def __call__(self, route_name: str, **kwargs: Any) -> str:
+        prefix = get_script_prefix()
+        if not kwargs:
+            static = self._static.get(prefix)
+            if static is None:
+                static = self._static[prefix] = self._argless_routes()
+            if route_name in static:
+                return static[route_name]
+        items = tuple(sorted(kwargs.items()))
+        if not all(isinstance(value, Hashable) for _, value in items):
+            return reverse(route_name, kwargs=kwargs)
+        return self._reverse(prefix, route_name, items)
+
+    @staticmethod
+    def _reverse_uncached(prefix: str, route_name: str, items: tuple[tuple[str, Any], ...]) -> str:
+        return reverse(route_name, kwargs=dict(items))
+
+    @staticmethod
+    def _argless_routes() -> dict[str, str]:
+        urls = {}
+        for name in get_resolver().reverse_dict:
+            if isinstance(name, str):
+                try:
+                    urls[name] = reverse(name)
+                except NoReverseMatch:
+                    pass
+        return urls
+
+    def clear(self) -> None:
+        self._static.clear()
+        self._reverse.cache_clear()
+
+
+url_for = UrlBuilder()
+
+
+@receiver(setting_changed)
+def _clear_url_cache(*, setting: str, **kwargs: Any) -> None:
+    if setting == "ROOT_URLCONF":
+        url_for.clear()
+
+
+def _route_exists(route_name: str) -> bool:
+    resolver = get_resolver()
+    *namespaces, name = route_name.split(":")
+    for namespace in namespaces:
+        if namespace not in resolver.namespace_dict:
+            return False
+        resolver = resolver.namespace_dict[namespace][1]
+    return bool(resolver.reverse_dict.getlist(name))
+
+
+def unresolved_url_names(env: Environment) -> dict[str, list[str]]:
+    """Find the route names passed to ``url_for`` in templates that no URL pattern has.
+
+    Only literal names are checked (``url_for("home")``, not
+    ``url_for(variable)``).
+
+    Returns:
+        dict[str, list[str]]: Unknown route names by template name
+    """
+    unresolved: dict[str, list[str]] = {}
+    for template_name in env.list_templates(extensions=["html"]):
+        source, _, _ = env.loader.get_source(env, template_name)  # type: ignore[union-attr]
+        for call in env.parse(source).find_all(nodes.Call):
+            if not (isinstance(call.node, nodes.Name) and call.node.name == "url_for" and call.args):
+                continue
+            arg = call.args[0]
+            if isinstance(arg, nodes.Const) and isinstance(arg.value, str) and not _route_exists(arg.value):
+                unresolved.setdefault(template_name, []).append(arg.value)
+    return unresolved
+
+
+def check_url_names(env: Environment) -> None:
+    """Fail if any template passes an unknown route name to ``url_for``.
+
+    Raises:
+        ImproperlyConfigured: Listing the unknown names per template
+    """
+    unresolved = unresolved_url_names(env)
+    if unresolved:
+        details = "; ".join(f"{name}: {', '.join(routes)}" for name, routes in sorted(unresolved.items()))
+        raise ImproperlyConfigured(f"url_for names a route that does not exist: {details}")
+
+
+def bytecode_cache(directory: str | None = None) -> FileSystemBytecodeCache | None:
+    """Return the bytecode cache for ``directory`` (default: ``JINJA_BYTECODE_DIR``), if any."""
+    directory = directory or config.JINJA_BYTECODE_DIR
+    return FileSystemBytecodeCache(directory) if directory else None
+
+
+def precompile(env: Environment) -> list[str]:
+    """Compile every template the environment's loader can list.
+
+    Compiled templates are kept in the environment's template cache and, if
+    one is configured, written to its bytecode cache.
+
+    Returns:
+        list[str]: The names of the compiled templates
+    """
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return names
 
 
 def environment(**options: Any) -> Environment:
     """Configure Jinja2 environment with Django URL resolver."""
     options.setdefault("autoescape", True)
+    production = config.PY_ENV == "production"
+    if production:
+        options["auto_reload"] = False
+        options.setdefault("bytecode_cache", bytecode_cache())
+
     env = Environment(**options)  # noqa: S701
     env.globals.update(
         {
-            "url_for": lambda route_name, **kwargs: reverse(route_name, kwargs=kwargs),
+            "url_for": url_for,
+            "static": static,
         }
     )
+
+    if production:
+        logger.info("Precompiled %d templates", len(precompile(env)))
+        check_url_names(env)
     return env
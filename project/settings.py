@@ -24,10 +24,20 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "lib.context.AuthContextMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if config.ZITADEL_TENANTS_FILE:
+    MIDDLEWARE.insert(0, "lib.tenants.TenantMiddleware")
+
+if config.METRICS_ENABLED:
+    MIDDLEWARE = [
+        "lib.metrics.MetricsMiddleware",
+        *("lib.metrics.TimedSessionMiddleware" if name.endswith(".SessionMiddleware") else name for name in MIDDLEWARE),
+    ]
+
 ROOT_URLCONF = "project.urls"
 
 TEMPLATES = [
@@ -42,6 +52,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "project.wsgi.application"
+ASGI_APPLICATION = "project.asgi.application"
 
 DATABASES = {
     "default": {
@@ -62,9 +73,27 @@ STATIC_URL = "/static/"
 
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+STATIC_ROOT = config.STATIC_ROOT or BASE_DIR / "build" / "static"
+
+if config.PY_ENV == "production":
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "lib.staticfiles.CompressedManifestStaticFilesStorage"},
+    }
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": config.REDIS_URL}
+        if config.REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+SESSION_ENGINE = "lib.sessions" if config.SESSION_STORE == "cache" else "django.contrib.sessions.backends.signed_cookies"
+
+SESSION_SERIALIZER = "lib.session_codec.CompactSerializer"
 
 SESSION_COOKIE_HTTPONLY = True
 
@@ -9,3 +9,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from django.template import engines  # noqa: E402
+
+from lib.auth import warm_up  # noqa: E402
+from lib.config import config  # noqa: E402
+from lib.staticfiles import StaticFileServer, check_manifest  # noqa: E402
+
+check_manifest()
+warm_up()
+engines.all()
+
+if config.PY_ENV == "production":
+    application = StaticFileServer(application, str(settings.STATIC_ROOT), settings.STATIC_URL)
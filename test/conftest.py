@@ -1,6 +1,12 @@
 from __future__ import annotations
 
 import os
+import time
+from typing import Any, Callable
+
+import pytest
+from django.conf import settings
+from django.test import Client
 
 os.environ.setdefault("PORT", "3000")
 os.environ.setdefault("SESSION_DURATION", "3600")
@@ -10,3 +16,28 @@ os.environ.setdefault("ZITADEL_CLIENT_ID", "mock-client-id")
 os.environ.setdefault("ZITADEL_CLIENT_SECRET", "mock-client-secret")
 os.environ.setdefault("ZITADEL_CALLBACK_URL", "http://localhost:3000/auth/callback")
 os.environ.setdefault("ZITADEL_POST_LOGOUT_URL", "http://localhost:3000/auth/logout/callback")
+
+
+@pytest.fixture
+def signed_in_client() -> Callable[..., Client]:
+    """Return a factory for test clients whose session holds a signed-in ``auth_session``.
+
+    Keyword arguments replace the fields of the default session, whose access
+    token is valid for another hour.
+    """
+
+    def make(**auth_session: Any) -> Client:
+        client = Client()
+        session = client.session
+        session["auth_session"] = {
+            "user": {"sub": "user-1"},
+            "access_token": "current",
+            "refresh_token": "r1",
+            "expires_at": int(time.time()) + 3600,
+            **auth_session,
+        }
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        return client
+
+    return make
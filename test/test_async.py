@@ -0,0 +1,114 @@
+"""Tests for the async IdP client and the async auth views."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from importlib import import_module
+from typing import Any
+
+import httpx
+import pytest
+from django.conf import settings
+from django.test import AsyncRequestFactory
+
+from lib import auth, guard
+from lib.http_client import HttpClient
+
+
+def test_async_client_retries_idempotent_requests() -> None:
+    """Test that a GET is retried on 503 while a POST is not."""
+    client = HttpClient(retries=2, backoff_factor=0)
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        return httpx.Response(503 if len(calls) == 1 else 200)
+
+    async def run() -> tuple[int, int]:
+        client.aio._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        get = await client.aio.request("GET", "https://idp.example/oauth/v2/userinfo")
+        calls.clear()
+        post = await client.aio.request("POST", "https://idp.example/oauth/v2/token")
+        return get.status_code, post.status_code
+
+    assert asyncio.run(run()) == (200, 503)
+    assert calls == ["POST"]
+
+
+def test_async_client_shares_breaker_with_sync_client() -> None:
+    """Test that failures seen by the async client open the sync client's breaker."""
+    client = HttpClient(retries=0, failure_threshold=1)
+
+    async def run() -> None:
+        client.aio._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(500))
+        )
+        await client.aio.request("GET", "https://idp.example/oauth/v2/keys")
+
+    asyncio.run(run())
+    assert client.breaker.is_open
+
+
+def test_concurrent_async_refreshes_share_one_exchange(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that racing async requests trigger a single refresh."""
+    calls: list[str] = []
+
+    async def fake_exchange(refresh_token: str) -> dict[str, Any]:
+        calls.append(refresh_token)
+        await asyncio.sleep(0.05)
+        return {"access_token": "access-1", "expires_at": int(time.time()) + 3600, "refresh_token": "rotated"}
+
+    monkeypatch.setattr(guard, "_aexchange_refresh_token", fake_exchange)
+    guard._results.clear()
+    sessions: list[dict[str, Any]] = [{"refresh_token": "async-shared", "expires_at": 0} for _ in range(8)]
+
+    async def run() -> None:
+        await asyncio.gather(*(guard.arefresh_access_token(session) for session in sessions))
+
+    asyncio.run(run())
+    assert calls == ["async-shared"]
+    assert {session["access_token"] for session in sessions} == {"access-1"}
+
+
+def test_async_callback_exchanges_code_and_starts_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the async callback exchanges the code and stores the login."""
+    posted: list[dict[str, Any]] = []
+
+    async def fake_metadata() -> dict[str, Any]:
+        return {"token_endpoint": "https://idp.example/oauth/v2/token"}
+
+    async def fake_request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+        posted.append(kwargs["data"])
+        token = {"access_token": "a1", "id_token": "i1", "refresh_token": "r1", "expires_in": 60}
+        return httpx.Response(200, json=token, request=httpx.Request(method, url))
+
+    def fake_parse_id_token(token: dict[str, Any], nonce: str) -> dict[str, Any]:
+        return {"sub": "user-1", "name": "Jane", "nonce": nonce}
+
+    monkeypatch.setattr(auth.oauth.zitadel, "aload_server_metadata", fake_metadata)
+    monkeypatch.setattr(auth.oauth.zitadel.http.aio, "request", fake_request)
+    monkeypatch.setattr(auth.oauth.zitadel, "parse_id_token", fake_parse_id_token)
+
+    request = AsyncRequestFactory().get("/auth/callback", {"code": "c1", "state": "s1"})
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    auth.oauth.zitadel.framework.set_state_data(
+        request.session, "s1", {"redirect_uri": "http://localhost/cb", "code_verifier": "v1", "nonce": "n1"}
+    )
+    request.session["post_login_url"] = "/profile"
+
+    response = asyncio.run(auth.acallback(request))
+
+    assert response.status_code == 302 and response["Location"] == "/profile"
+    assert posted == [
+        {
+            "grant_type": "authorization_code",
+            "code": "c1",
+            "state": "s1",
+            "code_verifier": "v1",
+            "redirect_uri": "http://localhost/cb",
+        }
+    ]
+    auth_session = request.session["auth_session"]
+    assert auth_session["user"] == {"sub": "user-1", "name": "Jane"}
+    assert auth_session["access_token"] == "a1" and auth_session["expires_at"] > time.time()
@@ -0,0 +1,115 @@
+"""Tests for the back-channel logout receiver and its batched processing."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from joserfc import jwt
+from joserfc.jwk import RSAKey
+
+from bench.tokens import logout_token, signing_key
+from lib import backchannel, revocation
+from lib.auth import oauth
+from lib.config import config
+from lib.jwks import KeyStore
+
+ISSUER = "https://idp.test"
+CLIENT_ID = "backchannel-client"
+
+
+@pytest.fixture(scope="module")
+def key() -> RSAKey:
+    return signing_key()
+
+
+@pytest.fixture(autouse=True)
+def idp(key: RSAKey, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Verify tokens against a local key and leave refresh tokens alone."""
+    store = KeyStore(lambda: f"{ISSUER}/oauth/v2/keys")
+    monkeypatch.setattr(store, "_fetch", lambda: {"keys": [key.as_dict(private=False)]})
+    monkeypatch.setattr(oauth.zitadel, "key_store", store)
+    monkeypatch.setattr(oauth.zitadel, "load_server_metadata", lambda: {"issuer": ISSUER})
+    monkeypatch.setattr(oauth.zitadel, "client_id", CLIENT_ID)
+    monkeypatch.setattr(config, "ZITADEL_REVOKE_TOKENS", False)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def post(token: str) -> Any:
+    response = Client().post("/auth/backchannel-logout", {"logout_token": token})
+    backchannel.logout_queue.join()
+    return response
+
+
+def session(sub: str, sid: str) -> dict[str, Any]:
+    return {"user": {"sub": sub}, "sid": sid, "created_at": int(time.time()) - 10, "refresh_token": f"refresh-{sid}"}
+
+
+def test_logout_by_sid_ends_that_session(key: RSAKey) -> None:
+    """Test that a valid token naming a session revokes only that session."""
+    revocation.track_session(session("user-1", "sid-1"))
+    revocation.track_session(session("user-1", "sid-2"))
+
+    response = post(logout_token(key, issuer=ISSUER, client_id=CLIENT_ID, sub="user-1", sid="sid-1"))
+
+    assert response.status_code == 200
+    assert response["Cache-Control"] == "no-store"
+    assert revocation.is_revoked(session("user-1", "sid-1"))
+    assert not revocation.is_revoked(session("user-1", "sid-2"))
+    assert revocation.sessions_for("user-1") == {"sid-2": "refresh-sid-2"}
+
+
+def test_logout_by_sub_ends_all_sessions(key: RSAKey) -> None:
+    """Test that a token naming only the user revokes all of their sessions."""
+    response = post(logout_token(key, issuer=ISSUER, client_id=CLIENT_ID, sub="user-1"))
+
+    assert response.status_code == 200
+    assert revocation.is_revoked(session("user-1", "any"))
+
+
+@pytest.mark.parametrize(
+    ("claims", "reason"),
+    [
+        ({"events": {}}, "event"),
+        ({"sub": None}, "neither sub nor sid"),
+        ({"nonce": "n"}, "nonce"),
+        ({"aud": "someone-else"}, "verification failed"),
+        ({"exp": int(time.time()) - 3600}, "verification failed"),
+    ],
+)
+def test_invalid_tokens_are_rejected(key: RSAKey, claims: dict[str, Any], reason: str) -> None:
+    """Test that tokens breaking the Back-Channel Logout rules get a 400 and revoke nothing."""
+    payload = jwt.decode(logout_token(key, issuer=ISSUER, client_id=CLIENT_ID, sub="user-1"), key).claims
+    payload = {name: value for name, value in {**payload, **claims}.items() if value is not None}
+    response = post(jwt.encode({"alg": "RS256", "kid": key.kid}, payload, key))
+
+    assert response.status_code == 400
+    assert reason in response.json()["error_description"]
+    assert not revocation.is_revoked(session("user-1", "any"))
+
+
+def test_replayed_token_is_rejected(key: RSAKey) -> None:
+    """Test that a logout token is accepted once."""
+    token = logout_token(key, issuer=ISSUER, client_id=CLIENT_ID, sub="user-1")
+    assert post(token).status_code == 200
+    assert post(token).status_code == 400
+
+
+def test_queue_applies_logouts_in_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a burst of logouts is applied in a few batches instead of one by one."""
+    batches: list[int] = []
+    monkeypatch.setattr(backchannel, "revoke_batch", lambda targets: batches.append(len(targets)))
+    logouts = backchannel.LogoutQueue(batch_size=10, batch_wait=0.5)
+
+    for i in range(25):
+        logouts.submit(f"user-{i}", None)
+    logouts.join()
+
+    assert sum(batches) == 25
+    assert len(batches) <= 4
@@ -0,0 +1,62 @@
+"""Tests for the request-scoped authentication context."""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import pytest
+from django.http import HttpRequest, HttpResponse
+from django.test import Client
+from django.urls import path
+
+from lib.context import ANONYMOUS, AuthContext, get_auth
+
+
+def whoami(request: HttpRequest) -> HttpResponse:
+    auth = request.auth  # type: ignore[attr-defined]
+    return HttpResponse(f"{auth.sub}:{auth is get_auth(request)}")
+
+
+urlpatterns = [
+    path("whoami", whoami),
+    path("robots.txt", whoami),
+]
+
+
+@pytest.fixture(autouse=True)
+def urls(settings: Any) -> None:
+    settings.ROOT_URLCONF = __name__
+
+
+def test_auth_context_is_immutable() -> None:
+    """Test the context's fields and that it cannot be changed."""
+    auth = AuthContext({"user": {"sub": "user-1"}, "roles": ["admin"], "metadata": {"seats": "3"}, "expires_at": 1})
+
+    assert auth.sub == "user-1" and auth.is_authenticated
+    assert auth.roles == frozenset({"admin"})
+    assert auth.metadata.get_int("seats") == 3
+    assert auth.is_expired
+    assert not hasattr(auth, "__dict__")
+    with pytest.raises(AttributeError):
+        auth.sub = "user-2"  # type: ignore[misc]
+    with pytest.raises(TypeError):
+        auth.user["sub"] = "user-2"  # type: ignore[index]
+
+    assert not ANONYMOUS and ANONYMOUS.sub is None
+    assert not AuthContext({"user": {"sub": "user-1"}, "error": "RefreshAccessTokenError"}).is_authenticated
+
+
+def test_middleware_reads_the_session_once(signed_in_client: Callable[..., Client]) -> None:
+    """Test that views get the context the middleware built."""
+    response = signed_in_client(roles=["admin"]).get("/whoami")
+
+    assert response.content == b"user-1:True"
+    assert "Cookie" in response.get("Vary", "")
+
+
+def test_skipped_paths_do_not_touch_the_session(signed_in_client: Callable[..., Client]) -> None:
+    """Test that robots.txt is served anonymously without loading the session."""
+    response = signed_in_client().get("/robots.txt")
+
+    assert response.content == b"None:True"
+    assert "Cookie" not in response.get("Vary", "")
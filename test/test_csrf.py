@@ -0,0 +1,97 @@
+"""Tests for the stateless sign-in CSRF tokens."""
+
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import redirect
+from django.test import Client
+
+from lib import auth, csrf
+from lib.config import config
+
+
+@pytest.fixture
+def fake_oauth(monkeypatch: pytest.MonkeyPatch) -> None:
+    def authorize_redirect(request: HttpRequest, redirect_uri: str) -> HttpResponse:
+        request.session["_state"] = "state"
+        return redirect("https://idp.example.com/oauth/v2/authorize")
+
+    monkeypatch.setattr(auth, "oauth", SimpleNamespace(zitadel=SimpleNamespace(authorize_redirect=authorize_redirect)))
+
+
+def sign_in(client: Client, token: str) -> Any:
+    return client.post("/auth/signin/zitadel", {"csrfToken": token, "callbackUrl": "/profile"})
+
+
+def test_check_token() -> None:
+    """Test that tokens only validate for their nonce, untampered and in time."""
+    token = csrf.make_token("nonce-1")
+
+    assert csrf.check_token(token, "nonce-1")
+    assert not csrf.check_token(token, "nonce-2")
+    assert not csrf.check_token(token + "x", "nonce-1")
+    assert not csrf.check_token(None, "nonce-1") and not csrf.check_token(token, None)
+
+
+def test_expired_token_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that tokens older than CSRF_TOKEN_MAX_AGE are rejected."""
+    token = csrf.make_token("nonce-1")
+    monkeypatch.setattr(time, "time", lambda: 1e10)
+
+    assert not csrf.check_token(token, "nonce-1")
+
+
+def test_token_endpoint_does_no_session_io() -> None:
+    """Test that /auth/csrf sets the nonce cookie once and never the session."""
+    client = Client()
+    first = client.get("/auth/csrf")
+    second = client.get("/auth/csrf")
+
+    assert list(first.cookies) == [csrf.COOKIE_NAME]
+    assert first.cookies[csrf.COOKIE_NAME]["path"] == "/auth"
+    assert first.cookies[csrf.COOKIE_NAME]["httponly"]
+    assert not second.cookies
+    assert first["Cache-Control"] == "no-store"
+    assert "Cookie" not in first.get("Vary", "")
+    assert settings.SESSION_COOKIE_NAME not in client.cookies
+    nonce = client.cookies[csrf.COOKIE_NAME].value
+    assert csrf.check_token(first.json()["csrfToken"], nonce)
+    assert csrf.check_token(second.json()["csrfToken"], nonce)
+
+
+def test_sign_in_with_valid_token(fake_oauth: None) -> None:
+    """Test that a matching token starts the login and drops the nonce."""
+    client = Client()
+    token = client.get("/auth/csrf").json()["csrfToken"]
+
+    response = sign_in(client, token)
+    assert response.status_code == 302
+    assert response["Location"].startswith("https://idp.example.com/")
+    assert client.session["post_login_url"] == "/profile"
+    assert response.cookies[csrf.COOKIE_NAME].value == ""
+
+
+@pytest.mark.parametrize("case", ["missing", "other_browser", "no_cookie", "expired"])
+def test_sign_in_rejects_bad_tokens(case: str, fake_oauth: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that sign-in is refused unless the token matches this browser's nonce."""
+    client = Client()
+    token = client.get("/auth/csrf").json()["csrfToken"]
+    if case == "missing":
+        token = ""
+    elif case == "other_browser":
+        token = Client().get("/auth/csrf").json()["csrfToken"]
+    elif case == "no_cookie":
+        client.cookies.clear()
+    else:
+        monkeypatch.setattr(config, "CSRF_TOKEN_MAX_AGE", -1)
+
+    response = sign_in(client, token)
+    assert response.status_code == 302
+    assert response["Location"] == "/auth/signin?error=verification"
+    assert settings.SESSION_COOKIE_NAME not in response.cookies
@@ -0,0 +1,71 @@
+"""Tests for the cached OIDC discovery document."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from lib.discovery import MetadataStore, parse_max_age
+
+
+class FakeStore(MetadataStore):
+    """Metadata store that counts fetches instead of calling ZITADEL."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__("https://idp.example/.well-known/openid-configuration", **kwargs)
+        self.fetches = 0
+        self.fail = False
+
+    def _fetch(self) -> tuple[dict[str, Any], int]:
+        self.fetches += 1
+        if self.fail:
+            raise ConnectionError("ZITADEL is down")
+        return {"issuer": "https://idp.example", "revision": self.fetches}, self.default_ttl
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("public", None),
+        ("public, max-age=600", 600),
+        ("no-cache", 0),
+        ("max-age=abc", None),
+    ],
+)
+def test_parse_max_age(header: str | None, expected: int | None) -> None:
+    """Test that Cache-Control lifetimes are parsed."""
+    assert parse_max_age(header) == expected
+
+
+def test_metadata_is_fetched_once_and_cached() -> None:
+    """Test that repeated lookups are served from the cache."""
+    store = FakeStore()
+    assert store.get()["revision"] == 1
+    assert store.get()["revision"] == 1
+    assert store.fetches == 1
+
+
+def test_expired_metadata_is_refreshed_in_background() -> None:
+    """Test that an expired document is served while a refresh runs."""
+    store = FakeStore(default_ttl=0)
+    assert store.get()["revision"] == 1
+
+    assert store.get()["revision"] == 1
+    assert store._refresh_thread is not None
+    store._refresh_thread.join()
+    assert store.get()["revision"] == 2
+
+
+def test_stale_metadata_is_served_when_refresh_fails() -> None:
+    """Test that a failing IdP does not evict the cached document."""
+    store = FakeStore(default_ttl=0)
+    assert store.prime()
+
+    store.fail = True
+    assert store.get()["revision"] == 1
+    assert store._refresh_thread is not None
+    store._refresh_thread.join()
+    assert store.get()["revision"] == 1
+    assert store.is_stale
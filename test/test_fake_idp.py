@@ -0,0 +1,99 @@
+"""Tests for the fake ZITADEL server used by the benchmarks."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from bench.fake_idp import FakeIdp
+from bench.load import Results, StepError
+from bench.run import percentile
+from lib.jwks import KeyStore
+
+
+def test_code_flow_issues_verifiable_tokens() -> None:
+    """Test that the fake IdP completes a code exchange with tokens the app can verify."""
+    with FakeIdp() as idp:
+        metadata = requests.get(f"{idp.url}/.well-known/openid-configuration", timeout=5).json()
+        redirect = requests.get(
+            metadata["authorization_endpoint"],
+            params={"redirect_uri": "http://localhost/cb", "state": "s1", "nonce": "n1"},
+            allow_redirects=False,
+            timeout=5,
+        )
+        query = parse_qs(urlparse(redirect.headers["Location"]).query)
+        assert query["state"] == ["s1"]
+
+        token = requests.post(
+            metadata["token_endpoint"], data={"grant_type": "authorization_code", "code": query["code"][0]}, timeout=5
+        ).json()
+        claims = KeyStore(lambda: metadata["jwks_uri"], session=requests.Session()).verify(
+            token["id_token"], issuer=idp.url, audience=idp.client_id
+        )
+
+    assert claims["nonce"] == "n1"
+    assert idp.calls["/oauth/v2/token"] == 1
+
+
+def test_percentile() -> None:
+    """Test nearest-rank percentiles over sorted latencies."""
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def authorize(idp: FakeIdp, **params: str) -> str:
+    redirect = requests.get(
+        f"{idp.url}/oauth/v2/authorize",
+        params={"redirect_uri": "http://localhost/cb", **params},
+        allow_redirects=False,
+        timeout=5,
+    )
+    return parse_qs(urlparse(redirect.headers["Location"]).query)["code"][0]
+
+
+def test_code_is_bound_to_pkce_challenge() -> None:
+    """Test that a code issued for a PKCE challenge needs the matching verifier."""
+    verifier = "a" * 64
+    challenge = base64.urlsafe_b64encode(hashlib.sha256(verifier.encode()).digest()).rstrip(b"=").decode()
+
+    with FakeIdp() as idp:
+        token_endpoint = f"{idp.url}/oauth/v2/token"
+        code = authorize(idp, code_challenge=challenge, code_challenge_method="S256")
+        wrong = requests.post(
+            token_endpoint, data={"grant_type": "authorization_code", "code": code, "code_verifier": "b" * 64}, timeout=5
+        )
+        assert wrong.status_code == 400
+
+        code = authorize(idp, code_challenge=challenge, code_challenge_method="S256")
+        right = requests.post(
+            token_endpoint, data={"grant_type": "authorization_code", "code": code, "code_verifier": verifier}, timeout=5
+        )
+        assert right.status_code == 200 and "id_token" in right.json()
+
+
+def test_error_injection_spares_discovery() -> None:
+    """Test that injected errors hit the token endpoint but not discovery."""
+    with FakeIdp(error_rate=1.0) as idp:
+        assert requests.get(f"{idp.url}/.well-known/openid-configuration", timeout=5).status_code == 200
+        response = requests.post(f"{idp.url}/oauth/v2/token", data={"grant_type": "refresh_token"}, timeout=5)
+
+    assert response.status_code == 503
+    assert idp.errors == {"/oauth/v2/token": 1}
+
+
+def test_load_results_report() -> None:
+    """Test that the load report counts cycles, application requests and step failures."""
+    results = Results()
+    results.record({"signin": 0.01, "authorize": 0.02, "callback": 0.03}, None)
+    results.record({"signin": 0.01}, StepError("authorize", AssertionError("expected 302, got 503")))
+    report = results.report(wall=1.0)
+
+    assert report["cycles"] == {"completed": 1, "failed": 1}
+    assert report["requests_per_second"] == 7.0
+    assert report["steps"]["signin"]["count"] == 2
+    assert report["steps"]["authorize"]["errors"] == {"AssertionError": 1}
@@ -0,0 +1,133 @@
+"""Tests for the authentication guard's token refresh."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from lib import guard
+from lib.config import config
+
+
+@pytest.fixture
+def exchanges(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replace the token endpoint call with a slow fake that records its calls."""
+    calls: list[str] = []
+
+    def fake_exchange(refresh_token: str) -> dict[str, Any]:
+        calls.append(refresh_token)
+        time.sleep(0.1)
+        return {"access_token": f"access-{len(calls)}", "expires_at": int(time.time()) + 3600, "refresh_token": "rotated"}
+
+    monkeypatch.setattr(guard, "_exchange_refresh_token", fake_exchange)
+    guard._results.clear()
+    return calls
+
+
+def test_concurrent_refreshes_share_one_exchange(exchanges: list[str]) -> None:
+    """Test that racing requests for the same session trigger a single refresh."""
+    sessions = [{"refresh_token": "shared", "expires_at": 0} for _ in range(8)]
+    threads = [threading.Thread(target=guard.refresh_access_token, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert exchanges == ["shared"]
+    assert {session["access_token"] for session in sessions} == {"access-1"}
+    assert all(session["refresh_token"] == "rotated" and session["error"] is None for session in sessions)
+
+
+def test_late_request_with_old_refresh_token_reuses_result(exchanges: list[str]) -> None:
+    """Test that a request still carrying the rotated-out token reuses the refresh."""
+    guard.refresh_access_token({"refresh_token": "old"})
+    late = guard.refresh_access_token({"refresh_token": "old"})
+
+    assert late is not None and late["access_token"] == "access-1"
+    assert exchanges == ["old"]
+
+
+@pytest.mark.django_db
+def test_shared_lock_waits_for_other_process(exchanges: list[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a refresh held by another process is awaited instead of repeated."""
+    monkeypatch.setattr(config, "ZITADEL_REFRESH_SHARED_LOCK", True)
+    key = guard._refresh_key("elsewhere")
+    cache.add(f"{key}:lock", 1, timeout=5)
+
+    def other_process_finishes() -> None:
+        time.sleep(0.1)
+        cache.set(f"{key}:result", {"access_token": "from-peer", "expires_at": 1, "refresh_token": "r2"})
+        cache.delete(f"{key}:lock")
+
+    threading.Thread(target=other_process_finishes).start()
+    session = guard.refresh_access_token({"refresh_token": "elsewhere"})
+
+    assert session is not None and session["access_token"] == "from-peer"
+    assert exchanges == []
+    cache.delete(f"{key}:result")
+
+
+def test_failed_refresh_flags_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failed refresh marks the session with an error."""
+    monkeypatch.setattr(guard, "_exchange_refresh_token", lambda refresh_token: None)
+    session: dict[str, Any] = {"refresh_token": "revoked"}
+
+    assert guard.refresh_access_token(session) is None
+    assert session["error"] == "RefreshAccessTokenError"
+
+
+@pytest.mark.django_db
+def test_token_far_from_expiry_is_not_refreshed(exchanges: list[str], signed_in_client: Callable[..., Client]) -> None:
+    """Test that no refresh happens outside the refresh-ahead window."""
+    client = signed_in_client(expires_at=int(time.time()) + 3600)
+
+    assert client.get("/profile").status_code == 200
+    assert exchanges == []
+
+
+def test_refresh_deadline_is_fixed_per_session() -> None:
+    """Test that the jitter is the same on every request of a session and spread across sessions."""
+    expires_at = int(time.time()) + 3600
+    latest = expires_at - config.ZITADEL_REFRESH_SKEW
+    deadlines = {guard._refresh_deadline({"sid": f"sid-{i}", "expires_at": expires_at}) for i in range(50)}
+
+    assert guard._refresh_deadline({"sid": "sid-1", "expires_at": expires_at}) == guard._refresh_deadline(
+        {"sid": "sid-1", "refresh_token": "other", "expires_at": expires_at}
+    )
+    assert all(latest - config.ZITADEL_REFRESH_JITTER < deadline <= latest for deadline in deadlines)
+    assert len(deadlines) == 50
+
+
+@pytest.mark.django_db
+def test_token_inside_skew_window_is_refreshed_early(exchanges: list[str], signed_in_client: Callable[..., Client]) -> None:
+    """Test that a token about to expire is refreshed before it does."""
+    client = signed_in_client(expires_at=int(time.time()) + config.ZITADEL_REFRESH_SKEW - 1)
+
+    assert client.get("/profile").status_code == 200
+    assert exchanges == ["r1"]
+    assert client.session["auth_session"]["access_token"] == "access-1"
+
+
+@pytest.mark.django_db
+def test_background_refresh_is_adopted_by_next_request(
+    exchanges: list[str], monkeypatch: pytest.MonkeyPatch, signed_in_client: Callable[..., Client]
+) -> None:
+    """Test that a background refresh keeps the current token and hands the new one to the next request."""
+    monkeypatch.setattr(config, "ZITADEL_REFRESH_IN_BACKGROUND", True)
+    client = signed_in_client(expires_at=int(time.time()) + config.ZITADEL_REFRESH_SKEW - 1)
+
+    assert client.get("/profile").status_code == 200
+    assert client.session["auth_session"]["access_token"] == "current"
+
+    for thread in threading.enumerate():
+        if thread.name == "zitadel-token-refresh":
+            thread.join()
+
+    assert client.get("/profile").status_code == 200
+    assert client.session["auth_session"]["access_token"] == "access-1"
+    assert exchanges == ["r1"]
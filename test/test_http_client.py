@@ -0,0 +1,83 @@
+"""Tests for the pooled IdP HTTP client."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from lib.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class FakeTransport:
+    """Stands in for urllib3 and records the timeouts it was called with."""
+
+    def __init__(self) -> None:
+        self.timeouts: list[Any] = []
+        self.status = 200
+        self.error: Exception | None = None
+
+    def send(self, adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        self.timeouts.append(kwargs.get("timeout"))
+        if self.error is not None:
+            raise self.error
+        response = requests.Response()
+        response.status_code = self.status
+        return response
+
+
+@pytest.fixture
+def transport(monkeypatch: pytest.MonkeyPatch) -> FakeTransport:
+    fake = FakeTransport()
+    monkeypatch.setattr(HTTPAdapter, "send", lambda adapter, request, *args, **kwargs: fake.send(adapter, request, **kwargs))
+    return fake
+
+
+def test_default_timeouts_are_applied(transport: FakeTransport) -> None:
+    """Test that calls without an explicit timeout get the configured one."""
+    client = HttpClient(connect_timeout=1.5, read_timeout=4.0)
+    client.session.get("https://idp.example/.well-known/openid-configuration")
+    client.session.get("https://idp.example/oauth/v2/keys", timeout=9)
+
+    assert transport.timeouts == [(1.5, 4.0), 9]
+
+
+def test_pool_survives_closing_a_mounted_session(transport: FakeTransport) -> None:
+    """Test that short-lived sessions (as Authlib creates them) share the pool."""
+    client = HttpClient()
+    with client.mount(requests.Session()) as session:
+        session.get("https://idp.example/oauth/v2/userinfo")
+
+    assert client.session.get_adapter("https://idp.example") is client.adapter
+    client.session.get("https://idp.example/oauth/v2/userinfo")
+    assert len(transport.timeouts) == 2
+
+
+def test_breaker_opens_after_consecutive_failures(transport: FakeTransport) -> None:
+    """Test that an unhealthy IdP is short-circuited."""
+    client = HttpClient(failure_threshold=2, reset_timeout=60)
+    transport.error = requests.ConnectionError("connection refused")
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.session.get("https://idp.example/oauth/v2/keys")
+
+    with pytest.raises(CircuitOpenError):
+        client.session.get("https://idp.example/oauth/v2/keys")
+    assert len(transport.timeouts) == 2
+
+
+def test_breaker_closes_after_successful_trial() -> None:
+    """Test that a successful trial call after the reset timeout closes the breaker."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.is_open
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert not breaker.is_open
@@ -0,0 +1,109 @@
+"""Tests for the production Jinja2 environment and template precompilation."""
+
+from __future__ import annotations
+
+import io
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.urls import path, reverse
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader
+
+from lib.config import config
+from project.jinja2 import UrlBuilder, check_url_names, environment, precompile, unresolved_url_names, url_for
+
+TEMPLATES = Path(__file__).resolve().parent.parent / "templates"
+
+urlpatterns = [
+    path("start", HttpResponse, name="home"),
+    path("items/<int:pk>", HttpResponse, name="item"),
+]
+
+
+def test_development_environment_reloads_templates(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that outside production templates are compiled lazily and reloaded."""
+    monkeypatch.setattr(config, "PY_ENV", "development")
+    env = environment(loader=FileSystemLoader(TEMPLATES))
+
+    assert env.auto_reload
+    assert env.bytecode_cache is None
+    assert len(env.cache or {}) == 0
+
+
+def test_production_environment_precompiles(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test that production disables reloading and compiles every template into the bytecode cache."""
+    monkeypatch.setattr(config, "PY_ENV", "production")
+    monkeypatch.setattr(config, "JINJA_BYTECODE_DIR", str(tmp_path))
+    env = environment(loader=FileSystemLoader(TEMPLATES))
+
+    assert not env.auto_reload
+    assert isinstance(env.bytecode_cache, FileSystemBytecodeCache)
+    names = env.list_templates(extensions=["html"])
+    assert "index.html" in names
+    assert len(env.cache or {}) == len(names)
+    assert len(os.listdir(tmp_path)) == len(names)
+
+
+def test_precompile_loads_from_bytecode(tmp_path: Path) -> None:
+    """Test that a second environment reuses the compiled templates instead of compiling."""
+    precompile(environment(loader=FileSystemLoader(TEMPLATES), bytecode_cache=FileSystemBytecodeCache(str(tmp_path))))
+
+    env = environment(loader=FileSystemLoader(TEMPLATES), bytecode_cache=FileSystemBytecodeCache(str(tmp_path)))
+    env.compile = None  # type: ignore[assignment, method-assign]
+    assert env.get_template("index.html")
+
+
+def test_compile_templates_command(tmp_path: Path) -> None:
+    """Test that the management command writes one bytecode file per template."""
+    output = tmp_path / "bytecode"
+    stdout = io.StringIO()
+    call_command("compile_templates", output=str(output), stdout=stdout)
+
+    assert len(os.listdir(output)) == len(FileSystemLoader(TEMPLATES).list_templates())
+    assert f"into {output}" in stdout.getvalue()
+
+
+def test_url_for_precomputes_argless_routes() -> None:
+    """Test that argument-less routes are reversed once and served from the table."""
+    builder = UrlBuilder()
+    assert builder("home") == "/"
+    assert builder("logout") == "/auth/logout"
+
+    with patch("project.jinja2.reverse", side_effect=AssertionError("reverse called")):
+        assert builder("signin") == "/auth/signin"
+
+
+def test_url_for_caches_parameterized_routes(settings: Any) -> None:
+    """Test that routes with arguments are reversed once per distinct argument set."""
+    settings.ROOT_URLCONF = __name__
+    builder = UrlBuilder(maxsize=2)
+    with patch("project.jinja2.reverse", wraps=reverse) as spy:
+        assert builder("item", pk=1) == "/items/1"
+        assert builder("item", pk=1) == "/items/1"
+        assert builder("item", pk=2) == "/items/2"
+        assert spy.call_count == 2
+
+
+def test_url_cache_follows_urlconf_changes(settings: Any) -> None:
+    """Test that changing ROOT_URLCONF drops the precomputed table."""
+    assert url_for("home") == "/"
+    settings.ROOT_URLCONF = __name__
+    assert url_for("home") == "/start"
+
+
+def test_unknown_url_names_fail_the_check(tmp_path: Path) -> None:
+    """Test that a template naming a missing route is reported, and the real templates pass."""
+    env = environment(loader=FileSystemLoader(TEMPLATES))
+    check_url_names(env)
+
+    (tmp_path / "broken.html").write_text("<a href=\"{{ url_for('nowhere') }}\">{{ url_for(name) }}</a>")
+    env = environment(loader=FileSystemLoader(tmp_path))
+    assert unresolved_url_names(env) == {"broken.html": ["nowhere"]}
+    with pytest.raises(ImproperlyConfigured, match="broken.html: nowhere"):
+        check_url_names(env)
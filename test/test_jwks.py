@@ -0,0 +1,89 @@
+"""Tests for local JWT verification against the cached JWKS."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+from joserfc import jwt
+from joserfc.errors import InvalidClaimError, InvalidKeyIdError
+from joserfc.jwk import RSAKey
+
+from lib.jwks import KeyStore
+
+ISSUER = "https://idp.example"
+AUDIENCE = "mock-client-id"
+
+
+class FakeKeyStore(KeyStore):
+    """Key store that serves a mutable list of keys instead of calling ZITADEL."""
+
+    def __init__(self, keys: list[RSAKey], **kwargs: Any) -> None:
+        super().__init__(lambda: f"{ISSUER}/oauth/v2/keys", **kwargs)
+        self.keys = keys
+        self.fetches = 0
+
+    def _fetch(self) -> dict[str, Any]:
+        self.fetches += 1
+        return {"keys": [key.as_dict(private=False) for key in self.keys]}
+
+
+def make_key(kid: str) -> RSAKey:
+    return RSAKey.generate_key(2048, parameters={"kid": kid, "use": "sig", "alg": "RS256"})
+
+
+def sign(key: RSAKey, **claims: Any) -> str:
+    now = int(time.time())
+    payload = {"iss": ISSUER, "aud": AUDIENCE, "sub": "user-1", "iat": now, "exp": now + 300, **claims}
+    return jwt.encode({"alg": "RS256", "kid": key.kid}, payload, key)
+
+
+def test_verify_returns_claims_and_caches_keys() -> None:
+    """Test that valid tokens are verified with a single JWKS fetch."""
+    key = make_key("k1")
+    store = FakeKeyStore([key])
+
+    for _ in range(3):
+        claims = store.verify(sign(key), issuer=ISSUER, audience=AUDIENCE)
+        assert claims["sub"] == "user-1"
+    assert store.fetches == 1
+
+
+def test_unknown_kid_triggers_one_refetch() -> None:
+    """Test that a rotated key is picked up by re-fetching the key set."""
+    old, new = make_key("old"), make_key("new")
+    store = FakeKeyStore([old], min_refresh_interval=0)
+    store.verify(sign(old), issuer=ISSUER, audience=AUDIENCE)
+
+    store.keys = [old, new]
+    assert store.verify(sign(new), issuer=ISSUER, audience=AUDIENCE)["sub"] == "user-1"
+    assert store.fetches == 2
+
+
+def test_unknown_kid_refetch_is_rate_limited() -> None:
+    """Test that tokens with unknown key IDs cannot force repeated fetches."""
+    key = make_key("k1")
+    store = FakeKeyStore([key], min_refresh_interval=3600)
+    store.get_key_set()
+
+    with pytest.raises(InvalidKeyIdError):
+        store.verify(sign(make_key("forged")), issuer=ISSUER, audience=AUDIENCE)
+    assert store.fetches == 1
+
+
+def test_wrong_audience_is_rejected() -> None:
+    """Test that tokens issued to another client are rejected."""
+    key = make_key("k1")
+    store = FakeKeyStore([key])
+
+    with pytest.raises(InvalidClaimError):
+        store.verify(sign(key, aud="another-client"), issuer=ISSUER, audience=AUDIENCE)
+
+
+def test_user_claims_come_from_verified_id_token() -> None:
+    """Test that login builds the user from ID token claims without protocol claims."""
+    from lib.auth import get_user_claims
+
+    token = {"userinfo": {"iss": ISSUER, "aud": AUDIENCE, "nonce": "n", "sub": "user-1", "email": "jane@example.com"}}
+    assert get_user_claims(token) == {"sub": "user-1", "email": "jane@example.com"}
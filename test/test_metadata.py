@@ -0,0 +1,120 @@
+"""Tests for decoded user metadata and the cached profile document."""
+
+from __future__ import annotations
+
+import base64
+import json
+import time
+from typing import Any, Callable
+
+import pytest
+from django.contrib.sessions.backends.cache import SessionStore
+from django.test import Client, RequestFactory
+
+from bench.tokens import user_claims
+from lib import metadata
+from lib.auth import _start_session
+from lib.config import config
+from lib.context import AuthContext
+from lib.metadata import METADATA_CLAIM, UserMetadata, decode_metadata, profile_json, user_metadata
+
+
+@pytest.fixture(autouse=True)
+def clear_profiles() -> None:
+    metadata._profiles.clear()
+
+
+def encoded(values: dict[str, str]) -> dict[str, str]:
+    return {key: base64.b64encode(value.encode()).decode() for key, value in values.items()}
+
+
+def test_decode_metadata() -> None:
+    """Test that values are decoded and undecodable ones are kept as sent."""
+    claims = {METADATA_CLAIM: {**encoded({"department": "engineering"}), "raw": "not base64!"}}
+
+    assert decode_metadata(claims) == {"department": "engineering", "raw": "not base64!"}
+    assert decode_metadata({"sub": "user-1"}) == {}
+
+
+def test_typed_getters() -> None:
+    """Test the typed getters and their defaults."""
+    values = UserMetadata({"seats": "12", "beta": "Yes", "prefs": '{"theme": "dark"}', "bad": "x"})
+
+    assert values["seats"] == "12" and len(values) == 4
+    assert values.get_int("seats") == 12
+    assert values.get_int("bad") is None and values.get_int("missing", 0) == 0
+    assert values.get_bool("beta") is True
+    assert values.get_bool("bad") is False and values.get_bool("missing", True) is True
+    assert values.get_json("prefs") == {"theme": "dark"}
+    assert values.get_json("bad", {}) == {}
+
+
+def test_login_stores_decoded_metadata() -> None:
+    """Test that the session holds decoded metadata instead of the base64 claim."""
+    request = RequestFactory().get("/auth/callback")
+    request.session = SessionStore()
+    _start_session(request, {"access_token": "access", "expires_at": int(time.time()) + 3600}, user_claims())
+
+    auth_session = request.session["auth_session"]
+    assert METADATA_CLAIM not in auth_session["user"]
+    assert auth_session["metadata"]["department"] == "engineering"
+    assert user_metadata(request)["cost_center"] == "CC-4711"
+    assert user_metadata(request) is user_metadata(request)
+
+
+def test_metadata_survives_claim_allow_list(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that SESSION_USER_CLAIMS prunes the user claims but not the metadata."""
+    monkeypatch.setattr(config, "SESSION_USER_CLAIMS", frozenset({"name", "email"}))
+    request = RequestFactory().get("/auth/callback")
+    request.session = SessionStore()
+    _start_session(request, {"access_token": "access", "expires_at": int(time.time()) + 3600}, user_claims())
+
+    auth_session = request.session["auth_session"]
+    assert set(auth_session["user"]) <= {"sub", "name", "email"}
+    assert auth_session["metadata"]["department"] == "engineering"
+    assert auth_session["metadata"]["cost_center"] == "CC-4711"
+
+
+def test_profile_json_rendered_once_per_access_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the profile document is reused until the access token changes."""
+    renders = []
+    dumps = json.dumps
+
+    def counting_dumps(obj: Any, **kwargs: Any) -> str:
+        renders.append(obj)
+        return dumps(obj, **kwargs)
+
+    monkeypatch.setattr(metadata.json, "dumps", counting_dumps)
+    auth_session = {
+        "user": {"sub": "user-1", "name": "Jane"},
+        "metadata": {"department": "engineering"},
+        "access_token": "access-1",
+        "expires_at": int(time.time()) + 3600,
+    }
+
+    first = profile_json(AuthContext(auth_session))
+    assert profile_json(AuthContext(auth_session)) == first
+    assert len(renders) == 1
+    assert json.loads(first)[METADATA_CLAIM] == {"department": "engineering"}
+
+    auth_session["access_token"] = "access-2"
+    profile_json(AuthContext(auth_session))
+    assert len(renders) == 2
+
+
+def test_profile_documents_are_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the per-process profile cache evicts the least recently used documents."""
+    monkeypatch.setattr(metadata, "PROFILE_CACHE_SIZE", 2)
+    expires_at = int(time.time()) + 3600
+    for i in range(3):
+        profile_json(AuthContext({"user": {"sub": f"user-{i}"}, "access_token": f"access-{i}", "expires_at": expires_at}))
+
+    assert len(metadata._profiles) == 2
+    assert not any(key.startswith("user-0:") for key in metadata._profiles)
+
+
+def test_profile_page_shows_decoded_metadata(signed_in_client: Callable[..., Client]) -> None:
+    """Test that the profile page renders the cached document."""
+    response = signed_in_client(metadata={"department": "engineering"}).get("/profile")
+    assert response.status_code == 200
+    assert b"engineering" in response.content
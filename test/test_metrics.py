@@ -0,0 +1,93 @@
+"""Tests for the metrics registry, middleware and IdP call timing."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import pytest
+import requests
+from django.http import Http404, HttpRequest, HttpResponse
+from django.test import RequestFactory
+from django.urls import ResolverMatch
+from requests.adapters import HTTPAdapter
+
+from lib import metrics
+from lib.config import config
+from lib.http_client import HttpClient
+
+
+@pytest.fixture
+def enabled(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+
+
+def test_nothing_is_recorded_when_disabled() -> None:
+    """Test that collection is off by default and /metrics is hidden."""
+    metrics.TOKEN_REFRESHES.inc(result="success")
+    assert metrics.TOKEN_REFRESHES.value(result="success") == 0
+
+    with pytest.raises(Http404):
+        metrics.metrics_view(RequestFactory().get("/metrics"))
+
+
+def test_histogram_renders_cumulative_buckets(enabled: None) -> None:
+    """Test the Prometheus text format of a labelled histogram."""
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("endpoint",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, endpoint="/token")
+    histogram.observe(0.5, endpoint="/token")
+
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{endpoint="/token",le="0.1"} 1',
+        'demo_seconds_bucket{endpoint="/token",le="1"} 2',
+        'demo_seconds_bucket{endpoint="/token",le="+Inf"} 2',
+        'demo_seconds_sum{endpoint="/token"} 0.55',
+        'demo_seconds_count{endpoint="/token"} 2',
+    ]
+
+
+def test_incomplete_metric_cannot_be_created() -> None:
+    """Test that a metric subclass must implement rendering and clearing."""
+
+    class NoClear(metrics.Metric):
+        kind = "gauge"
+
+        def _samples(self) -> list[str]:
+            return []
+
+    with pytest.raises(TypeError):
+        NoClear("demo", "Demo.")  # type: ignore[abstract]
+
+
+def test_middleware_records_request_phases(enabled: None) -> None:
+    """Test that phases entered during a request are reported per view."""
+
+    def view(request: HttpRequest) -> HttpResponse:
+        request.resolver_match = ResolverMatch(view, (), {}, url_name="callback")
+        with metrics.phase("token_exchange"):
+            pass
+        return HttpResponse(status=302)
+
+    metrics.MetricsMiddleware(view)(RequestFactory().get("/auth/callback"))
+
+    assert metrics.REQUEST_DURATION.count(view="callback", status=302) == 1
+    assert metrics.REQUEST_PHASE_DURATION.count(view="callback", phase="token_exchange") == 1
+    assert 'http_request_phase_duration_seconds_count{view="callback",phase="token_exchange"} 1' in metrics.registry.render()
+
+
+def test_idp_calls_are_timed_by_endpoint_and_status(enabled: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the pooled client records every call to ZITADEL."""
+
+    def send(adapter: HTTPAdapter, request: requests.PreparedRequest, *args: object, **kwargs: object) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    HttpClient().session.post("https://idp.example/oauth/v2/token")
+
+    assert metrics.IDP_REQUEST_DURATION.count(endpoint="/oauth/v2/token", method="POST", status=200) == 1
@@ -0,0 +1,102 @@
+"""Tests for the public page render cache and conditional GET."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from unittest.mock import patch
+
+import pytest
+from django.test import Client
+
+from lib import pages
+
+
+@pytest.fixture(autouse=True)
+def empty_cache() -> Iterator[None]:
+    pages.pages.clear()
+    yield
+    pages.pages.clear()
+
+
+@pytest.mark.django_db
+def test_repeat_hits_skip_rendering() -> None:
+    """Test that a page is rendered once per distinct input, not per query string."""
+    client = Client()
+    with patch("lib.pages.render_to_string", wraps=pages.render_to_string) as spy:
+        first = client.get("/auth/error?error=accessdenied")
+        second = client.get("/auth/error?error=accessdenied")
+        client.get("/auth/error?error=verification")
+        client.get("/auth/error?error=unknown-1")
+        client.get("/auth/error?error=unknown-2")
+
+    assert first.content == second.content
+    assert spy.call_count == 3
+    assert len(pages.pages) == 3
+
+
+@pytest.mark.django_db
+def test_free_form_query_values_are_not_cached() -> None:
+    """Test that query values clients can vary freely do not add cache entries."""
+    client = Client()
+    for i in range(3):
+        client.get(f"/auth/signin?callbackUrl=/page-{i}")
+        response = client.get(f"/auth/logout/error?reason=made-up-{i}")
+    client.get("/auth/logout/error?reason=state")
+
+    assert b"An unknown error occurred." in response.content
+    assert len(pages.pages) == 2
+
+
+@pytest.mark.django_db
+def test_conditional_get_returns_not_modified() -> None:
+    """Test that a matching If-None-Match or If-Modified-Since is answered with 304."""
+    client = Client()
+    response = client.get("/auth/signin")
+    assert response["Cache-Control"] == "no-cache"
+
+    by_etag = client.get("/auth/signin", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_etag["ETag"] == response["ETag"]
+
+    by_date = client.get("/auth/signin", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+    assert by_date.status_code == 304
+
+    other = client.get("/auth/signin?callbackUrl=/elsewhere", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert other.status_code == 200
+    assert other["ETag"] != response["ETag"]
+
+
+@pytest.mark.django_db
+def test_home_varies_on_the_session(signed_in_client: Callable[..., Client]) -> None:
+    """Test that signed-in and anonymous visitors are cached separately."""
+    anonymous = Client().get("/")
+    signed_in_client().get("/")
+
+    assert "Cookie" in anonymous["Vary"]
+    assert len(pages.pages) == 2
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    """Test that the cache holds at most maxsize pages and keeps recently used ones."""
+    cache = pages.PageCache(maxsize=2)
+    page = pages.Page(b"", '"x"', 0)
+    cache.set("a", page)
+    cache.set("b", page)
+    cache.get("a")
+    cache.set("c", page)
+
+    assert cache.get("a") is page
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+@pytest.mark.django_db
+def test_cache_is_bypassed_while_templates_reload(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that nothing is cached when the engine reloads changed templates."""
+    monkeypatch.setattr(pages, "_cacheable", lambda: False)
+    response = Client().get("/auth/logout/success")
+
+    assert response.status_code == 200
+    assert response.has_header("ETag")
+    assert len(pages.pages) == 0
@@ -0,0 +1,160 @@
+"""Tests for the session index, revocation markers and token revocation."""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client
+
+from lib import revocation
+from lib.auth import oauth
+from lib.tenants import default_tenant, using
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Iterator[None]:
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def revoked_tokens(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Point the revocation endpoint at a fake that records the tokens it receives."""
+    tokens: list[str] = []
+    lock = threading.Lock()
+
+    class Response:
+        def raise_for_status(self) -> None:
+            pass
+
+    def post(url: str, data: dict[str, str], **kwargs: Any) -> Response:
+        assert url == "https://idp.test/oauth/v2/revoke"
+        assert data["token_type_hint"] == "refresh_token"
+        with lock:
+            tokens.append(data["token"])
+        return Response()
+
+    monkeypatch.setattr(
+        oauth.zitadel, "load_server_metadata", lambda: {"revocation_endpoint": "https://idp.test/oauth/v2/revoke"}
+    )
+    monkeypatch.setattr(oauth.zitadel.http.session, "post", post)
+    return tokens
+
+
+def auth_session(sid: str, refresh_token: str | None = None, sub: str = "user-1") -> dict[str, Any]:
+    return {
+        "user": {"sub": sub},
+        "access_token": "access",
+        "refresh_token": refresh_token or f"refresh-{sid}",
+        "expires_at": int(time.time()) + 3600,
+        "sid": sid,
+        "created_at": int(time.time()) - 10,
+    }
+
+
+def test_index_follows_logins_and_rotations() -> None:
+    """Test that the index maps each session of a user to its current refresh token."""
+    revocation.track_session(auth_session("a", "refresh-a"))
+    revocation.track_session(auth_session("b", "refresh-b"))
+    revocation.track_session(auth_session("a", "rotated-a"))
+    revocation.track_session(auth_session("c", "refresh-c", sub="user-2"))
+
+    assert revocation.sessions_for("user-1") == {"a": "rotated-a", "b": "refresh-b"}
+
+
+def test_revoke_user_ends_every_session(revoked_tokens: list[str]) -> None:
+    """Test that all of a user's sessions are marked revoked and their refresh tokens revoked in bulk."""
+    sessions = [auth_session(f"sid-{i}", f"refresh-{i}") for i in range(3)]
+    for session in sessions:
+        revocation.track_session(session)
+    other = auth_session("other", sub="user-2")
+
+    assert revocation.revoke_user("user-1") == 3
+    assert sorted(revoked_tokens) == ["refresh-0", "refresh-1", "refresh-2"]
+    assert all(revocation.is_revoked(session) for session in sessions)
+    assert not revocation.is_revoked(other)
+    assert revocation.sessions_for("user-1") == {}
+
+    later = {**auth_session("new"), "created_at": int(time.time()) + 1}
+    assert not revocation.is_revoked(later)
+
+
+def test_revoke_session_ends_only_that_session(revoked_tokens: list[str]) -> None:
+    """Test that revoking one session leaves the user's other sessions alone."""
+    revocation.track_session(auth_session("a", "refresh-a"))
+    revocation.track_session(auth_session("b", "refresh-b"))
+
+    revocation.revoke_session("user-1", "a")
+
+    assert revoked_tokens == ["refresh-a"]
+    assert revocation.is_revoked(auth_session("a"))
+    assert not revocation.is_revoked(auth_session("b"))
+    assert revocation.sessions_for("user-1") == {"b": "refresh-b"}
+
+
+def test_tenants_have_separate_indexes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that revoking a user in one tenant leaves their sessions in another alone."""
+    calls: list[tuple[list[str], str]] = []
+
+    def revoke_tokens(tokens: list[str]) -> int:
+        calls.append((tokens, revocation._tenant_key()))
+        return len(tokens)
+
+    monkeypatch.setattr(revocation, "revoke_tokens", revoke_tokens)
+    acme = default_tenant()._replace(key="acme.test")
+    default_session = auth_session("a", "refresh-default")
+    acme_session = {**auth_session("b", "refresh-acme"), "tenant": "acme.test"}
+    revocation.track_session(default_session)
+    revocation.track_session(acme_session)
+
+    with using(acme):
+        assert revocation.sessions_for("user-1") == {"b": "refresh-acme"}
+        assert revocation.revoke_user("user-1") == 1
+
+    assert calls == [(["refresh-acme"], "acme.test")]
+    assert revocation.is_revoked(acme_session)
+    assert not revocation.is_revoked(default_session)
+    assert revocation.sessions_for("user-1") == {"a": "refresh-default"}
+
+
+@pytest.mark.django_db
+def test_guard_rejects_revoked_session(revoked_tokens: list[str], signed_in_client: Callable[..., Client]) -> None:
+    """Test that a revoked session is cleared and sent to sign-in even though its cookie is still valid."""
+    client = signed_in_client(**auth_session("a"))
+    assert client.get("/profile").status_code == 200
+
+    stdout = io.StringIO()
+    call_command("revoke_sessions", "user-1", stdout=stdout)
+    assert "Revoked user-1" in stdout.getvalue()
+
+    response = client.get("/profile")
+    assert response.status_code == 302
+    assert response["Location"].startswith("/auth/signin")
+
+
+@pytest.mark.django_db
+def test_logout_revokes_the_session(
+    revoked_tokens: list[str], monkeypatch: pytest.MonkeyPatch, signed_in_client: Callable[..., Client]
+) -> None:
+    """Test that logging out revokes the refresh token and kills copies of the session cookie."""
+    monkeypatch.setattr(
+        oauth.zitadel,
+        "load_server_metadata",
+        lambda: {"revocation_endpoint": "https://idp.test/oauth/v2/revoke", "end_session_endpoint": "https://idp.test/end"},
+    )
+    session_data = auth_session("a", "refresh-a")
+    revocation.track_session(session_data)
+    client = signed_in_client(**session_data)
+    copy = signed_in_client(**session_data)
+
+    assert client.post("/auth/logout").status_code == 302
+    assert revoked_tokens == ["refresh-a"]
+    assert copy.get("/profile").status_code == 302
@@ -0,0 +1,86 @@
+"""Tests for the role index and the role and permission decorators."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any, Callable
+
+import pytest
+from django.http import HttpRequest, HttpResponse
+from django.test import Client
+from django.urls import path
+
+from bench.tokens import ORG_ID, PROJECT_ID, user_claims
+from lib import roles
+from lib.roles import require_permission, require_role
+
+
+@require_role("admin", "editor")
+def edit(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("edit")
+
+
+@require_role("admin", org="other-org")
+def other_org(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("other")
+
+
+@require_permission("reports.read", "reports.export")
+async def export(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("export")
+
+
+urlpatterns = [
+    path("edit", edit),
+    path("other", other_org),
+    path("export", export),
+]
+
+
+@pytest.fixture(autouse=True)
+def urls(settings: Any) -> Iterator[None]:
+    settings.ROOT_URLCONF = __name__
+    saved = dict(roles.ROLE_PERMISSIONS)
+    yield
+    roles.ROLE_PERMISSIONS.clear()
+    roles.ROLE_PERMISSIONS.update(saved)
+    roles._permissions.cache_clear()
+
+
+def test_role_index_flattens_project_role_claims() -> None:
+    """Test that both role claims are flattened into role names and org-scoped entries."""
+    claims = {
+        **user_claims(),
+        f"urn:zitadel:iam:org:project:{PROJECT_ID}:roles": {"auditor": {ORG_ID: "example.zitadel.cloud"}},
+    }
+    index = roles.role_index(claims)
+
+    assert "admin" in index and f"admin@{ORG_ID}" in index
+    assert "auditor" in index and f"auditor@{ORG_ID}" in index
+    assert index == sorted(set(index))
+    assert not any(entry.startswith("urn:") for entry in index)
+    assert roles.role_index({"sub": "user-1"}) == []
+
+
+def test_require_role_allows_any_listed_role(signed_in_client: Callable[..., Client]) -> None:
+    """Test that one matching role is enough and a missing one is forbidden."""
+    assert signed_in_client(roles=["editor"]).get("/edit").status_code == 200
+    assert signed_in_client(roles=["viewer"]).get("/edit").status_code == 403
+    assert Client().get("/edit").status_code == 302
+
+
+def test_require_role_scoped_to_an_organization(signed_in_client: Callable[..., Client]) -> None:
+    """Test that an org-scoped check ignores the same role granted elsewhere."""
+    assert signed_in_client(roles=["admin", f"admin@{ORG_ID}"]).get("/other").status_code == 403
+    assert signed_in_client(roles=["admin", "admin@other-org"]).get("/other").status_code == 200
+
+
+def test_require_permission_on_async_view(signed_in_client: Callable[..., Client]) -> None:
+    """Test that permissions are granted through roles and all must be present."""
+    roles.grant("analyst", ["reports.read"])
+    assert signed_in_client(roles=["analyst"]).get("/export").status_code == 403
+
+    roles.grant("analyst", ["reports.export"])
+    response = signed_in_client(roles=["analyst"]).get("/export")
+    assert response.status_code == 200
+    assert response.content == b"export"
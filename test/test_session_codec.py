@@ -0,0 +1,67 @@
+"""Tests for the compact session serializer and the claim allow-list."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from django.contrib.sessions.serializers import JSONSerializer
+from django.core import signing
+
+from bench.tokens import token_response, user_claims
+from lib import auth
+from lib.config import config
+from lib.session_codec import CompactSerializer, split_jwt
+
+
+@pytest.fixture(scope="module")
+def session() -> dict[str, Any]:
+    token = token_response()
+    return {
+        "auth_session": {
+            "user": user_claims(),
+            "access_token": token["access_token"],
+            "id_token": token["id_token"],
+            "refresh_token": token["refresh_token"],
+            "expires_at": token["expires_at"],
+        },
+        "post_login_url": "/profile",
+    }
+
+
+def test_round_trip_restores_tokens(session: dict[str, Any]) -> None:
+    """Test that split tokens are restored byte for byte."""
+    assert CompactSerializer().loads(CompactSerializer().dumps(session)) == session
+
+
+def test_reads_sessions_written_by_json_serializer(session: dict[str, Any]) -> None:
+    """Test that existing cookies stay valid after switching serializers."""
+    assert CompactSerializer().loads(JSONSerializer().dumps(session)) == session
+
+
+def test_only_canonical_jwts_are_split() -> None:
+    """Test that strings that would not re-encode identically are kept as text."""
+    assert split_jwt("eyJhbGciOiJub25lIn0.e30.") == [b'{"alg":"none"}', b"{}", b""]
+    assert split_jwt("eyJhbGciOiJub25lIn0.e31.") is None
+    assert split_jwt("not.a.jwt") is None
+    value = {"note": "eyJhbGciOiJub25lIn0.e31.", "list": ["eyJhbGciOiJub25lIn0.e30."]}
+    assert CompactSerializer().loads(CompactSerializer().dumps(value)) == value
+
+
+def test_signed_cookie_is_smaller(session: dict[str, Any]) -> None:
+    """Test that the compact encoding shrinks a typical session cookie."""
+    compact = signing.dumps(session, compress=True, serializer=CompactSerializer)
+    baseline = signing.dumps(session, compress=True, serializer=JSONSerializer)
+
+    assert len(compact) < len(baseline) * 0.8
+
+
+def test_session_claims_allow_list(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only allow-listed claims and the subject are kept."""
+    monkeypatch.setattr(config, "SESSION_USER_CLAIMS", frozenset({"name", "email"}))
+
+    assert auth.session_claims(user_claims()) == {
+        "sub": user_claims()["sub"],
+        "name": "Jane Doe",
+        "email": "jane.doe@example.com",
+    }
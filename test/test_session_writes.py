@@ -0,0 +1,75 @@
+"""Tests that only real session changes make a response set the session cookie."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+import pytest
+from django.conf import settings
+from django.test import Client
+
+from lib import auth, guard
+from lib.config import config
+
+TOKENS = {"access_token": "current", "refresh_token": "r1"}
+
+
+def set_cookies(response: Any) -> int:
+    return len(response.cookies)
+
+
+def test_read_only_pages_do_not_set_cookies(monkeypatch: pytest.MonkeyPatch, signed_in_client: Callable[..., Client]) -> None:
+    """Test that signed-in page views and userinfo reads never re-send the session."""
+    monkeypatch.setattr(auth, "get_userinfo", lambda sub, access_token: {"sub": sub})
+    client = signed_in_client()
+
+    for _ in range(3):
+        response = client.get("/profile")
+        assert response.status_code == 200
+        assert set_cookies(response) == 0
+    assert set_cookies(client.get("/")) == 0
+    assert set_cookies(client.get("/auth/userinfo")) == 0
+    assert set_cookies(client.get("/robots.txt")) == 0
+    assert set_cookies(Client().get("/")) == 0
+
+
+def test_refresh_sets_the_cookie_once(monkeypatch: pytest.MonkeyPatch, signed_in_client: Callable[..., Client]) -> None:
+    """Test that a refresh writes the session and the following view does not."""
+    monkeypatch.setattr(
+        guard,
+        "_exchange_refresh_token",
+        lambda refresh_token: {"access_token": "new", "refresh_token": "r2", "expires_at": int(time.time()) + 3600},
+    )
+    guard._results.clear()
+    client = signed_in_client(expires_at=int(time.time()) - 1)
+
+    refreshed = client.get("/profile")
+    assert refreshed.status_code == 200
+    assert set_cookies(refreshed) == 1
+    assert "error" not in client.session["auth_session"]
+    assert set_cookies(client.get("/profile")) == 0
+
+
+def test_unchanged_refresh_result_is_not_written(
+    monkeypatch: pytest.MonkeyPatch, signed_in_client: Callable[..., Client]
+) -> None:
+    """Test that a background refresh result equal to the session causes no write."""
+    expires_at = int(time.time()) + 30
+    monkeypatch.setattr(config, "ZITADEL_REFRESH_IN_BACKGROUND", True)
+    monkeypatch.setattr(guard, "_completed_refresh", lambda refresh_token: {**TOKENS, "expires_at": expires_at})
+    client = signed_in_client(**TOKENS, expires_at=expires_at)
+
+    response = client.get("/profile")
+    assert response.status_code == 200
+    assert set_cookies(response) == 0
+
+
+def test_csrf_token_does_not_touch_the_session() -> None:
+    """Test that fetching sign-in CSRF tokens only sets the nonce cookie, once."""
+    client = Client()
+    first = client.get("/auth/csrf")
+    second = client.get("/auth/csrf")
+
+    assert set_cookies(first) == 1 and settings.SESSION_COOKIE_NAME not in first.cookies
+    assert set_cookies(second) == 0
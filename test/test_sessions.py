@@ -0,0 +1,63 @@
+"""Tests for the server-side session store and its cookie migration."""
+
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from django.conf import settings
+from django.contrib.sessions.backends import signed_cookies
+from django.shortcuts import redirect
+from django.test import Client
+
+from lib import auth, sessions
+
+
+@pytest.fixture
+def server_sessions(settings: Any) -> None:
+    settings.SESSION_ENGINE = "lib.sessions"
+
+
+def signed_cookie_session() -> str:
+    """Create a session the way the signed-cookie engine stores it."""
+    legacy = signed_cookies.SessionStore()
+    legacy["auth_session"] = {"user": {"sub": "user-1"}, "access_token": "a1", "expires_at": int(time.time()) + 3600}
+    legacy.save()
+    assert legacy.session_key is not None
+    return legacy.session_key
+
+
+@pytest.mark.django_db
+def test_cookie_only_carries_session_id(server_sessions: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the session data stays on the server."""
+    authorize = SimpleNamespace(authorize_redirect=lambda request, redirect_uri: redirect("https://idp.example.com/"))
+    monkeypatch.setattr(auth, "oauth", SimpleNamespace(zitadel=authorize))
+    client = Client()
+    token = client.get("/auth/csrf").json()["csrfToken"]
+    response = client.post("/auth/signin/zitadel", {"csrfToken": token, "callbackUrl": "/profile"})
+
+    cookie = response.cookies[settings.SESSION_COOKIE_NAME].value
+    assert len(cookie) == 32 and ":" not in cookie
+    assert sessions.SessionStore(cookie)["post_login_url"] == "/profile"
+
+
+@pytest.mark.django_db
+def test_signed_cookie_session_is_migrated(server_sessions: None) -> None:
+    """Test that a session from the signed-cookie engine survives the switch."""
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = signed_cookie_session()
+
+    assert client.get("/profile").status_code == 200
+
+    new_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+    assert ":" not in new_key
+    assert sessions.SessionStore(new_key)["auth_session"]["access_token"] == "a1"
+    assert client.get("/profile").status_code == 200
+
+
+def test_tampered_signed_cookie_is_not_migrated() -> None:
+    """Test that only correctly signed cookies are imported."""
+    assert sessions.load_signed_cookie(signed_cookie_session() + "x") == {}
+    assert sessions.load_signed_cookie("abcdefgh12345678") == {}
@@ -0,0 +1,42 @@
+"""Tests for lazy configuration and OAuth client initialization."""
+
+from __future__ import annotations
+
+import pytest
+
+from lib import auth
+from lib.config import LazyConfig, config
+
+
+def test_config_is_read_on_first_access(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the environment is read when a setting is first used, not on import."""
+    lazy = LazyConfig()
+    monkeypatch.setenv("PAGE_CACHE_SIZE", "7")
+
+    assert lazy.PAGE_CACHE_SIZE == 7  # type: ignore[attr-defined]
+
+
+def test_config_reload_reads_the_environment_again() -> None:
+    """Test that reload() picks up changed environment variables."""
+    original = config.PAGE_CACHE_SIZE
+    with pytest.MonkeyPatch.context() as m:
+        m.setenv("PAGE_CACHE_SIZE", str(original + 1))
+        assert config.PAGE_CACHE_SIZE == original
+        config.reload()  # type: ignore[attr-defined]
+        assert config.PAGE_CACHE_SIZE == original + 1
+
+    config.reload()  # type: ignore[attr-defined]
+    assert config.PAGE_CACHE_SIZE == original
+
+
+def test_oauth_client_is_registered_on_first_use(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the ZITADEL client is built on first access, once."""
+    monkeypatch.setattr(auth, "oauth", auth.LazyOAuth())
+    assert "zitadel" not in auth.oauth._registry
+
+    client = auth.oauth.zitadel
+    assert isinstance(client, auth.ZitadelApp)
+    assert client.client_id == config.ZITADEL_CLIENT_ID
+
+    auth.init_oauth()
+    assert auth.oauth.zitadel is client
@@ -0,0 +1,127 @@
+"""Tests for the fingerprinted static pipeline and the WSGI file server."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+
+from lib.staticfiles import IMMUTABLE, REVALIDATE, StaticFileServer, check_manifest
+
+
+@pytest.fixture
+def collected(settings: Any, tmp_path: Path) -> Path:
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "lib.staticfiles.CompressedManifestStaticFilesStorage"},
+    }
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return tmp_path
+
+
+def test_missing_manifest_fails_at_startup(settings: Any, tmp_path: Path) -> None:
+    """Test that the manifest storage without collectstatic is reported instead of failing each page."""
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "lib.staticfiles.CompressedManifestStaticFilesStorage"},
+    }
+    with pytest.raises(ImproperlyConfigured, match="collectstatic"):
+        check_manifest()
+
+    call_command("collectstatic", interactive=False, verbosity=0)
+    check_manifest()
+
+
+def hashed_name(root: Path, name: str) -> str:
+    return str(json.loads((root / "staticfiles.json").read_text())["paths"][name])
+
+
+def fallback(environ: dict[str, Any], start_response: Any) -> list[bytes]:
+    start_response("404 Not Found", [])
+    return [b"django"]
+
+
+def get(server: StaticFileServer, path: str, **environ: Any) -> tuple[str, dict[str, str], bytes]:
+    captured: dict[str, Any] = {}
+
+    def start_response(status: str, headers: list[tuple[str, str]]) -> None:
+        captured["status"], captured["headers"] = status, dict(headers)
+
+    body = b"".join(server({"PATH_INFO": path, "REQUEST_METHOD": "GET", **environ}, start_response))
+    return captured["status"], captured["headers"], body
+
+
+def test_collectstatic_writes_hashed_and_compressed_files(collected: Path) -> None:
+    """Test that each asset gets a content-hashed copy with a gzip variant and static() links to it."""
+    name = hashed_name(collected, "zitadel-logo.svg")
+    assert name != "zitadel-logo.svg"
+    original = (collected / name).read_bytes()
+    assert gzip.decompress((collected / f"{name}.gz").read_bytes()) == original
+    assert staticfiles_storage.url("zitadel-logo.svg") == f"/static/{name}"
+
+
+def test_server_sends_precompressed_variant_with_immutable_caching(collected: Path) -> None:
+    """Test that a hashed asset is served gzipped to clients that accept it, cached for a year."""
+    name = hashed_name(collected, "zitadel-logo.svg")
+    server = StaticFileServer(fallback, str(collected), "/static/")
+
+    status, headers, body = get(server, f"/static/{name}", HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert status == "200 OK"
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Cache-Control"] == IMMUTABLE
+    assert headers["Vary"] == "Accept-Encoding"
+    assert headers["Content-Type"] == "image/svg+xml"
+    assert gzip.decompress(body) == (collected / name).read_bytes()
+
+    status, headers, body = get(server, f"/static/{name}", HTTP_ACCEPT_ENCODING="gzip;q=0")
+    assert "Content-Encoding" not in headers
+    assert body == (collected / name).read_bytes()
+
+
+def test_server_revalidation_and_fallthrough(collected: Path) -> None:
+    """Test 304 for a known ETag, short caching for unhashed names and Django for unknown paths."""
+    server = StaticFileServer(fallback, str(collected), "/static/")
+
+    status, headers, _ = get(server, "/static/robots.txt")
+    assert status == "200 OK"
+    assert headers["Cache-Control"] == REVALIDATE
+
+    status, _, body = get(server, "/static/robots.txt", HTTP_IF_NONE_MATCH=headers["ETag"])
+    assert status == "304 Not Modified"
+    assert body == b""
+    etag = headers["ETag"]
+    for header in (f"W/{etag}", "*", f'"other", {etag}'):
+        assert get(server, "/static/robots.txt", HTTP_IF_NONE_MATCH=header)[0] == "304 Not Modified"
+    assert get(server, "/static/robots.txt", HTTP_IF_NONE_MATCH=f'"x{etag}"')[0] == "200 OK"
+
+    status, headers, body = get(server, "/static/robots.txt", REQUEST_METHOD="HEAD")
+    assert status == "200 OK"
+    assert body == b""
+    assert int(headers["Content-Length"]) > 0
+
+    assert get(server, "/static/missing.svg")[2] == b"django"
+    assert get(server, "/profile")[2] == b"django"
+    assert get(server, "/static/robots.txt", REQUEST_METHOD="POST")[0] == "405 Method Not Allowed"
+
+
+def test_server_uses_wsgi_file_wrapper(collected: Path) -> None:
+    """Test that the body is handed to the server's file wrapper when it offers one."""
+    server = StaticFileServer(fallback, str(collected), "/static/")
+    wrapped: list[io.BufferedReader] = []
+
+    def file_wrapper(f: io.BufferedReader) -> list[bytes]:
+        wrapped.append(f)
+        with f:
+            return [f.read()]
+
+    get(server, "/static/robots.txt", **{"wsgi.file_wrapper": file_wrapper})
+    assert len(wrapped) == 1
@@ -0,0 +1,140 @@
+"""Tests for tenant resolution and the per-tenant client registry."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpRequest, HttpResponse
+from django.test import Client
+from django.urls import path
+
+from lib import tenants
+from lib.auth import oauth, tenant_clients
+from lib.guard import require_auth
+from lib.tenants import ClientRegistry, active_tenant, parse_tenants, resolve, using
+
+TENANTS = parse_tenants(
+    {
+        "acme.test": {
+            "domain": "https://acme.zitadel.test/some/path",
+            "client_id": "acme-client",
+            "client_secret": "acme-secret",
+            "callback_url": "http://acme.test/auth/callback",
+        },
+        "portal.test/globex": {
+            "domain": "https://globex.zitadel.test",
+            "client_id": "globex-client",
+            "client_secret": "globex-secret",
+            "callback_url": "http://portal.test/globex/auth/callback",
+            "post_login_url": "/globex/profile",
+        },
+        "/initech": {
+            "domain": "https://initech.zitadel.test",
+            "client_id": "initech-client",
+            "client_secret": "initech-secret",
+            "callback_url": "http://portal.test/initech/auth/callback",
+        },
+    }
+)
+
+
+def tenant_view(request: HttpRequest) -> HttpResponse:
+    tenant = active_tenant()
+    return HttpResponse(tenant.key if tenant else "default")
+
+
+@require_auth
+def protected(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(oauth.zitadel.client_id)
+
+
+urlpatterns = [
+    path("tenant", tenant_view),
+    path("protected", protected),
+]
+
+
+@pytest.fixture(autouse=True)
+def configured(monkeypatch: pytest.MonkeyPatch, settings: Any) -> Iterator[None]:
+    monkeypatch.setattr(tenants, "configured_tenants", lambda: TENANTS)
+    settings.ROOT_URLCONF = __name__
+    settings.ALLOWED_HOSTS = ["testserver", "acme.test", "portal.test"]
+    settings.MIDDLEWARE = ["lib.tenants.TenantMiddleware", *settings.MIDDLEWARE]
+    yield
+    tenant_clients.clear()
+
+
+def test_parse_tenants() -> None:
+    """Test that domains are normalized and missing settings are reported."""
+    assert TENANTS["acme.test"].domain == "https://acme.zitadel.test"
+    assert TENANTS["acme.test"].post_login_url == "/profile"
+    assert TENANTS["portal.test/globex"].post_login_url == "/globex/profile"
+
+    with pytest.raises(ImproperlyConfigured, match="client_secret, callback_url"):
+        parse_tenants({"broken.test": {"domain": "https://x.test", "client_id": "x"}})
+
+
+def test_resolve_prefers_the_most_specific_key() -> None:
+    """Test host, mount point and host plus mount point keys."""
+    assert resolve("acme.test") == TENANTS["acme.test"]
+    assert resolve("acme.test", "/initech") == TENANTS["/initech"]
+    assert resolve("portal.test", "/globex/") == TENANTS["portal.test/globex"]
+    assert resolve("other.test", "/globex") is None
+    assert resolve("portal.test") is None
+
+
+def test_oauth_client_follows_the_active_tenant() -> None:
+    """Test that each tenant gets its own client, pool and caches, reused across requests."""
+    default = oauth.zitadel
+    with using(TENANTS["acme.test"]):
+        acme = oauth.zitadel
+        assert acme is oauth.zitadel
+    with using(TENANTS["/initech"]):
+        initech = oauth.zitadel
+
+    assert acme.client_id == "acme-client" and initech.client_id == "initech-client"
+    assert acme.metadata_store.url == "https://acme.zitadel.test/.well-known/openid-configuration"
+    assert len({id(default), id(acme), id(initech)}) == 3
+    assert len({id(default.http), id(acme.http), id(initech.http)}) == 3
+    assert oauth.zitadel is default
+
+
+def test_registry_evicts_least_recently_used() -> None:
+    """Test that idle tenants are evicted and their connections closed."""
+    closed = []
+
+    def factory(tenant: tenants.Tenant) -> Any:
+        return SimpleNamespace(key=tenant.key, http=SimpleNamespace(close=lambda: closed.append(tenant.key)))
+
+    registry = ClientRegistry(factory, maxsize=2)
+    acme = registry.get(TENANTS["acme.test"])
+    registry.get(TENANTS["/initech"])
+    assert registry.get(TENANTS["acme.test"]) is acme
+
+    registry.get(TENANTS["portal.test/globex"])
+    assert closed == ["/initech"]
+    assert len(registry) == 2
+
+
+def test_middleware_activates_tenant_by_host_and_mount_point() -> None:
+    """Test that the middleware resolves the tenant for the request only."""
+    client = Client()
+    assert client.get("/tenant", HTTP_HOST="acme.test").content == b"acme.test"
+    assert client.get("/tenant", HTTP_HOST="portal.test", SCRIPT_NAME="/initech").content == b"/initech"
+    assert client.get("/tenant").content == b"default"
+    assert active_tenant() is None
+
+
+def test_session_is_bound_to_its_tenant(signed_in_client: Callable[..., Client]) -> None:
+    """Test that a session from one tenant is not accepted by another."""
+    client = signed_in_client(tenant="acme.test")
+
+    response = client.get("/protected", HTTP_HOST="acme.test")
+    assert response.status_code == 200
+    assert response.content == b"acme-client"
+
+    assert client.get("/protected", HTTP_HOST="portal.test", SCRIPT_NAME="/initech").status_code == 302
@@ -0,0 +1,98 @@
+"""Tests for the cached userinfo endpoint."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+import pytest
+import requests
+from django.core.cache import cache
+from django.test import Client
+
+from lib import userinfo
+from lib.auth import oauth
+from lib.config import config
+
+
+class FakeUserinfo:
+    """Stands in for ZITADEL's userinfo endpoint."""
+
+    def __init__(self) -> None:
+        self.requests: list[dict[str, str]] = []
+        self.etag = '"v1"'
+
+    def get(self, url: str, headers: dict[str, str]) -> requests.Response:
+        self.requests.append(headers)
+        time.sleep(0.05)
+        response = requests.Response()
+        response.headers["ETag"] = self.etag
+        if headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = b'{"sub": "user-1", "name": "Jane"}'
+        return response
+
+
+@pytest.fixture
+def upstream(monkeypatch: pytest.MonkeyPatch) -> FakeUserinfo:
+    fake = FakeUserinfo()
+    monkeypatch.setattr(oauth.zitadel, "load_server_metadata", lambda: {"userinfo_endpoint": "https://idp.example/userinfo"})
+    monkeypatch.setattr(oauth.zitadel.http.session, "get", fake.get)
+    cache.clear()
+    return fake
+
+
+@pytest.mark.django_db
+def test_polling_hits_upstream_once_per_ttl(upstream: FakeUserinfo, signed_in_client: Callable[..., Client]) -> None:
+    """Test that repeated polls are served from the cache and revalidated by the browser."""
+    client = signed_in_client(access_token="a1")
+
+    first = client.get("/auth/userinfo")
+    assert first.json() == {"sub": "user-1", "name": "Jane"}
+
+    second = client.get("/auth/userinfo", headers={"If-None-Match": first["ETag"]})
+    assert second.status_code == 304
+    assert len(upstream.requests) == 1
+
+
+def test_concurrent_misses_share_one_call(upstream: FakeUserinfo) -> None:
+    """Test that a stampede on a cold entry causes a single upstream call."""
+    threads = [threading.Thread(target=userinfo.get_userinfo, args=("user-1", "a1")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(upstream.requests) == 1
+
+
+def test_expired_entry_is_revalidated_with_etag(upstream: FakeUserinfo, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that an expired entry is revalidated and kept on 304."""
+    userinfo.get_userinfo("user-1", "a1")
+    monkeypatch.setattr(config, "ZITADEL_USERINFO_CACHE_TTL", 0.01)
+    time.sleep(0.02)
+
+    assert userinfo.get_userinfo("user-1", "a1") == {"sub": "user-1", "name": "Jane"}
+    assert upstream.requests[-1]["If-None-Match"] == '"v1"'
+
+
+def test_different_tokens_do_not_share_entries(upstream: FakeUserinfo) -> None:
+    """Test that the cache key includes the access token."""
+    userinfo.get_userinfo("user-1", "a1")
+    userinfo.get_userinfo("user-1", "a2")
+
+    assert len(upstream.requests) == 2
+
+
+@pytest.mark.django_db
+def test_logout_invalidates_cached_claims(upstream: FakeUserinfo, signed_in_client: Callable[..., Client]) -> None:
+    """Test that logging out drops the user's cached claims."""
+    client = signed_in_client(access_token="a1")
+    client.get("/auth/userinfo")
+    assert cache.get(userinfo.cache_key("user-1", "a1")) is not None
+
+    client.post("/auth/logout")
+    assert cache.get(userinfo.cache_key("user-1", "a1")) is None